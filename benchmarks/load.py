@@ -0,0 +1,184 @@
+"""Latency, query count and memory of every page and API at several data scales.
+
+Each scale runs in its own process against a fresh database built by
+init_db, and requests go through the Flask test client with the response
+cache disabled. Results can be saved as a baseline and later runs compared
+against it:
+
+    python benchmarks/load.py --scales small,medium --save benchmarks/baseline.json
+    python benchmarks/load.py --scales small,medium --compare benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# init_db arguments per scale
+SCALES = {
+    'small': {'vehicles': 100, 'drivers': 100, 'maintenance': 1000, 'fuel': 10000, 'positions_per_vehicle': 60},
+    'medium': {'vehicles': 1000, 'drivers': 1000, 'maintenance': 10000, 'fuel': 100000, 'positions_per_vehicle': 240},
+    'large': {'vehicles': 10000, 'drivers': 10000, 'maintenance': 100000, 'fuel': 1000000,
+              'positions_per_vehicle': 100},
+}
+
+PATHS = [
+    '/dashboard',
+    '/vehicles',
+    '/vehicle/1',
+    '/vehicle-tracking',
+    '/maintenance',
+    '/driver-performance',
+    '/fuel-management',
+    '/api/vehicle-locations',
+    '/api/vehicle-locations?format=columnar',
+    '/api/vehicle-locations?bbox=-74.0,40.8,-73.95,40.85',
+    '/api/vehicles/nearest?lat=40.85&lon=-74.0&k=10',
+    '/api/maintenance-alerts',
+    '/api/vehicles',
+    '/api/drivers',
+    '/api/fuel-records',
+    '/api/maintenance-records',
+    '/api/vehicle/1/track',
+    '/api/driver-performance/1',
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_scale(name, requests, seed):
+    """Build the database for one scale and measure every path; runs in a child process."""
+    sys.path.insert(0, ROOT)
+    import init_db
+    from app import app
+    from fleet.commands import count_queries
+    from fleet.extensions import db
+
+    started = time.perf_counter()
+    rows = init_db.init_db(seed=seed, **SCALES[name])
+    build_seconds = time.perf_counter() - started
+
+    with app.app_context():
+        engine = db.engine
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    routes = {}
+    for path in PATHS:
+        client.get(path)  # warm up templates, the spatial index and SQLite's page cache
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = client.get(path)
+            timings.append((time.perf_counter() - started) * 1000)
+        with count_queries(engine) as statements:
+            client.get(path)
+        tracemalloc.start()
+        client.get(path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        routes[path] = {
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries': len(statements),
+            'peak_alloc_kb': round(peak / 1024, 1),
+            'bytes': len(response.data),
+        }
+    return {
+        'rows': rows,
+        'build_seconds': round(build_seconds, 2),
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'routes': routes,
+    }
+
+
+def measure(name, requests, seed):
+    """Run one scale in a subprocess so databases and process memory don't mix."""
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                   CACHE_BACKEND='none', GEOCODER='none', JOB_WORKER='off')
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', name,
+             '--requests', str(requests), '--seed', str(seed)],
+            env=env, cwd=directory, check=True, stdout=subprocess.PIPE, text=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """Return regression messages for p95 latency and query counts against the baseline."""
+    problems = []
+    for scale, result in results['scales'].items():
+        base = baseline.get('scales', {}).get(scale)
+        if base is None:
+            continue
+        for path, stats in result['routes'].items():
+            old = base['routes'].get(path)
+            if old is None:
+                continue
+            if stats['queries'] > old['queries']:
+                problems.append(f"{scale} {path}: {stats['queries']} queries, baseline {old['queries']}")
+            # Ignore sub-millisecond noise on fast routes
+            if stats['p95_ms'] > max(old['p95_ms'] * (1 + tolerance), old['p95_ms'] + 1):
+                problems.append(f"{scale} {path}: p95 {stats['p95_ms']:.1f} ms, baseline {old['p95_ms']:.1f} ms")
+    return problems
+
+
+def report(results):
+    for scale, result in results['scales'].items():
+        rows = ', '.join(f'{count} {name}' for name, count in result['rows'].items())
+        print(f"\n{scale}: {rows} (built in {result['build_seconds']}s, max RSS {result['max_rss_kb'] // 1024} MB)")
+        print(f"{'path':<52} {'status':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>7} {'alloc KB':>9}")
+        for path, stats in result['routes'].items():
+            print(f"{path:<52} {stats['status']:>6} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+                  f"{stats['p99_ms']:>8.2f} {stats['queries']:>7} {stats['peak_alloc_kb']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='small', help=f"comma separated, from {', '.join(SCALES)}")
+    parser.add_argument('--requests', type=int, default=50, help='timed requests per path')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save', metavar='PATH', help='write the results as JSON')
+    parser.add_argument('--compare', metavar='PATH', help='fail if slower or chattier than this baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95 slowdown, as a fraction')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_scale(args.worker, args.requests, args.seed)))
+        return
+
+    results = {'requests': args.requests, 'seed': args.seed, 'scales': {}}
+    for name in args.scales.split(','):
+        if name not in SCALES:
+            parser.error(f'unknown scale {name!r}')
+        results['scales'][name] = measure(name, args.requests, args.seed)
+    report(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        for problem in problems:
+            print('REGRESSION', problem)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Mixed read/write throughput of the stock SQLite setup against the tuned engine profile.
+
+Each profile gets a fresh database seeded with the same rows. Reader threads
+run the vehicle list and monthly fuel cost queries, writer threads insert a
+fuel record and update the vehicle in one transaction.
+
+    python benchmarks/sqlite_profile.py --seconds 10 --readers 8 --writers 2
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool
+
+from fleet.database import config_from_env, create_reader, install_pragmas, pool_options, sqlite_pragmas
+from fleet.extensions import db
+from fleet.models import FuelRecord, Vehicle
+
+VEHICLES = Vehicle.__table__
+FUEL = FuelRecord.__table__
+
+
+def seed(engine, vehicles, fuel_records):
+    db.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(VEHICLES.insert(), [
+            {'name': f'Truck-{i}', 'vehicle_type': 'Truck', 'fuel_level': 50.0, 'status': 'active'}
+            for i in range(vehicles)
+        ])
+        conn.execute(FUEL.insert(), [
+            {'vehicle_id': random.randint(1, vehicles), 'date': now - timedelta(hours=i),
+             'quantity': 40.0, 'cost': 60.0}
+            for i in range(fuel_records)
+        ])
+
+
+def engines(profile, path, config):
+    url = f'sqlite:///{path}'
+    if profile == 'stock':
+        # What Flask-SQLAlchemy 2.5 configures for a file database
+        engine = create_engine(url, poolclass=NullPool)
+        return engine, engine
+    engine = create_engine(url, **pool_options(config))
+    install_pragmas(engine, sqlite_pragmas(config))
+    if profile == 'split':
+        engine.connect().close()  # switch the file to WAL before readers open it read-only
+        return engine, create_reader(url, config)
+    return engine, engine
+
+
+def run(profile, args, config):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    writer, reader = engines(profile, path, config)
+    seed(writer, args.vehicles, args.fuel_records)
+    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def read_loop():
+        done = 0
+        while time.perf_counter() < deadline:
+            with reader.connect() as conn:
+                conn.execute(select(VEHICLES).order_by(VEHICLES.c.id).limit(25)).all()
+                conn.execute(select(func.sum(FUEL.c.cost)).where(FUEL.c.date >= month_start)).scalar()
+            done += 1
+        with lock:
+            counts['reads'] += done
+
+    def write_loop():
+        done = errors = 0
+        while time.perf_counter() < deadline:
+            vehicle_id = random.randint(1, args.vehicles)
+            try:
+                with writer.begin() as conn:
+                    conn.execute(FUEL.insert().values(vehicle_id=vehicle_id, date=datetime.utcnow(),
+                                                      quantity=30.0, cost=45.0))
+                    conn.execute(VEHICLES.update().where(VEHICLES.c.id == vehicle_id).values(fuel_level=100.0))
+                done += 1
+            except OperationalError:
+                errors += 1
+        with lock:
+            counts['writes'] += done
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=read_loop) for _ in range(args.readers)]
+    threads += [threading.Thread(target=write_loop) for _ in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {key: value / args.seconds if key != 'errors' else value for key, value in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--vehicles', type=int, default=500)
+    parser.add_argument('--fuel-records', type=int, default=20000)
+    parser.add_argument('--profiles', default='stock,tuned,split')
+    args = parser.parse_args()
+    config = config_from_env()
+
+    print(f'{"profile":<8} {"reads/s":>10} {"writes/s":>10} {"errors":>8}')
+    for profile in args.profiles.split(','):
+        result = run(profile, args, config)
+        print(f'{profile:<8} {result["reads"]:>10.1f} {result["writes"]:>10.1f} {result["errors"]:>8}')
+
+
+if __name__ == '__main__':
+    main()
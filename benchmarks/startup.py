@@ -0,0 +1,83 @@
+"""Cold start time: importing the app and serving its first request.
+
+Every run is a fresh interpreter, so nothing is shared with earlier runs
+except the filesystem cache. An older revision can be measured the same way
+from a scratch checkout of that ref:
+
+    python benchmarks/startup.py --runs 10
+    python benchmarks/startup.py --runs 10 --compare-ref HEAD~1
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run inside the child; prints one JSON line of timings in milliseconds
+WORKER = r'''
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, '.')
+from app import app
+imported = time.perf_counter()
+response = app.test_client().get('/login')
+served = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({'import_ms': (imported - started) * 1000, 'first_request_ms': (served - imported) * 1000,
+                  'modules': len(sys.modules)}))
+'''
+
+
+def measure(tree, runs):
+    env = dict(os.environ, CACHE_BACKEND='none', GEOCODER='none', INSTRUMENTATION='off', JOB_WORKER='off')
+    samples = []
+    with tempfile.TemporaryDirectory() as scratch:
+        env['DATABASE_URL'] = 'sqlite:///' + os.path.join(scratch, 'startup.db')
+        for _ in range(runs):
+            started = time.perf_counter()
+            output = subprocess.run([sys.executable, '-c', WORKER], cwd=tree, env=env,
+                                    capture_output=True, text=True, check=True).stdout
+            sample = json.loads(output.strip().splitlines()[-1])
+            sample['process_ms'] = (time.perf_counter() - started) * 1000
+            samples.append(sample)
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+def checkout(ref, directory):
+    """Extract ref into directory without touching the working tree."""
+    archive = subprocess.run(['git', 'archive', '--format=tar', ref], cwd=ROOT,
+                             capture_output=True, check=True).stdout
+    path = os.path.join(directory, 'tree.tar')
+    with open(path, 'wb') as f:
+        f.write(archive)
+    with tarfile.open(path) as tar:
+        tar.extractall(directory)
+    os.remove(path)
+
+
+def report(label, result):
+    print(f"{label:<12} import {result['import_ms']:7.1f} ms   first request {result['first_request_ms']:7.1f} ms"
+          f"   process {result['process_ms']:7.1f} ms   modules {result['modules']:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes per tree; medians are reported')
+    parser.add_argument('--compare-ref', metavar='REF', help='also measure this git ref')
+    args = parser.parse_args()
+
+    if args.compare_ref:
+        with tempfile.TemporaryDirectory() as directory:
+            checkout(args.compare_ref, directory)
+            report(args.compare_ref, measure(directory, args.runs))
+    report('working tree', measure(ROOT, args.runs))
+
+
+if __name__ == '__main__':
+    main()
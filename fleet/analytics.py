@@ -0,0 +1,187 @@
+"""Per-vehicle cost buckets in CostBucket, kept current by session flush hooks, and the queries they answer.
+
+Every fuel record and completed maintenance record adds to one day bucket
+and one month bucket of its vehicle, so cost reports read a few hundred
+bucket rows instead of scanning the raw records.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, literal, select, union_all
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from fleet.extensions import db
+from fleet.models import CostBucket, FuelRecord, MaintenanceRecord, Vehicle, keep_old_values, old_value
+
+# Bucket key format per period
+PERIODS = {'day': '%Y-%m-%d', 'month': '%Y-%m'}
+METRICS = ('fuel_liters', 'fuel_cost', 'maintenance_cost', 'refuels')
+RANKINGS = ('total_cost', 'fuel_cost', 'maintenance_cost', 'fuel_liters')
+# Range reported when a query gives no start
+DEFAULT_SPANS = {'day': timedelta(days=30), 'month': timedelta(days=365)}
+MAX_DAY_SPAN = timedelta(days=731)
+
+# Columns bucket_keys reads; their old values are needed to back out a row's amounts
+keep_old_values(FuelRecord.vehicle_id, FuelRecord.date, FuelRecord.quantity, FuelRecord.cost,
+                MaintenanceRecord.vehicle_id, MaintenanceRecord.date, MaintenanceRecord.cost, MaintenanceRecord.status)
+
+
+def bucket_keys(model, value):
+    """Bucket contributions of one row of model, as {(vehicle_id, period, bucket): {metric: amount}}."""
+    if issubclass(model, FuelRecord):
+        amounts = {'fuel_liters': value('quantity') or 0.0, 'fuel_cost': value('cost') or 0.0, 'refuels': 1}
+    elif issubclass(model, MaintenanceRecord) and value('status') == 'completed':
+        amounts = {'maintenance_cost': value('cost') or 0.0}
+    else:
+        return {}
+    vehicle_id, date = value('vehicle_id'), value('date')
+    if vehicle_id is None or date is None:
+        return {}
+    # Form handlers assign ids as strings until the row is reloaded
+    return {(int(vehicle_id), period, date.strftime(fmt)): amounts for period, fmt in PERIODS.items()}
+
+
+def add_bucket_deltas(deltas, keys, sign):
+    for key, amounts in keys.items():
+        totals = deltas.setdefault(key, {})
+        for metric, amount in amounts.items():
+            totals[metric] = totals.get(metric, 0.0) + sign * amount
+
+
+def adjust_buckets(connection, deltas):
+    """Add deltas to CostBucket rows with one upsert."""
+    rows = [dict(vehicle_id=vehicle_id, period=period, bucket=bucket,
+                 **{metric: amounts.get(metric, 0.0) for metric in METRICS})
+            for (vehicle_id, period, bucket), amounts in deltas.items() if any(amounts.values())]
+    if rows:
+        table = CostBucket.__table__
+        stmt = sqlite_insert(table)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=['vehicle_id', 'period', 'bucket'],
+            set_={metric: table.c[metric] + stmt.excluded[metric] for metric in METRICS}
+        ), rows)
+
+
+@event.listens_for(db.session, 'before_flush')
+def collect_bucket_changes(session, flush_context, instances):
+    """Record bucket changes for updated and deleted rows while their old values are loaded."""
+    deltas = session.info.setdefault('bucket_deltas', {})
+    for obj in session.deleted:
+        add_bucket_deltas(deltas, bucket_keys(type(obj), lambda name: old_value(obj, name)), -1)
+        if isinstance(obj, Vehicle):
+            # The flush nulls its records' vehicle_id without passing them through this hook
+            session.info.setdefault('bucket_vehicles_deleted', set()).add(obj.id)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            add_bucket_deltas(deltas, bucket_keys(type(obj), lambda name: old_value(obj, name)), -1)
+            add_bucket_deltas(deltas, bucket_keys(type(obj), lambda name: getattr(obj, name)), 1)
+
+
+@event.listens_for(db.session, 'after_flush')
+def update_cost_buckets(session, flush_context):
+    deltas = session.info.pop('bucket_deltas', {})
+    for obj in session.new:
+        add_bucket_deltas(deltas, bucket_keys(type(obj), lambda name: getattr(obj, name)), 1)
+    adjust_buckets(session.connection(), deltas)
+    deleted = session.info.pop('bucket_vehicles_deleted', None)
+    if deleted:
+        # After the deltas, which may still name the vehicle
+        session.connection().execute(CostBucket.__table__.delete().where(CostBucket.vehicle_id.in_(deleted)))
+
+
+def rebuild_cost_buckets():
+    """Recompute every CostBucket from the fuel and maintenance records with one INSERT ... SELECT."""
+    fuel, maintenance = FuelRecord.__table__, MaintenanceRecord.__table__
+    parts = []
+    for period, fmt in PERIODS.items():
+        parts.append(select(fuel.c.vehicle_id, literal(period).label('period'),
+                            func.strftime(fmt, fuel.c.date).label('bucket'),
+                            func.coalesce(fuel.c.quantity, 0.0).label('fuel_liters'),
+                            func.coalesce(fuel.c.cost, 0.0).label('fuel_cost'),
+                            literal(0.0).label('maintenance_cost'), literal(1).label('refuels'))
+                     .where(fuel.c.vehicle_id.isnot(None), fuel.c.date.isnot(None)))
+        parts.append(select(maintenance.c.vehicle_id, literal(period), func.strftime(fmt, maintenance.c.date),
+                            literal(0.0), literal(0.0), func.coalesce(maintenance.c.cost, 0.0), literal(0))
+                     .where(maintenance.c.vehicle_id.isnot(None), maintenance.c.date.isnot(None),
+                            maintenance.c.status == 'completed'))
+    rows = union_all(*parts).subquery()
+    grouped = select(rows.c.vehicle_id, rows.c.period, rows.c.bucket,
+                     *[func.sum(rows.c[metric]) for metric in METRICS]) \
+        .group_by(rows.c.vehicle_id, rows.c.period, rows.c.bucket)
+    CostBucket.query.delete()
+    db.session.execute(CostBucket.__table__.insert().from_select(
+        ['vehicle_id', 'period', 'bucket', *METRICS], grouped))
+    db.session.commit()
+
+
+def bucket_range(period, start=None, end=None, now=None):
+    """The (first, last) bucket keys covering dates start to end; raises ValueError."""
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+    end = end or now or datetime.utcnow()
+    start = start or end - DEFAULT_SPANS[period]
+    if start > end:
+        raise ValueError('from must not be after to')
+    if period == 'day' and end - start > MAX_DAY_SPAN:
+        raise ValueError('daily ranges are limited to two years; use period=month')
+    return start.strftime(PERIODS[period]), end.strftime(PERIODS[period])
+
+
+def _totals():
+    return [func.sum(getattr(CostBucket, metric)).label(metric) for metric in METRICS]
+
+
+def _row_json(row):
+    result = {metric: getattr(row, metric) or 0 for metric in METRICS}
+    result['refuels'] = int(result['refuels'])
+    result['total_cost'] = result['fuel_cost'] + result['maintenance_cost']
+    return result
+
+
+def cost_series(period, first, last, vehicle_id=None):
+    """Totals per bucket from first to last, oldest first, for one vehicle or the whole fleet."""
+    query = db.session.query(CostBucket.bucket, *_totals()) \
+        .filter(CostBucket.period == period, CostBucket.bucket.between(first, last))
+    if vehicle_id is not None:
+        query = query.filter(CostBucket.vehicle_id == vehicle_id)
+    return [dict(_row_json(row), bucket=row.bucket)
+            for row in query.group_by(CostBucket.bucket).order_by(CostBucket.bucket)]
+
+
+def vehicle_totals(vehicle_id):
+    """All-time totals of one vehicle, summed over its month buckets."""
+    row = db.session.query(*_totals()).filter(CostBucket.vehicle_id == vehicle_id,
+                                              CostBucket.period == 'month').one()
+    return _row_json(row)
+
+
+def top_vehicles(n, metric, period, first, last):
+    """The n vehicles with the highest metric over the range, highest first."""
+    if metric not in RANKINGS:
+        raise ValueError(f"metric must be one of {', '.join(RANKINGS)}")
+    totals = _totals()
+    by_metric = {column.name: column for column in totals}
+    rank = by_metric['fuel_cost'] + by_metric['maintenance_cost'] if metric == 'total_cost' else by_metric[metric]
+    rows = db.session.query(CostBucket.vehicle_id, Vehicle.name, Vehicle.vehicle_type, *totals) \
+        .join(Vehicle, Vehicle.id == CostBucket.vehicle_id) \
+        .filter(CostBucket.period == period, CostBucket.bucket.between(first, last)) \
+        .group_by(CostBucket.vehicle_id).order_by(rank.desc(), CostBucket.vehicle_id).limit(n)
+    return [dict(_row_json(row), vehicle_id=row.vehicle_id, vehicle_name=row.name, vehicle_type=row.vehicle_type)
+            for row in rows]
+
+
+def type_comparison(period, first, last):
+    """Totals per vehicle type over the range, with per-vehicle and per-liter averages."""
+    vehicles = dict(db.session.query(Vehicle.vehicle_type, func.count()).group_by(Vehicle.vehicle_type))
+    rows = db.session.query(Vehicle.vehicle_type, *_totals()) \
+        .join(Vehicle, Vehicle.id == CostBucket.vehicle_id) \
+        .filter(CostBucket.period == period, CostBucket.bucket.between(first, last)) \
+        .group_by(Vehicle.vehicle_type)
+    result = []
+    for row in rows:
+        totals = _row_json(row)
+        count = vehicles.get(row.vehicle_type, 0)
+        result.append(dict(totals, vehicle_type=row.vehicle_type, vehicles=count,
+                           cost_per_vehicle=totals['total_cost'] / count if count else None,
+                           fuel_cost_per_liter=totals['fuel_cost'] / totals['fuel_liters']
+                           if totals['fuel_liters'] else None))
+    return sorted(result, key=lambda item: item['total_cost'], reverse=True)
@@ -0,0 +1,112 @@
+"""Batch anomaly detection over fuel records.
+
+Every check is one set-based query over a range of record ids. Window
+functions compute each refuel's baseline from the previous refuels of the
+same vehicle or driver inside SQLite, and only the flagged rows come back to
+Python, so a scan costs a few statements per chunk rather than a loop over
+millions of rows.
+"""
+import math
+from datetime import timedelta
+
+from sqlalchemy import and_, func, select
+
+# Previous refuels in a rolling price baseline, and how many it needs to be trusted
+WINDOW_REFUELS = 20
+MIN_BASELINE = 5
+# Refuels older than this before the scanned range never enter a baseline. Bounding
+# the window input by date keeps an incremental pass proportional to recent
+# history instead of the whole table.
+LOOKBACK_DAYS = 90
+Z_THRESHOLD = 3.0
+# Floor on the baseline's standard deviation, relative to its mean, so a run of
+# identical prices does not turn every small change into an outlier
+MIN_RELATIVE_STD = 0.02
+# Fills may exceed the nominal tank capacity by this factor before they count
+OVERFILL_TOLERANCE = 1.05
+# Two fills of one vehicle this close together that exceed the tank between them
+REFILL_HOURS = 2.0
+
+KINDS = ('price_vehicle', 'price_driver', 'overfill', 'rapid_refill')
+
+
+def _in_range(fuel, low_id, high_id):
+    return and_(fuel.c.id > low_id, fuel.c.id <= high_id)
+
+
+def price_outliers(session, fuel, partition, low_id, high_id, since, until):
+    """Refuels in (low_id, high_id] priced per liter more than Z_THRESHOLD deviations off their baseline.
+
+    partition is 'vehicle_id' or 'driver_id'; the baseline is the previous
+    WINDOW_REFUELS refuels of the same vehicle or driver, ordered by date.
+    since and until bound the refuel dates read; until is the newest date in
+    the range, as later refuels never precede one in it.
+    """
+    key = fuel.c[partition]
+    price = fuel.c.cost / fuel.c.quantity
+    frame = dict(partition_by=key, order_by=(fuel.c.date, fuel.c.id), rows=(-WINDOW_REFUELS, -1))
+    scope = select(key).where(_in_range(fuel, low_id, high_id), key.isnot(None))
+    w = select(
+        fuel.c.id, fuel.c.vehicle_id, fuel.c.driver_id, fuel.c.date, price.label('price'),
+        func.avg(price).over(**frame).label('mean'),
+        func.avg(price * price).over(**frame).label('mean_sq'),
+        func.count(fuel.c.id).over(**frame).label('n')
+    ).where(key.in_(scope), fuel.c.date.between(since, until), fuel.c.quantity > 0,
+            fuel.c.cost.isnot(None)).subquery()
+    floor = MIN_RELATIVE_STD * w.c.mean
+    # Two-argument max() is SQLite's scalar maximum
+    variance = func.max(w.c.mean_sq - w.c.mean * w.c.mean, floor * floor)
+    rows = session.execute(select(
+        w.c.id, w.c.vehicle_id, w.c.driver_id, w.c.date, w.c.price, w.c.mean, variance.label('variance')
+    ).where(
+        _in_range(w, low_id, high_id), w.c.n >= MIN_BASELINE,
+        (w.c.price - w.c.mean) * (w.c.price - w.c.mean) > Z_THRESHOLD * Z_THRESHOLD * variance
+    ))
+    kind = 'price_' + partition[:-len('_id')]
+    return [{'fuel_record_id': row.id, 'vehicle_id': row.vehicle_id, 'driver_id': row.driver_id,
+             'date': row.date, 'kind': kind, 'value': row.price, 'expected': row.mean,
+             'score': (row.price - row.mean) / math.sqrt(row.variance)} for row in rows]
+
+
+def overfills(session, fuel, vehicles, low_id, high_id):
+    """Refuels in (low_id, high_id] larger than their vehicle's tank."""
+    rows = session.execute(select(
+        fuel.c.id, fuel.c.vehicle_id, fuel.c.driver_id, fuel.c.date, fuel.c.quantity, vehicles.c.tank_capacity
+    ).join(vehicles, vehicles.c.id == fuel.c.vehicle_id).where(
+        _in_range(fuel, low_id, high_id), vehicles.c.tank_capacity > 0,
+        fuel.c.quantity > vehicles.c.tank_capacity * OVERFILL_TOLERANCE
+    ))
+    return [{'fuel_record_id': row.id, 'vehicle_id': row.vehicle_id, 'driver_id': row.driver_id,
+             'date': row.date, 'kind': 'overfill', 'value': row.quantity, 'expected': row.tank_capacity,
+             'score': row.quantity / row.tank_capacity} for row in rows]
+
+
+def rapid_refills(session, fuel, vehicles, low_id, high_id, since, until):
+    """Refuels in (low_id, high_id] that, with the vehicle's previous fill shortly before, exceed its tank."""
+    frame = dict(partition_by=fuel.c.vehicle_id, order_by=(fuel.c.date, fuel.c.id))
+    scope = select(fuel.c.vehicle_id).where(_in_range(fuel, low_id, high_id))
+    w = select(
+        fuel.c.id, fuel.c.vehicle_id, fuel.c.driver_id, fuel.c.date, fuel.c.quantity,
+        func.lag(fuel.c.quantity).over(**frame).label('prev_quantity'),
+        func.lag(fuel.c.date).over(**frame).label('prev_date')
+    ).where(fuel.c.vehicle_id.in_(scope), fuel.c.date.between(since, until)).subquery()
+    hours = (func.julianday(w.c.date) - func.julianday(w.c.prev_date)) * 24
+    combined = w.c.quantity + w.c.prev_quantity
+    rows = session.execute(select(
+        w.c.id, w.c.vehicle_id, w.c.driver_id, w.c.date, combined.label('combined'), vehicles.c.tank_capacity
+    ).join(vehicles, vehicles.c.id == w.c.vehicle_id).where(
+        _in_range(w, low_id, high_id), w.c.prev_date.isnot(None), hours < REFILL_HOURS,
+        vehicles.c.tank_capacity > 0, combined > vehicles.c.tank_capacity * OVERFILL_TOLERANCE
+    ))
+    return [{'fuel_record_id': row.id, 'vehicle_id': row.vehicle_id, 'driver_id': row.driver_id,
+             'date': row.date, 'kind': 'rapid_refill', 'value': row.combined, 'expected': row.tank_capacity,
+             'score': row.combined / row.tank_capacity} for row in rows]
+
+
+def detect(session, fuel, vehicles, low_id, high_id, first, last):
+    """Run every check over the fuel records with ids in (low_id, high_id], dated first to last."""
+    since = first - timedelta(days=LOOKBACK_DAYS)
+    return (price_outliers(session, fuel, 'vehicle_id', low_id, high_id, since, last)
+            + price_outliers(session, fuel, 'driver_id', low_id, high_id, since, last)
+            + overfills(session, fuel, vehicles, low_id, high_id)
+            + rapid_refills(session, fuel, vehicles, low_id, high_id, since, last))
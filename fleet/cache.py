@@ -0,0 +1,288 @@
+"""Tag-aware cache for rendered pages, fragments and JSON payloads.
+
+Entries are stored under their key plus the current version of each of
+their tags. Invalidating a tag bumps its version, so every entry that
+depended on it stops matching without the backend having to find them; the
+stale entries age out through the backend's LRU or TTL.
+
+Versions are never reused, and a tag not bumped for tag_ttl (the longest
+entry lifetime) is forgotten: every entry filed under an older version has
+expired by then, so the tag can start over without resurrecting any.
+"""
+import hashlib
+import itertools
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    """Per-process LRU bounded by entry count and total payload bytes."""
+
+    PRUNE_EVERY = 256
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, tag_ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.tag_ttl = tag_ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+        # Tag -> (version, bumped at); kept apart from the LRU, which could drop a version
+        # while entries filed under older ones are still alive
+        self.versions = {}
+        self.counter = itertools.count(1)
+        self.bumps = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires, size = entry
+            if expires is not None and expires < time.monotonic():
+                del self.entries[key]
+                self.size -= size
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        size = len(value) if isinstance(value, (bytes, str)) else len(pickle.dumps(value))
+        if size > self.max_bytes:
+            return
+        expires = time.monotonic() + ttl if ttl else None
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old[2]
+            self.entries[key] = (value, expires, size)
+            self.size += size
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, (_, _, evicted) = self.entries.popitem(last=False)
+                self.size -= evicted
+
+    def version(self, tag):
+        entry = self.versions.get(tag)
+        return entry[0] if entry else 0
+
+    def incr(self, tag):
+        with self.lock:
+            now = time.monotonic()
+            version = next(self.counter)
+            self.versions[tag] = (version, now)
+            self.bumps += 1
+            if self.tag_ttl and self.bumps % self.PRUNE_EVERY == 0:
+                self.versions = {tag: entry for tag, entry in self.versions.items()
+                                 if entry[1] >= now - self.tag_ttl}
+            return version
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+class FileBackend:
+    """Pickled entries in a directory, shared by every worker process on the host.
+
+    Entry and tag files are spread over one subdirectory per leading hex digit
+    of their hashed name. Each write prunes only the shard it wrote to, so the
+    work per write stays small however large the cache is: an entry file's
+    mtime is its expiry, and expired files go first, then the files closest
+    to expiry until the shard is within its share of max_entries and
+    max_bytes.
+    """
+
+    SHARDS = '0123456789abcdef'
+    # mtime of entries stored without a ttl: 2106, later than any real expiry
+    NO_EXPIRY = 2 ** 32 - 1
+
+    def __init__(self, directory, max_entries=1024, max_bytes=64 * 1024 * 1024, tag_ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.tag_ttl = tag_ttl
+        self.entries_dir = os.path.join(directory, 'entries')
+        self.tags_dir = os.path.join(directory, 'tags')
+        # Files are written here and renamed into place, out of reach of the shard pruning
+        self.tmp_dir = os.path.join(directory, 'tmp')
+        for shard in self.SHARDS:
+            os.makedirs(os.path.join(self.entries_dir, shard), exist_ok=True)
+            os.makedirs(os.path.join(self.tags_dir, shard), exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    @staticmethod
+    def _path(directory, key):
+        name = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(directory, name[0], name)
+
+    @staticmethod
+    def _load(path):
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _write(self, path, data, mtime=None):
+        # Write then rename so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.tmp_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        if mtime is not None:
+            os.utime(tmp, (mtime, mtime))
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _files(shard):
+        """(mtime, size, path) of the files in a shard directory, oldest mtime first."""
+        files = []
+        for entry in os.scandir(shard):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(files)
+
+    def get(self, key):
+        entry = self._load(self._path(self.entries_dir, key))
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires is not None and expires < time.time():
+            return None
+        return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        data = pickle.dumps((expires, value), protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes // len(self.SHARDS):
+            return
+        path = self._path(self.entries_dir, key)
+        self._write(path, data, expires or self.NO_EXPIRY)
+        self._prune_entries(os.path.dirname(path))
+
+    def _prune_entries(self, shard):
+        now = time.time()
+        files = self._files(shard)
+        count, size = len(files), sum(file_size for _, file_size, _ in files)
+        max_entries = max(self.max_entries // len(self.SHARDS), 1)
+        max_bytes = self.max_bytes // len(self.SHARDS)
+        for expires, file_size, path in files:
+            if expires >= now and count <= max_entries and size <= max_bytes:
+                break
+            self._remove(path)
+            count -= 1
+            size -= file_size
+
+    def version(self, tag):
+        return self._load(self._path(self.tags_dir, tag)) or 0
+
+    def incr(self, tag):
+        # A fresh unique value rather than a counter: a read-modify-write could lose a
+        # concurrent bump from another process, while two racing writes both yield a new version
+        value = uuid.uuid4().hex
+        path = self._path(self.tags_dir, tag)
+        self._write(path, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if self.tag_ttl:
+            # Tags not bumped for tag_ttl are forgotten, see the module docstring
+            cutoff = time.time() - self.tag_ttl
+            for bumped, _, stale in self._files(os.path.dirname(path)):
+                if bumped >= cutoff:
+                    break
+                self._remove(stale)
+        return value
+
+    def clear(self):
+        for shard in self.SHARDS:
+            directory = os.path.join(self.entries_dir, shard)
+            for name in os.listdir(directory):
+                self._remove(os.path.join(directory, name))
+
+
+class TaggedCache:
+    def __init__(self, backend, default_ttl=300):
+        self.backend = backend
+        self.default_ttl = default_ttl
+
+    def _versioned(self, key, tags):
+        versions = ','.join(f'{tag}={self.backend.version(tag)}' for tag in sorted(tags))
+        return f'{key}|{versions}'
+
+    def get(self, key, tags=()):
+        return self.backend.get(self._versioned(key, tags))
+
+    def _ttl(self, ttl):
+        # Never past default_ttl, the tag_ttl of the backend; see the module docstring
+        return min(ttl, self.default_ttl) if ttl and self.default_ttl else ttl or self.default_ttl
+
+    def set(self, key, value, tags=(), ttl=None):
+        self.backend.set(self._versioned(key, tags), value, self._ttl(ttl))
+
+    def get_or_set(self, key, tags, produce, ttl=None):
+        """Return the cached value for key, or produce, store and return it.
+
+        Tag versions are read before producing, so a commit that lands while
+        the value is being built leaves it filed under the superseded versions.
+        A produced None is returned but not stored.
+        """
+        full_key = self._versioned(key, tags)
+        value = self.backend.get(full_key)
+        if value is None:
+            value = produce()
+            if value is not None:
+                self.backend.set(full_key, value, self._ttl(ttl))
+        return value
+
+    def invalidate(self, tags):
+        for tag in set(tags):
+            self.backend.incr(tag)
+
+    def clear(self):
+        self.backend.clear()
+
+
+class NullCache(TaggedCache):
+    """Used when caching is disabled; every lookup misses."""
+
+    def __init__(self):
+        super().__init__(backend=None)
+
+    def get(self, key, tags=()):
+        return None
+
+    def set(self, key, value, tags=(), ttl=None):
+        pass
+
+    def get_or_set(self, key, tags, produce, ttl=None):
+        return produce()
+
+    def invalidate(self, tags):
+        pass
+
+    def clear(self):
+        pass
+
+
+def make_cache(config):
+    """Build the cache selected by CACHE_BACKEND from an app config mapping."""
+    if config['CACHE_BACKEND'] == 'none':
+        return NullCache()
+    if config['CACHE_BACKEND'] == 'filesystem':
+        backend = FileBackend(config['CACHE_DIR'], config['CACHE_MAX_ENTRIES'], config['CACHE_MAX_BYTES'],
+                              config['CACHE_DEFAULT_TTL'])
+    else:
+        backend = MemoryBackend(config['CACHE_MAX_ENTRIES'], config['CACHE_MAX_BYTES'], config['CACHE_DEFAULT_TTL'])
+    return TaggedCache(backend, config['CACHE_DEFAULT_TTL'])
@@ -0,0 +1,321 @@
+"""flask CLI commands: maintenance jobs and performance checks."""
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from importlib.metadata import PackageNotFoundError, version
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+
+from fleet import jobs, positions, transfer
+from fleet.analytics import rebuild_cost_buckets
+from fleet.cache import NullCache
+from fleet.extensions import db, score_refresher
+from fleet.models import PositionHistory, User, Vehicle
+from fleet.security import time_password_hash
+from fleet.services import (ANOMALY_CHUNK_SIZE, IMPORT_BATCH_SIZE, TRANSFER_MODELS, detect_fuel_anomalies,
+                            enqueue_job, geocode_worker, import_records, job_runner, prune_driver_score_history,
+                            refresh_driver_scores, schedule_due_maintenance)
+from fleet.summary import rebuild_fleet_summary
+
+# Distribution names; optional ones are only needed for some settings
+REQUIRED_PACKAGES = ['flask', 'flask-sqlalchemy', 'flask-login', 'flask-migrate', 'python-dotenv']
+OPTIONAL_PACKAGES = {'geopy': 'GEOCODER=nominatim'}
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@click.command('check-deps')
+def check_deps():
+    """Report installed versions of the required packages; fail if any is missing."""
+    missing = False
+    for package in REQUIRED_PACKAGES + list(OPTIONAL_PACKAGES):
+        try:
+            print(f'ok   {package} {version(package)}')
+        except PackageNotFoundError:
+            optional = package in OPTIONAL_PACKAGES
+            missing = missing or not optional
+            note = f' (optional, needed for {OPTIONAL_PACKAGES[package]})' if optional else ''
+            print(f"{'warn' if optional else 'FAIL'} {package} not installed{note}")
+    if missing:
+        print("Please run 'pip install -r requirements.txt' to install required packages")
+        sys.exit(1)
+
+@contextmanager
+def count_queries(engine=None):
+    """Collect the (SQL, parameters) of the statements executed on the engine inside the block.
+
+    Defaults to the current app's engine; pass one to count outside an app context.
+    """
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    engine = engine or db.engine
+    event.listen(engine, 'before_cursor_execute', _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', _record)
+
+# Maximum queries per request for list and detail views. The count must not grow with
+# row counts, so query-budget also checks it is the same at two data sizes
+QUERY_BUDGETS = {
+    '/maintenance': 3,
+    '/fuel-management': 8,
+    '/api/maintenance-alerts': 2,
+    '/vehicles': 2,
+    '/vehicle/1': 7,
+    '/vehicle-tracking': 2,
+    '/api/vehicle-locations': 4,
+}
+
+def budget_seed(vehicles):
+    """init_db arguments for a generated fleet of `vehicles` vehicles with drivers and records."""
+    return {'vehicles': vehicles, 'drivers': vehicles, 'maintenance': 10 * vehicles, 'fuel': 50 * vehicles,
+            'positions_per_vehicle': 10, 'seed': 1}
+
+def logged_in_client():
+    """A test client of the current app signed in as its first user."""
+    user = User.query.first()
+    if user is None:
+        print('No users found; run init_db.py first')
+        sys.exit(1)
+    client = current_app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+    return client
+
+def measure_query_counts(vehicles):
+    """Seed the current database with `vehicles` vehicles, then count each budgeted route's queries."""
+    sys.path.insert(0, ROOT)
+    import init_db
+    init_db.init_db(**budget_seed(vehicles))
+    client = logged_in_client()
+    counts = {}
+    for path in QUERY_BUDGETS:
+        client.get(path)  # warm up the per-process indexes and the user cache
+        with count_queries() as statements:
+            response = client.get(path)
+        counts[path] = [response.status_code, len(statements)]
+    return counts
+
+@click.command('query-budget')
+@click.option('--vehicles', default=20, show_default=True, help='size of the smaller generated fleet')
+@click.option('--measure', type=int, hidden=True)
+@with_appcontext
+def query_budget(vehicles, measure):
+    """Fail if a budgeted route exceeds its query budget or its count grows with the data.
+
+    Each size is seeded into a scratch database by a child process, with the
+    response cache off, so the app's own database is left alone.
+    """
+    if measure:
+        print(json.dumps(measure_query_counts(measure)))
+        return
+    sizes = (vehicles, 10 * vehicles)
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'budget.db')}",
+                       CACHE_BACKEND='none', GEOCODER='none', JOB_WORKER='off', JOB_PERIODIC='')
+            output = subprocess.run([sys.executable, '-m', 'flask', 'query-budget', '--measure', str(size)],
+                                    env=env, check=True, stdout=subprocess.PIPE, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    failed = False
+    for path, budget in QUERY_BUDGETS.items():
+        (small_status, small), (large_status, large) = (result[path] for result in results)
+        ok = small_status == large_status == 200 and small == large and large <= budget
+        failed = failed or not ok
+        print(f"{'ok' if ok else 'FAIL':4} {path}: {small} queries at {sizes[0]} vehicles, {large} at {sizes[1]} "
+              f"(budget {budget}), status {small_status}/{large_status}")
+    if failed:
+        sys.exit(1)
+
+@click.command('benchmark-password-hash')
+@click.option('--target-ms', default=250.0, show_default=True, help='login latency to aim for')
+@with_appcontext
+def benchmark_password_hash(target_ms):
+    """Time PASSWORD_HASH_METHOD here and suggest the pbkdf2 iterations that take about --target-ms."""
+    method = current_app.config['PASSWORD_HASH_METHOD']
+    seconds = time_password_hash(method)
+    print(f'{method}: {seconds * 1000:.0f} ms per hash')
+    parts = method.split(':')
+    if len(parts) != 3 or parts[0] != 'pbkdf2' or not parts[2].isdigit():
+        print('Set PASSWORD_HASH_METHOD to pbkdf2:<hash>:<iterations> for a suggestion')
+        return
+    # Cost is linear in the iteration count; rounded to tens of thousands
+    iterations = max(int(int(parts[2]) * target_ms / (seconds * 1000)) // 10000 * 10000, 10000)
+    print(f'PASSWORD_HASH_METHOD=pbkdf2:{parts[1]}:{iterations} takes about {target_ms:.0f} ms')
+
+@click.command('downsample-positions')
+@with_appcontext
+def downsample_positions():
+    """Collapse aged position history into coarser tiers and apply retention."""
+    collapsed = positions.downsample(db.session, PositionHistory.__table__)
+    for resolution, count in collapsed.items():
+        print(f'{resolution}: {count} rows')
+
+@click.command('geocode-vehicles')
+@with_appcontext
+def geocode_vehicles():
+    """Fill in current_location for every vehicle with coordinates, in rate-limited batches."""
+    worker = geocode_worker()
+    if worker is None:
+        print('Geocoding is disabled (GEOCODER=none)')
+        return
+    rows = db.session.query(Vehicle.id, Vehicle.latitude, Vehicle.longitude) \
+        .filter(Vehicle.latitude.isnot(None), Vehicle.longitude.isnot(None)).all()
+    resolved = 0
+    for i in range(0, len(rows), worker.batch_size):
+        resolved += len(worker.run_batch(rows[i:i + worker.batch_size]))
+    print(f'Resolved {resolved} of {len(rows)} vehicles')
+
+@click.command('score-drivers')
+@with_appcontext
+def score_drivers():
+    """Rescore every driver from recent telemetry and fuel records."""
+    print(f'Scored {refresh_driver_scores()} drivers')
+
+@click.command('prune-score-history')
+@with_appcontext
+def prune_score_history():
+    """Delete driver score snapshots past the history retention."""
+    print(f'Deleted {prune_driver_score_history()} score snapshots')
+
+@click.command('rebuild-summary')
+@with_appcontext
+def rebuild_summary():
+    """Recompute the dashboard rollups and per-vehicle cost buckets from the base tables."""
+    rebuild_fleet_summary()
+    rebuild_cost_buckets()
+    print('Fleet summary and cost buckets rebuilt')
+
+@click.command('import-records')
+@click.argument('name', type=click.Choice(list(TRANSFER_MODELS)))
+@click.argument('source', type=click.Path(dir_okay=False, allow_dash=True))
+@click.option('--format', 'fmt', type=click.Choice(transfer.FORMATS), help='defaults to the file extension, else csv')
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True, help='rows per transaction')
+@with_appcontext
+def import_records_command(name, source, fmt, batch_size):
+    """Bulk insert CSV or NDJSON rows from SOURCE ('-' for stdin); fail if any row is rejected."""
+    fmt = fmt or transfer.detect_format(source)
+    raw = sys.stdin.buffer if source == '-' else open(source, 'rb')
+    # newline='' lets the csv module handle line breaks inside quoted fields
+    with io.TextIOWrapper(raw, encoding='utf-8-sig', newline='') as stream:
+        try:
+            report = import_records(name, transfer.read_records(stream, fmt, transfer.FIELDS[name]), batch_size)
+        except ValueError as e:
+            print(f'Import failed: {e}')
+            sys.exit(1)
+    # Rescore the drivers of imported fuel records now instead of after the refresher delay
+    score_refresher.flush()
+    for rejected in report['rejected']:
+        print(f"line {rejected['line']}: {rejected['error']}")
+    print(f"Inserted {report['inserted']} of {report['received']} rows, rejected {report['rejected_count']}")
+    if report['rejected_count']:
+        sys.exit(1)
+
+@click.command('detect-fuel-anomalies')
+@click.option('--chunk-size', default=ANOMALY_CHUNK_SIZE, show_default=True, help='fuel record ids per pass')
+@click.option('--rescan', is_flag=True, help='forget earlier results and check every record again')
+@with_appcontext
+def detect_fuel_anomalies_command(chunk_size, rescan):
+    """Flag suspicious refuels among the fuel records added since the last run."""
+    scanned, flagged = detect_fuel_anomalies(chunk_size, rescan)
+    print(f'Checked {scanned} fuel records, flagged {flagged} anomalies')
+
+@click.command('schedule-maintenance')
+@click.option('--horizon-days', default=14, show_default=True, help='schedule services predicted within this many days')
+@with_appcontext
+def schedule_maintenance_command(horizon_days):
+    """Book a scheduled service for every vehicle predicted due soon that has none open."""
+    print(f'Scheduled {schedule_due_maintenance(horizon_days)} services')
+
+@click.command('run-jobs')
+@click.option('--until-idle', is_flag=True, help='exit once no job is due or running instead of polling forever')
+@with_appcontext
+def run_jobs(until_idle):
+    """Run the background job dispatcher in the foreground, e.g. as a worker beside JOB_WORKER=off web processes."""
+    runner = job_runner()
+    print(f"Running jobs as {runner.worker_id}: {', '.join(sorted(jobs.TASKS))}")
+    try:
+        runner.run(until_idle=until_idle)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.stop()
+
+@click.command('enqueue-job')
+@click.argument('kind')
+@click.option('--args', 'args', default='{}', help='keyword arguments as a JSON object')
+@click.option('--dedup-key', help='return the queued or running job with this key instead of adding one')
+@with_appcontext
+def enqueue_job_command(kind, args, dedup_key):
+    """Queue a background job for the dispatcher."""
+    try:
+        job = enqueue_job(kind, json.loads(args), dedup_key=dedup_key)
+    except ValueError as e:
+        print(f"{e}; known kinds: {', '.join(sorted(jobs.TASKS))}")
+        sys.exit(1)
+    print(f'Job {job.id} ({job.kind}) is {job.status}')
+
+# Routes whose statements explain-hot-queries checks: the budgeted ones and the filtered lists
+HOT_ROUTES = list(QUERY_BUDGETS) + [
+    '/fuel-management?vehicle_id=1',
+    '/fuel-management?driver_id=1',
+    '/api/maintenance-records?vehicle_id=1',
+    '/api/vehicles?status=active',
+]
+# Routes that read every vehicle by design: the id-ordered fleet list and the map
+FULL_SCAN_ROUTES = {'/vehicles', '/vehicle-tracking', '/api/vehicle-locations'}
+
+def hot_queries():
+    """The distinct SELECT statements the hot routes execute, with the parameters first seen."""
+    client = logged_in_client()
+    current_app.extensions['response_cache'] = NullCache()
+    queries = {}
+    for path in HOT_ROUTES:
+        client.get(path)  # warm up the per-process indexes and the user cache
+        with count_queries() as statements:
+            client.get(path)
+        for statement, parameters in statements:
+            if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+                queries.setdefault(statement, (path, parameters))
+    return queries
+
+def explain_query_plan(statement, parameters):
+    """Return the SQLite EXPLAIN QUERY PLAN detail lines for a statement."""
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, tuple(parameters)).fetchall()
+    return [row[-1] for row in rows]
+
+@click.command('explain-hot-queries')
+@with_appcontext
+def explain_hot_queries():
+    """Fail if a statement run by a hot route falls back to a full table scan."""
+    failed = False
+    tables = set(db.metadata.tables)
+    for statement, (path, parameters) in hot_queries().items():
+        plan = explain_query_plan(statement, parameters)
+        # "SCAN <table>" without an index is a full table scan; subqueries scan their own results
+        full_scans = [step for step in plan if step.startswith('SCAN') and 'USING' not in step
+                      and step.split()[1] in tables and path not in FULL_SCAN_ROUTES]
+        failed = failed or bool(full_scans)
+        print(f"{'FAIL' if full_scans else 'ok':4} {path}: {' '.join(statement.split())[:120]}")
+        print(f"     {'; '.join(plan)}")
+    if failed:
+        sys.exit(1)
+
+def init_app(app):
+    for command in (check_deps, query_budget, downsample_positions, geocode_vehicles, score_drivers,
+                    prune_score_history, rebuild_summary, explain_hot_queries, import_records_command,
+                    detect_fuel_anomalies_command, schedule_maintenance_command, run_jobs, enqueue_job_command,
+                    benchmark_password_hash):
+        app.cli.add_command(command)
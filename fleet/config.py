@@ -0,0 +1,55 @@
+"""Application settings, read from the environment (and .env, loaded by create_app)."""
+import os
+
+from fleet.database import config_from_env
+
+
+def from_env(instance_path, environ=os.environ):
+    config = {
+        'SECRET_KEY': environ.get('SECRET_KEY', 'your-secret-key'),  # In production, use a secure secret key
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        # Reverse geocoding provider for Vehicle.current_location: 'none' (default), 'stub' or
+        # 'nominatim', which sends vehicle positions to OpenStreetMap and so is opt-in
+        'GEOCODER': environ.get('GEOCODER', 'none'),
+        'GEOCODER_USER_AGENT': environ.get('GEOCODER_USER_AGENT', 'fleet-management'),
+        # Seconds between provider calls; Nominatim's usage policy allows one per second
+        'GEOCODER_MIN_INTERVAL': float(environ.get('GEOCODER_MIN_INTERVAL', '1.0')),
+        # Slot file that spaces provider calls across every process on the host
+        'GEOCODER_RATE_FILE': environ.get('GEOCODER_RATE_FILE', os.path.join(instance_path, 'geocoder.slot')),
+        # Page and API response cache: 'filesystem' (shared by every process on the host), 'memory'
+        # (per process, so only for a single process: writes elsewhere never reach it) or 'none'
+        'CACHE_BACKEND': environ.get('CACHE_BACKEND', 'filesystem'),
+        'CACHE_DIR': environ.get('CACHE_DIR', os.path.join(instance_path, 'cache')),
+        'CACHE_DEFAULT_TTL': int(environ.get('CACHE_DEFAULT_TTL', '300')),
+        # Size limits of the memory backend, and of the entries directory of the filesystem one
+        'CACHE_MAX_ENTRIES': int(environ.get('CACHE_MAX_ENTRIES', '1024')),
+        'CACHE_MAX_BYTES': int(environ.get('CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+        # werkzeug hash method for new passwords, as pbkdf2:<hash>:<iterations>; time it with
+        # `flask benchmark-password-hash`. Stored hashes with other parameters are redone at login.
+        'PASSWORD_HASH_METHOD': environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000'),
+        # Logged-in users cached per process by load_user; 0 disables the cache
+        'USER_CACHE_TTL': int(environ.get('USER_CACHE_TTL', '60')),
+        'USER_CACHE_MAX_ENTRIES': int(environ.get('USER_CACHE_MAX_ENTRIES', '1024')),
+        # Lifetime in seconds of the bearer tokens issued by POST /api/tokens
+        'API_TOKEN_MAX_AGE': int(environ.get('API_TOKEN_MAX_AGE', '3600')),
+        # Request metrics on /metrics: 'off', 'basic' (cheap enough for production) or 'full'
+        'INSTRUMENTATION': environ.get('INSTRUMENTATION', 'off'),
+        # Requests sending this value in X-Profile are profiled with cProfile; empty disables profiling
+        'PROFILE_TOKEN': environ.get('PROFILE_TOKEN', ''),
+        # Bearer token required by /metrics when set
+        'METRICS_TOKEN': environ.get('METRICS_TOKEN', ''),
+        # Background jobs: 'off' (default) leaves them to a `flask run-jobs` worker, 'on' also runs a
+        # dispatcher, with its own process pool, in every web process
+        'JOB_WORKER': environ.get('JOB_WORKER', 'off'),
+        'JOB_THREADS': int(environ.get('JOB_THREADS', '4')),
+        'JOB_PROCESSES': int(environ.get('JOB_PROCESSES', '2')),
+        'JOB_POLL_INTERVAL': float(environ.get('JOB_POLL_INTERVAL', '1.0')),
+        # Running jobs whose worker has not checked in for this long are requeued
+        'JOB_LEASE_SECONDS': int(environ.get('JOB_LEASE_SECONDS', '60')),
+        # Job kinds run periodically, as kind=seconds between the end of one run and the next. Every
+        # kind writes data (anomaly rows, predicted services, downsampled positions), so none is on by default
+        'JOB_PERIODIC': environ.get('JOB_PERIODIC', ''),
+    }
+    # DATABASE_URL, pool sizes and SQLite pragmas; see fleet/database.py
+    config.update(config_from_env(environ))
+    return config
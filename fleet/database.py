@@ -0,0 +1,147 @@
+"""Database engine profile: SQLite pragmas, pool sizing and read/write routing.
+
+Flask-SQLAlchemy 2.5 gives file-backed SQLite a NullPool and default
+pragmas, so every request opens a fresh connection in rollback-journal mode
+where a writer blocks all readers. The Database subclass below keeps a
+connection pool, switches the file to WAL and can send the queries of
+read-only views to a separate pool of read-only connections.
+"""
+import os
+import threading
+from functools import wraps
+
+from flask import g, has_app_context
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import create_engine, event, orm
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+def config_from_env(environ=os.environ):
+    """Engine settings for app.config, read from the environment (and so from .env)."""
+    return {
+        'SQLALCHEMY_DATABASE_URI': environ.get('DATABASE_URL', 'sqlite:///fleet.db'),
+        # One connection per worker thread plus background threads; overflow covers bursts
+        'DB_POOL_SIZE': int(environ.get('DB_POOL_SIZE', '10')),
+        'DB_MAX_OVERFLOW': int(environ.get('DB_MAX_OVERFLOW', '10')),
+        'DB_POOL_TIMEOUT': float(environ.get('DB_POOL_TIMEOUT', '30')),
+        'DB_READ_SPLIT': environ.get('DB_READ_SPLIT', '0').lower() in ('1', 'true', 'yes'),
+        'SQLITE_JOURNAL_MODE': environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'SQLITE_SYNCHRONOUS': environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'SQLITE_MMAP_SIZE': int(environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+        'SQLITE_CACHE_SIZE_KB': int(environ.get('SQLITE_CACHE_SIZE_KB', '65536')),
+        'SQLITE_BUSY_TIMEOUT_MS': int(environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    }
+
+
+def is_sqlite_file(url):
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def sqlite_pragmas(config):
+    return {
+        'journal_mode': config['SQLITE_JOURNAL_MODE'],
+        'synchronous': config['SQLITE_SYNCHRONOUS'],
+        'mmap_size': config['SQLITE_MMAP_SIZE'],
+        # Negative values are KiB rather than pages
+        'cache_size': -config['SQLITE_CACHE_SIZE_KB'],
+        'busy_timeout': config['SQLITE_BUSY_TIMEOUT_MS'],
+        'temp_store': 'MEMORY',
+    }
+
+
+def pool_options(config):
+    return {
+        # SQLAlchemy 1.4 picks NullPool for file-backed SQLite unless told otherwise
+        'poolclass': QueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        # Pooled connections are handed between request threads
+        'connect_args': {'check_same_thread': False, 'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000},
+    }
+
+
+def install_pragmas(engine, pragmas):
+    """Run the pragmas on every new DBAPI connection of engine."""
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def create_reader(url, config):
+    """Engine over the same SQLite file opened read-only, for read-only views."""
+    path = make_url(url).database
+    engine = create_engine(f'sqlite:///file:{path}?mode=ro&uri=true', **pool_options(config))
+    pragmas = sqlite_pragmas(config)
+    # The journal mode belongs to the file and can only be changed by a writer
+    del pragmas['journal_mode']
+    pragmas['query_only'] = 'ON'
+    install_pragmas(engine, pragmas)
+    return engine
+
+
+def read_only(view):
+    """Mark a view as read-only so its queries may use the read pool."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(SignallingSession):
+    """Session that reads through the read pool inside read-only views."""
+
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if not self._flushing and has_app_context() and g.get('db_read_only'):
+            reader = self.db.read_engine
+            if reader is not None:
+                return reader
+        return super().get_bind(mapper, clause)
+
+
+class Database(SQLAlchemy):
+    def __init__(self, *args, **kwargs):
+        self._readers = {}
+        self._readers_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def init_app(self, app):
+        if is_sqlite_file(app.config['SQLALCHEMY_DATABASE_URI']):
+            options = pool_options(app.config)
+            options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+        super().init_app(app)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def create_engine(self, sa_url, engine_opts):
+        engine = super().create_engine(sa_url, engine_opts)
+        if is_sqlite_file(sa_url):
+            install_pragmas(engine, sqlite_pragmas(self.get_app().config))
+        return engine
+
+    @property
+    def read_engine(self):
+        """The read-only engine for the current database, or None when not split."""
+        app = self.get_app()
+        if not app.config.get('DB_READ_SPLIT'):
+            return None
+        url = self.engine.url
+        if not is_sqlite_file(url):
+            return None
+        with self._readers_lock:
+            reader = self._readers.get(url.database)
+            if reader is None:
+                reader = self._readers[url.database] = create_reader(url, app.config)
+            return reader
@@ -0,0 +1,61 @@
+"""Extension instances shared by the blueprints, bound to an app in create_app."""
+from flask import current_app
+from flask_login import LoginManager
+from werkzeug.local import LocalProxy
+
+from fleet.database import Database
+from fleet.geofences import GeofenceIndex
+from fleet.instrumentation import Instrumentation
+from fleet.pubsub import Hub
+from fleet.schedule import DueQueue
+from fleet.spatial import GridIndex
+
+
+class LazyMigrate:
+    """Registers Flask-Migrate the first time app.extensions['migrate'] is used.
+
+    Importing Flask-Migrate loads Alembic, which only the `flask db` commands
+    and migrations/env.py need; web workers never touch the entry.
+    """
+
+    def __init__(self, db, **kwargs):
+        self.db = db
+        self.kwargs = kwargs
+
+    def init_app(self, app):
+        app.extensions['migrate'] = _PendingMigrate(app, self.db, self.kwargs)
+
+
+class _PendingMigrate:
+    def __init__(self, app, db, kwargs):
+        self.app = app
+        self.db = db
+        self.kwargs = kwargs
+
+    def __getattr__(self, name):
+        from flask_migrate import Migrate
+        # Replaces this placeholder in app.extensions with Flask-Migrate's own config
+        Migrate(self.app, self.db, **self.kwargs)
+        return getattr(self.app.extensions['migrate'], name)
+
+
+db = Database()
+migrate = LazyMigrate(db, render_as_batch=True)
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+instrumentation = Instrumentation()
+
+# Live event fan-out for /api/stream
+event_hub = Hub()
+# Grid index over Vehicle.latitude/longitude, shared by the requests of this process
+vehicle_index = GridIndex()
+# Grid index over Geofence bounding boxes, see fleet.services.synced_geofence_index
+geofence_index = GeofenceIndex()
+# Predicted service due dates per vehicle, see fleet.services.synced_due_queue
+due_queue = DueQueue()
+
+# Per-app objects built by create_app from its config
+response_cache = LocalProxy(lambda: current_app.extensions['response_cache'])
+score_refresher = LocalProxy(lambda: current_app.extensions['score_refresher'])
+user_cache = LocalProxy(lambda: current_app.extensions['user_cache'])
+token_signer = LocalProxy(lambda: current_app.extensions['token_signer'])
@@ -0,0 +1,59 @@
+"""Application factory."""
+import os
+
+from flask import Flask, render_template
+
+from fleet.cache import make_cache
+from fleet.config import from_env
+from fleet.extensions import db, instrumentation, login_manager, migrate
+from fleet.security import TokenSigner, UserCache
+
+# Templates, static files and the default SQLite database live in the project root
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def create_app(config=None):
+    """Build the app; config overrides the settings read from the environment."""
+    if os.path.exists('.env'):
+        from dotenv import load_dotenv
+        load_dotenv()
+
+    app = Flask(__name__, root_path=PROJECT_ROOT)
+    app.config.update(from_env(app.instance_path))
+    app.config.update(config or {})
+
+    db.init_app(app)
+    migrate.init_app(app)
+    login_manager.init_app(app)
+    instrumentation.init_app(app)
+
+    # Imported here so the session hooks and models register before first use
+    from fleet import analytics, commands, invalidation, summary, tasks  # noqa: F401
+    from fleet.services import job_runner, make_score_refresher
+    from fleet.views import api, auth, dashboard, drivers, fuel, maintenance, tracking, vehicles
+
+    app.extensions['response_cache'] = make_cache(app.config)
+    app.extensions['score_refresher'] = make_score_refresher(app)
+    app.extensions['user_cache'] = UserCache(app.config['USER_CACHE_MAX_ENTRIES'], app.config['USER_CACHE_TTL'])
+    app.extensions['token_signer'] = TokenSigner(app.config['SECRET_KEY'], app.config['API_TOKEN_MAX_AGE'])
+
+    for module in (auth, dashboard, vehicles, drivers, fuel, maintenance, tracking, api):
+        app.register_blueprint(module.bp)
+    commands.init_app(app)
+
+    if app.config['JOB_WORKER'] == 'on':
+        # Started by the first request, so CLI commands and imports of the app spawn no threads
+        @app.before_request
+        def start_job_runner():
+            job_runner().start()
+
+    @app.errorhandler(404)
+    def not_found_error(error):
+        return render_template('404.html'), 404
+
+    @app.errorhandler(500)
+    def internal_error(error):
+        db.session.rollback()
+        return render_template('500.html'), 500
+
+    return app
@@ -0,0 +1,240 @@
+"""Cached, rate-limited reverse geocoding for vehicle positions.
+
+Lookups are keyed on coordinates rounded to `precision` decimal places
+(3 places is roughly 100 m), checked in an in-memory LRU, then in a
+persistent store, and only then sent to the provider. Concurrent lookups of
+the same key share one provider call.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: FileRateLimiter is unavailable, see make_rate_limiter
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRECISION = 3
+DEFAULT_TTL = timedelta(days=30)
+
+
+def cache_key(lat, lon, precision=DEFAULT_PRECISION):
+    return f'{lat:.{precision}f},{lon:.{precision}f}'
+
+
+class StubGeocoder:
+    """Offline geocoder for development and tests; never touches the network."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def reverse(self, lat, lon):
+        self.calls += 1
+        return f'Near {lat:.3f}, {lon:.3f}'
+
+
+class NominatimGeocoder:
+    """OpenStreetMap Nominatim via geopy, imported only when this provider is used."""
+
+    def __init__(self, user_agent, timeout=10):
+        from geopy.geocoders import Nominatim
+        self.client = Nominatim(user_agent=user_agent, timeout=timeout)
+
+    def reverse(self, lat, lon):
+        location = self.client.reverse((lat, lon), exactly_one=True)
+        return location.address if location else None
+
+
+class RateLimiter:
+    """Spaces calls at least `min_interval` seconds apart across threads."""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.min_interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class FileRateLimiter:
+    """RateLimiter shared by every process on the host: the next free slot lives in a file under flock."""
+
+    def __init__(self, path, min_interval):
+        self.path = path
+        self.min_interval = min_interval
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def acquire(self):
+        # Each call opens its own descriptor, so threads of one process queue on the lock too
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                next_slot = float(os.read(fd, 64) or 0)
+            except ValueError:
+                next_slot = 0.0
+            now = time.time()
+            wait = next_slot - now
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, repr(max(now, next_slot) + self.min_interval).encode())
+        finally:
+            os.close(fd)
+        if wait > 0:
+            time.sleep(wait)
+
+
+def make_rate_limiter(min_interval, path=None):
+    """A limiter shared through path where flock exists, else one for this process only."""
+    if path and fcntl is not None:
+        return FileRateLimiter(path, min_interval)
+    return RateLimiter(min_interval)
+
+
+class LRUCache:
+    """Thread-safe LRU with a per-entry time to live."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl.total_seconds()
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+class ReverseGeocoder:
+    """Memory cache, persistent store and provider, with request coalescing.
+
+    `store` needs get(key, max_age) -> (address,) or None and put(key, address).
+    A provider answer of None is cached too, so empty areas are not re-asked.
+    """
+
+    def __init__(self, provider, store=None, maxsize=10000, ttl=DEFAULT_TTL,
+                 min_interval=1.0, precision=DEFAULT_PRECISION, limiter=None):
+        self.provider = provider
+        self.store = store
+        self.ttl = ttl
+        self.precision = precision
+        self.memory = LRUCache(maxsize, ttl)
+        self.limiter = limiter or RateLimiter(min_interval)
+        self.lock = threading.Lock()
+        self.in_flight = {}
+
+    def lookup(self, lat, lon):
+        key = cache_key(lat, lon, self.precision)
+        hit = self.memory.get(key)
+        if hit is not None:
+            return hit[0]
+
+        with self.lock:
+            waiter = self.in_flight.get(key)
+            leader = waiter is None
+            if leader:
+                waiter = self.in_flight[key] = {'done': threading.Event(), 'address': None}
+        if not leader:
+            waiter['done'].wait()
+            return waiter['address']
+
+        try:
+            address = self._resolve(key, lat, lon)
+            waiter['address'] = address
+            return address
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            waiter['done'].set()
+
+    def _resolve(self, key, lat, lon):
+        stored = self.store.get(key, self.ttl) if self.store is not None else None
+        if stored is not None:
+            self.memory.put(key, stored[0])
+            return stored[0]
+        self.limiter.acquire()
+        try:
+            address = self.provider.reverse(lat, lon)
+        except Exception as e:
+            # Provider failures are not cached so the next ping retries
+            logger.warning(f'Reverse geocoding {key} failed: {e}')
+            return None
+        self.memory.put(key, address)
+        if self.store is not None:
+            self.store.put(key, address)
+        return address
+
+
+class GeocodeWorker:
+    """Background thread that resolves vehicle positions in batches.
+
+    Only the newest position per vehicle is kept while it waits. Resolved
+    addresses are passed to `apply` as a list of (vehicle_id, address).
+    """
+
+    def __init__(self, geocoder, apply, batch_size=50):
+        self.geocoder = geocoder
+        self.apply = apply
+        self.batch_size = batch_size
+        self.pending = OrderedDict()
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def submit(self, vehicle_id, lat, lon):
+        with self.condition:
+            self.pending.pop(vehicle_id, None)
+            self.pending[vehicle_id] = (lat, lon)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='geocode-worker', daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def _next_batch(self):
+        with self.condition:
+            while not self.pending:
+                self.condition.wait()
+            batch = []
+            while self.pending and len(batch) < self.batch_size:
+                vehicle_id, (lat, lon) = self.pending.popitem(last=False)
+                batch.append((vehicle_id, lat, lon))
+            return batch
+
+    def run_batch(self, batch):
+        resolved = [(vehicle_id, self.geocoder.lookup(lat, lon)) for vehicle_id, lat, lon in batch]
+        resolved = [(vehicle_id, address) for vehicle_id, address in resolved if address]
+        if resolved:
+            self.apply(resolved)
+        return resolved
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self.run_batch(batch)
+            except Exception as e:
+                logger.error(f'Geocode batch failed: {e}')
@@ -0,0 +1,185 @@
+"""Geofence shapes, a grid index over their bounding boxes and enter/exit detection.
+
+A fence is a circle (centre and radius in km) or a polygon of lat/lon
+vertices. The index buckets each fence into the grid cells its bounding box
+covers, so a ping is only tested against the few fences near it; fences
+spanning more than MAX_FENCE_CELLS cells are kept on a short list that every
+ping checks by bounding box instead.
+"""
+import math
+import threading
+
+from fleet.spatial import KM_PER_DEGREE, haversine_km
+
+KINDS = ('circle', 'polygon')
+CELL_SIZE = 0.1
+MAX_FENCE_CELLS = 2500
+MAX_VERTICES = 1000
+MAX_RADIUS_KM = 1000.0
+
+
+def _coordinate(value, low, high, name):
+    if isinstance(value, bool):
+        raise ValueError(f'{name} must be a number')
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a number')
+    if not low <= value <= high:
+        raise ValueError(f'{name} must be between {low} and {high}')
+    return value
+
+
+def parse_geometry(kind, geometry):
+    """Validate a fence's geometry and return it normalized; raises ValueError.
+
+    Circles are {"lat", "lon", "radius_km"}; polygons are {"points": [[lat, lon], ...]}
+    with at least three vertices, not crossing the antimeridian.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+    if not isinstance(geometry, dict):
+        raise ValueError('geometry must be an object')
+    if kind == 'circle':
+        return {
+            'lat': _coordinate(geometry.get('lat'), -90, 90, 'lat'),
+            'lon': _coordinate(geometry.get('lon'), -180, 180, 'lon'),
+            'radius_km': _coordinate(geometry.get('radius_km'), 0.001, MAX_RADIUS_KM, 'radius_km')
+        }
+    points = geometry.get('points')
+    if not isinstance(points, list) or not 3 <= len(points) <= MAX_VERTICES:
+        raise ValueError(f'points must be a list of 3 to {MAX_VERTICES} [lat, lon] pairs')
+    parsed = []
+    for point in points:
+        if not isinstance(point, (list, tuple)) or len(point) != 2:
+            raise ValueError('points must be [lat, lon] pairs')
+        parsed.append([_coordinate(point[0], -90, 90, 'lat'), _coordinate(point[1], -180, 180, 'lon')])
+    lons = [lon for _, lon in parsed]
+    if max(lons) - min(lons) >= 180:
+        raise ValueError('polygons may not span 180 degrees of longitude')
+    return {'points': parsed}
+
+
+def bounding_box(kind, geometry):
+    """(min_lat, min_lon, max_lat, max_lon); min_lon > max_lon when a circle crosses the antimeridian."""
+    if kind == 'circle':
+        lat, lon, radius = geometry['lat'], geometry['lon'], geometry['radius_km']
+        dlat = radius / KM_PER_DEGREE
+        if abs(lat) + dlat >= 90:
+            return max(lat - dlat, -90.0), -180.0, min(lat + dlat, 90.0), 180.0
+        dlon = radius / (KM_PER_DEGREE * math.cos(math.radians(abs(lat) + dlat)))
+        if dlon >= 180:
+            return lat - dlat, -180.0, lat + dlat, 180.0
+        return lat - dlat, (lon - dlon + 180) % 360 - 180, lat + dlat, (lon + dlon + 180) % 360 - 180
+    lats = [lat for lat, _ in geometry['points']]
+    lons = [lon for _, lon in geometry['points']]
+    return min(lats), min(lons), max(lats), max(lons)
+
+
+class Fence:
+    """A compiled fence: its bounding box plus a containment test."""
+    __slots__ = ('id', 'kind', 'min_lat', 'min_lon', 'max_lat', 'max_lon', 'lat', 'lon', 'radius_km', 'edges')
+
+    def __init__(self, fence_id, kind, geometry):
+        self.id = fence_id
+        self.kind = kind
+        self.min_lat, self.min_lon, self.max_lat, self.max_lon = bounding_box(kind, geometry)
+        if kind == 'circle':
+            self.lat, self.lon, self.radius_km = geometry['lat'], geometry['lon'], geometry['radius_km']
+            self.edges = None
+        else:
+            points = geometry['points']
+            self.edges = [(points[i - 1][0], points[i - 1][1], lat, lon) for i, (lat, lon) in enumerate(points)]
+
+    def in_box(self, lat, lon):
+        if not self.min_lat <= lat <= self.max_lat:
+            return False
+        if self.min_lon <= self.max_lon:
+            return self.min_lon <= lon <= self.max_lon
+        return lon >= self.min_lon or lon <= self.max_lon
+
+    def contains(self, lat, lon):
+        if not self.in_box(lat, lon):
+            return False
+        if self.edges is None:
+            return haversine_km(self.lat, self.lon, lat, lon) <= self.radius_km
+        # Even-odd ray casting along the latitude line through the point
+        inside = False
+        for lat1, lon1, lat2, lon2 in self.edges:
+            if (lat1 > lat) != (lat2 > lat) and lon < lon1 + (lat - lat1) * (lon2 - lon1) / (lat2 - lat1):
+                inside = not inside
+        return inside
+
+
+class GeofenceIndex:
+    """Grid of cell -> fences whose bounding box overlaps the cell.
+
+    The whole index is rebuilt when the fences change, which is rare next to
+    pings, and swapped in as one tuple, so lookups need no lock.
+    """
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.columns = int(round(360 / cell_size))
+        self.lock = threading.Lock()
+        self.state = ({}, {}, ())
+        # Fence count and newest updated_at loaded, see fleet.services.synced_geofence_index
+        self.version = None
+
+    def __len__(self):
+        return len(self.state[0])
+
+    def _wrap(self, col):
+        half = self.columns // 2
+        return (col + half) % self.columns - half
+
+    def _column_range(self, min_lon, max_lon):
+        low, high = (int(math.floor(lon / self.cell_size)) for lon in (min_lon, max_lon))
+        if min_lon > max_lon:
+            high += self.columns
+        return range(low, high + 1)
+
+    def replace(self, fences):
+        """Index the given Fence objects in place of the current ones."""
+        by_id, cells, large = {}, {}, []
+        for fence in fences:
+            by_id[fence.id] = fence
+            rows = range(int(math.floor(fence.min_lat / self.cell_size)),
+                         int(math.floor(fence.max_lat / self.cell_size)) + 1)
+            cols = self._column_range(fence.min_lon, fence.max_lon)
+            if len(rows) * len(cols) > MAX_FENCE_CELLS:
+                large.append(fence)
+                continue
+            for row in rows:
+                for col in cols:
+                    cells.setdefault((row, self._wrap(col)), []).append(fence)
+        with self.lock:
+            self.state = (by_id, cells, tuple(large))
+
+    def containing(self, lat, lon):
+        """Ids of the fences that contain the point."""
+        _, cells, large = self.state
+        cell = (int(math.floor(lat / self.cell_size)), self._wrap(int(math.floor(lon / self.cell_size))))
+        inside = {fence.id for fence in cells.get(cell, ()) if fence.contains(lat, lon)}
+        inside.update(fence.id for fence in large if fence.contains(lat, lon))
+        return inside
+
+
+def transitions(index, state, pings):
+    """Enter and exit events for pings in time order, as (vehicle_id, fence_id, kind, ping).
+
+    state maps vehicle id to the set of fence ids it is inside and is
+    updated in place. Fences that are no longer indexed are dropped from a
+    vehicle's state without an exit event.
+    """
+    fences = index.state[0]
+    events = []
+    for ping in pings:
+        vehicle_id = ping['vehicle_id']
+        before = {fence_id for fence_id in state.get(vehicle_id, ()) if fence_id in fences}
+        after = index.containing(ping['latitude'], ping['longitude'])
+        if after != before:
+            events.extend((vehicle_id, fence_id, 'exit', ping) for fence_id in sorted(before - after))
+            events.extend((vehicle_id, fence_id, 'enter', ping) for fence_id in sorted(after - before))
+        state[vehicle_id] = after
+    return events
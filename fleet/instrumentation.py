@@ -0,0 +1,228 @@
+"""Opt-in request instrumentation with a Prometheus text endpoint.
+
+'basic' mode keeps per-endpoint latency histograms and SQL query counts and
+time; each request costs a few clock reads and dict updates, so it is meant
+to stay on in production. 'full' mode adds template render times and a list
+of the slowest statements. A single request can be profiled with cProfile by
+sending the configured token in the X-Profile header.
+"""
+import cProfile
+import heapq
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from flask import Response, abort, g, has_request_context, jsonify, request
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+MODES = ('off', 'basic', 'full')
+# Upper bounds in seconds, as Prometheus expects
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_STATEMENTS = 20
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Thread-safe counters and histograms keyed by label values."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}         # (endpoint, method, status) -> count
+        self.latency = {}          # (endpoint, method) -> Histogram
+        self.queries = {}          # endpoint -> [count, seconds]
+        self.templates = {}        # template -> [count, seconds]
+        self.slowest = []          # min-heap of (seconds, statement, endpoint, at)
+
+    def observe_request(self, endpoint, method, status, seconds, queries, query_seconds):
+        with self.lock:
+            key = (endpoint, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.latency.get((endpoint, method))
+            if histogram is None:
+                histogram = self.latency[(endpoint, method)] = Histogram()
+            histogram.observe(seconds)
+            totals = self.queries.setdefault(endpoint, [0, 0.0])
+            totals[0] += queries
+            totals[1] += query_seconds
+
+    def observe_template(self, name, seconds):
+        with self.lock:
+            totals = self.templates.setdefault(name, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+    def observe_statement(self, statement, seconds, endpoint):
+        with self.lock:
+            if len(self.slowest) < SLOW_STATEMENTS:
+                heapq.heappush(self.slowest, (seconds, statement, endpoint, datetime.utcnow()))
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (seconds, statement, endpoint, datetime.utcnow()))
+
+    def slow_statements(self):
+        with self.lock:
+            return sorted(self.slowest, reverse=True)
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        with self.lock:
+            lines = ['# HELP fleet_http_requests_total Requests by endpoint, method and status.',
+                     '# TYPE fleet_http_requests_total counter']
+            for key, count in sorted(self.requests.items()):
+                lines.append(f'fleet_http_requests_total{_labels(("endpoint", "method", "status"), key)} {count}')
+
+            lines += ['# HELP fleet_http_request_duration_seconds Request latency by endpoint and method.',
+                      '# TYPE fleet_http_request_duration_seconds histogram']
+            for key, histogram in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    labels = _labels(('endpoint', 'method'), key, f'le="{bound}"')
+                    lines.append(f'fleet_http_request_duration_seconds_bucket{labels} {cumulative}')
+                labels = _labels(('endpoint', 'method'), key, 'le="+Inf"')
+                lines.append(f'fleet_http_request_duration_seconds_bucket{labels} {histogram.count}')
+                labels = _labels(('endpoint', 'method'), key)
+                lines.append(f'fleet_http_request_duration_seconds_sum{labels} {histogram.sum}')
+                lines.append(f'fleet_http_request_duration_seconds_count{labels} {histogram.count}')
+
+            lines += ['# HELP fleet_db_queries_total SQL statements executed while handling requests.',
+                      '# TYPE fleet_db_queries_total counter']
+            for endpoint, (count, _) in sorted(self.queries.items()):
+                lines.append(f'fleet_db_queries_total{_labels(("endpoint",), (endpoint,))} {count}')
+            lines += ['# HELP fleet_db_query_seconds_total Time spent in SQL statements while handling requests.',
+                      '# TYPE fleet_db_query_seconds_total counter']
+            for endpoint, (_, seconds) in sorted(self.queries.items()):
+                lines.append(f'fleet_db_query_seconds_total{_labels(("endpoint",), (endpoint,))} {seconds}')
+
+            if self.templates:
+                lines += ['# HELP fleet_template_renders_total Template renders by template.',
+                          '# TYPE fleet_template_renders_total counter']
+                for name, (count, _) in sorted(self.templates.items()):
+                    lines.append(f'fleet_template_renders_total{_labels(("template",), (name,))} {count}')
+                lines += ['# HELP fleet_template_render_seconds_total Template render time by template.',
+                          '# TYPE fleet_template_render_seconds_total counter']
+                for name, (_, seconds) in sorted(self.templates.items()):
+                    lines.append(f'fleet_template_render_seconds_total{_labels(("template",), (name,))} {seconds}')
+        return '\n'.join(lines) + '\n'
+
+
+def _make_timed_template(metrics):
+    class TimedTemplate(Template):
+        def render(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return super().render(*args, **kwargs)
+            finally:
+                metrics.observe_template(self.name or '<string>', time.perf_counter() - started)
+    return TimedTemplate
+
+
+class Instrumentation:
+    def __init__(self, app=None):
+        self.metrics = Metrics()
+        self.mode = 'off'
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.mode = app.config.get('INSTRUMENTATION', 'off')
+        if self.mode not in MODES:
+            raise ValueError(f"INSTRUMENTATION must be one of {', '.join(MODES)}")
+        self.profile_token = app.config.get('PROFILE_TOKEN', '')
+        self.profile_dir = app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles')
+        self.metrics_token = app.config.get('METRICS_TOKEN', '')
+        if self.mode == 'off' and not self.profile_token:
+            return
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        if self.mode != 'off':
+            # Listening on the Engine class covers the writer and any read-only engine
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        if self.mode == 'full':
+            app.jinja_env.template_class = _make_timed_template(self.metrics)
+            app.add_url_rule('/metrics/slow-queries', 'slow_queries', self.slow_queries_view)
+
+    def _before_request(self):
+        g.instrument = {'started': time.perf_counter(), 'queries': 0, 'query_seconds': 0.0}
+        if self.profile_token and request.headers.get('X-Profile') == self.profile_token:
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    def _after_request(self, response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            name = re.sub(r'[^A-Za-z0-9_.-]', '_', request.endpoint or 'unmatched')
+            path = os.path.join(self.profile_dir, f'{datetime.utcnow():%Y%m%dT%H%M%S%f}-{name}.prof')
+            profiler.dump_stats(path)
+            response.headers['X-Profile-File'] = path
+        state = g.pop('instrument', None)
+        if state is not None and self.mode != 'off' and request.endpoint != 'metrics':
+            self.metrics.observe_request(
+                request.endpoint or 'unmatched', request.method, response.status_code,
+                time.perf_counter() - state['started'], state['queries'], state['query_seconds'])
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('instrument_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info['instrument_started'].pop()
+        if not has_request_context():
+            return
+        state = g.get('instrument')
+        if state is not None:
+            state['queries'] += 1
+            state['query_seconds'] += seconds
+        if self.mode == 'full':
+            self.metrics.observe_statement(statement, seconds, request.endpoint)
+
+    def _authorize(self):
+        if self.metrics_token and request.headers.get('Authorization') != f'Bearer {self.metrics_token}':
+            abort(401)
+
+    def metrics_view(self):
+        self._authorize()
+        return Response(self.metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    def slow_queries_view(self):
+        self._authorize()
+        return jsonify([{
+            'seconds': round(seconds, 6),
+            'statement': statement,
+            'endpoint': endpoint,
+            'at': at.isoformat()
+        } for seconds, statement, endpoint, at in self.metrics.slow_statements()])
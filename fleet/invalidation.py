@@ -0,0 +1,94 @@
+"""Response caching for views, invalidated by model/row tags when transactions commit."""
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import event
+
+from fleet.extensions import db, response_cache, user_cache
+from fleet.models import old_value
+
+# Models with per-row cached views, tagged '<Model>:<id>' (e.g. vehicle details); other
+# models only get their model-wide tag, since a row tag nothing reads would just pile up
+ROW_TAGGED = {'Vehicle'}
+# Foreign keys whose parent's cached pages show the child rows, e.g. a vehicle's fuel records
+CACHE_PARENTS = {'vehicle_id': 'Vehicle'}
+
+def mark_cache_tags(model, ids, live=False):
+    """Queue invalidation of the given rows for when the current transaction commits.
+
+    Bulk Core writes bypass the flush hooks and call this directly. live marks
+    writes that only touch position and fuel columns, so pages that show just
+    vehicle names keep their entries.
+    """
+    tags = db.session.info.setdefault('cache_tags', set())
+    tags.add(f'{model.__name__}.live' if live else model.__name__)
+    if model.__name__ in ROW_TAGGED:
+        tags.update(f'{model.__name__}:{id}' for id in ids)
+
+def mark_parent_tags(rows):
+    """Queue invalidation of the parents whose pages list these bulk-inserted child rows."""
+    tags = db.session.info.setdefault('cache_tags', set())
+    for column, parent in CACHE_PARENTS.items():
+        tags.update(f'{parent}:{row[column]}' for row in rows if row.get(column) is not None)
+
+@event.listens_for(db.session, 'after_flush')
+def collect_cache_tags(session, flush_context):
+    tags = session.info.setdefault('cache_tags', set())
+    users = session.info.setdefault('changed_users', set())
+    dirty = [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    for obj in list(session.new) + dirty + list(session.deleted):
+        name = type(obj).__name__
+        tags.add(name)
+        if name in ROW_TAGGED:
+            tags.add(f'{name}:{obj.id}')
+        elif name == 'User':
+            users.add(obj.id)
+        for column, parent in CACHE_PARENTS.items():
+            if hasattr(obj, column):
+                # A moved child row invalidates both its old and its new parent
+                for value in (getattr(obj, column), old_value(obj, column)):
+                    if value is not None:
+                        tags.add(f'{parent}:{value}')
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_cache(session):
+    tags = session.info.pop('cache_tags', None)
+    if tags:
+        response_cache.invalidate(tags)
+    users = session.info.pop('changed_users', None)
+    if users:
+        user_cache.discard(users)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def discard_cache_tags(session, previous_transaction):
+    session.info.pop('cache_tags', None)
+    session.info.pop('changed_users', None)
+
+def cached_response(*tags):
+    """Cache a view's successful responses by full path until one of its tags is invalidated.
+
+    A tag may be a callable taking the view arguments, for per-row tags.
+    Error responses and streams are never stored.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            resolved = [tag(**kwargs) if callable(tag) else tag for tag in tags]
+            response = None
+
+            def render():
+                nonlocal response
+                response = current_app.make_response(view(**kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return None
+                return response.get_data(), [(k, v) for k, v in response.headers if k != 'Content-Length']
+
+            cached = response_cache.get_or_set('view:' + request.full_path, resolved, render)
+            if response is None:
+                response = current_app.response_class(cached[0], headers=cached[1])
+                response.headers['X-Cache'] = 'HIT'
+            else:
+                response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
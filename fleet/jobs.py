@@ -0,0 +1,211 @@
+"""Background jobs: a dispatcher thread that claims durable jobs and runs them on thread or process pools.
+
+Jobs are rows of the job table (fleet.models.Job), so they survive restarts
+and any number of worker processes can share them: a job is claimed with a
+conditional UPDATE and only the process whose update matched runs it. The
+dispatcher reaches the table through a store, see fleet.services.JobStore.
+
+I/O-bound kinds run on a thread pool in the dispatching process. CPU-bound
+kinds run on a process pool whose workers build their own app, so they do
+not hold the web process's GIL.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+logger = logging.getLogger(__name__)
+
+POOLS = ('thread', 'process')
+# Delay before retry n is BACKOFF_SECONDS * 2 ** (n - 1), capped at MAX_BACKOFF_SECONDS
+BACKOFF_SECONDS = 10
+MAX_BACKOFF_SECONDS = 3600
+MAX_ERROR_LENGTH = 2000
+
+Task = namedtuple('Task', 'name func pool max_attempts')
+# A job as claimed from the store; attempts includes the current one
+ClaimedJob = namedtuple('ClaimedJob', 'id kind args attempts max_attempts')
+# Job kinds by name, registered with @task; see fleet.tasks
+TASKS = {}
+
+
+def task(name, pool='thread', max_attempts=3):
+    """Register a function as the job kind `name`; it is called with the job's args as keywords."""
+    if pool not in POOLS:
+        raise ValueError(f"pool must be one of {', '.join(POOLS)}")
+
+    def decorator(func):
+        TASKS[name] = Task(name, func, pool, max_attempts)
+        return func
+    return decorator
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying a job that has failed `attempts` times."""
+    return min(BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+
+
+def parse_periodic(value):
+    """Parse "kind=seconds,kind=seconds" into {kind: seconds}."""
+    periodic = {}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        kind, _, seconds = item.partition('=')
+        try:
+            periodic[kind.strip()] = float(seconds)
+        except ValueError:
+            raise ValueError(f'periodic job {item!r} must be kind=seconds')
+    return periodic
+
+
+def run_task(app, kind, args):
+    with app.app_context():
+        return TASKS[kind].func(**args)
+
+
+# The app of a process pool worker, built once by _init_process
+_process_app = None
+
+
+def _init_process(config):
+    global _process_app
+    from fleet.factory import create_app
+    _process_app = create_app(config)
+
+
+def _run_in_process(kind, args):
+    return run_task(_process_app, kind, args)
+
+
+class JobRunner:
+    """Claims due jobs from the store and runs them until stopped.
+
+    `periodic` maps job kinds to intervals in seconds; the store keeps one
+    job of each queued, due that long after the previous run finished.
+    """
+
+    def __init__(self, app, store, threads=4, processes=2, poll_interval=1.0, lease_seconds=60, periodic=None):
+        self.app = app
+        self.store = store
+        self.capacity = {'thread': threads, 'process': processes}
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.periodic = periodic or {}
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.running = {pool: set() for pool in POOLS}
+        self.executors = {}
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.thread = None
+
+    def start(self):
+        """Run the dispatcher on a daemon thread; a no-op while it is alive."""
+        with self.condition:
+            if self.thread is None or not self.thread.is_alive():
+                self.stopping = False
+                self.thread = threading.Thread(target=self.run, name='job-dispatcher', daemon=True)
+                self.thread.start()
+
+    def wake(self):
+        """Look for due jobs now instead of at the next poll."""
+        with self.condition:
+            self.condition.notify()
+
+    def stop(self, wait=True):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        for executor in self.executors.values():
+            executor.shutdown(wait=wait)
+
+    def _executor(self, pool):
+        if pool not in self.executors:
+            if pool == 'thread':
+                self.executors[pool] = ThreadPoolExecutor(self.capacity[pool], thread_name_prefix='job')
+            else:
+                # Plain values only: the workers rebuild the app from them. Spawned rather than
+                # forked, since forking copies this process's threads and open database connections.
+                config = {key: value for key, value in self.app.config.items()
+                          if key.isupper() and isinstance(value, (str, int, float, bool, type(None)))}
+                config['JOB_WORKER'] = 'off'
+                self.executors[pool] = ProcessPoolExecutor(self.capacity[pool], mp_context=get_context('spawn'),
+                                                           initializer=_init_process, initargs=(config,))
+        return self.executors[pool]
+
+    def run(self, until_idle=False):
+        """Dispatch until stop(); with until_idle, return once no job is due or running."""
+        last_heartbeat = 0.0
+        while not self.stopping:
+            try:
+                now = time.monotonic()
+                # Housekeeping runs a few times per lease rather than on every poll
+                if now - last_heartbeat >= self.lease_seconds / 3:
+                    self.store.heartbeat(self.worker_id)
+                    self.store.requeue_stale(self.lease_seconds)
+                    self.store.schedule_periodic(self.periodic)
+                    last_heartbeat = now
+                claimed = self._dispatch()
+            except Exception as e:
+                logger.error(f'Job dispatch failed: {e}')
+                claimed = 0
+            with self.condition:
+                if until_idle and not claimed and not any(self.running.values()):
+                    return
+                if not claimed and not self.stopping:
+                    self.condition.wait(self.poll_interval)
+
+    def _dispatch(self):
+        claimed = 0
+        for pool in POOLS:
+            kinds = [name for name, t in TASKS.items() if t.pool == pool]
+            free = self.capacity[pool] - len(self.running[pool])
+            if not kinds or free <= 0:
+                continue
+            for job in self.store.claim(self.worker_id, kinds, free):
+                with self.condition:
+                    self.running[pool].add(job.id)
+                claimed += 1
+                executor = self._executor(pool)
+                try:
+                    if pool == 'thread':
+                        future = executor.submit(run_task, self.app, job.kind, job.args)
+                    else:
+                        future = executor.submit(_run_in_process, job.kind, job.args)
+                except BrokenProcessPool as e:
+                    future = Future()
+                    future.set_exception(e)
+                future.add_done_callback(lambda f, job=job, pool=pool, executor=executor:
+                                         self._finished(job, pool, executor, f))
+        return claimed
+
+    def _discard_executor(self, pool, executor):
+        """Drop a process pool that lost a worker; the next job starts a new one."""
+        with self.condition:
+            if self.executors.get(pool) is not executor:
+                return
+            del self.executors[pool]
+        executor.shutdown(wait=False)
+
+    def _finished(self, job, pool, executor, future):
+        try:
+            error = future.exception()
+            if isinstance(error, BrokenProcessPool):
+                self._discard_executor(pool, executor)
+            if error is None:
+                self.store.finish(job.id, future.result())
+            else:
+                logger.error(f'Job {job.id} ({job.kind}) failed on attempt {job.attempts}: {error}')
+                retry = backoff(job.attempts) if job.attempts < job.max_attempts else None
+                self.store.fail(job.id, f'{type(error).__name__}: {error}'[:MAX_ERROR_LENGTH], retry)
+        except Exception as e:
+            # The job stays running in the table and is requeued once its lease runs out
+            logger.error(f'Recording the outcome of job {job.id} failed: {e}')
+        finally:
+            with self.condition:
+                self.running[pool].discard(job.id)
+                self.condition.notify()
@@ -0,0 +1,303 @@
+"""Database models."""
+from datetime import datetime
+
+from flask_login import UserMixin
+from sqlalchemy import event
+
+from fleet import positions
+from fleet.extensions import db
+
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    # werkzeug hash, see fleet.security; plaintext rows from before hashing are rehashed at login
+    password = db.Column(db.String(255), nullable=False)
+    is_admin = db.Column(db.Boolean, default=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Vehicle(db.Model):
+    __table_args__ = (
+        db.Index('ix_vehicle_status', 'status'),
+        db.Index('ix_vehicle_vehicle_type', 'vehicle_type'),
+        db.Index('ix_vehicle_updated_at', 'updated_at'),
+        db.Index('ix_vehicle_due_inputs_updated_at', 'due_inputs_updated_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), nullable=False)
+    vehicle_type = db.Column(db.String(50), nullable=False, default='Truck')  # New field
+    model = db.Column(db.String(100))  # New field
+    year = db.Column(db.Integer)  # New field
+    current_location = db.Column(db.String(200))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    fuel_level = db.Column(db.Float, default=100.0)
+    status = db.Column(db.String(50), default='active')
+    last_maintenance = db.Column(db.DateTime)
+    tank_capacity = db.Column(db.Float, default=100.0)
+    maintenance_records = db.relationship('MaintenanceRecord', backref='vehicle', lazy=True)
+    fuel_records = db.relationship('FuelRecord', backref='vehicle', lazy=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    image_url = db.Column(db.String(500))  # New field for vehicle image
+    # Last change to an input of the predicted service date other than fuel records, see touch_due_inputs
+    due_inputs_updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Driver(db.Model):
+    __table_args__ = (
+        db.Index('ix_driver_vehicle_id', 'vehicle_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), nullable=False)
+    license_number = db.Column(db.String(50), unique=True)
+    performance_rating = db.Column(db.Float, default=7.0)
+    speed_score = db.Column(db.Float, default=7.0)
+    braking_score = db.Column(db.Float, default=7.0)
+    safety_rating = db.Column(db.String(20), default='Good')
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'))
+    fuel_records = db.relationship('FuelRecord', backref='driver', lazy=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class MaintenanceRecord(db.Model):
+    # Per-vehicle history, and the scheduled/completed lists ordered by (date, id)
+    __table_args__ = (
+        db.Index('ix_maintenance_record_vehicle_id_date', 'vehicle_id', 'date'),
+        db.Index('ix_maintenance_record_status_date', 'status', 'date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'))
+    date = db.Column(db.DateTime, default=datetime.utcnow)
+    description = db.Column(db.String(200))
+    cost = db.Column(db.Float)
+    status = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class FuelRecord(db.Model):
+    # Per-vehicle and per-driver history, plus date windows for recent records and monthly stats
+    __table_args__ = (
+        db.Index('ix_fuel_record_vehicle_id_date', 'vehicle_id', 'date'),
+        db.Index('ix_fuel_record_driver_id_date', 'driver_id', 'date'),
+        db.Index('ix_fuel_record_date', 'date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'))
+    driver_id = db.Column(db.Integer, db.ForeignKey('driver.id'))
+    date = db.Column(db.DateTime, default=datetime.utcnow)
+    quantity = db.Column(db.Float)
+    cost = db.Column(db.Float)
+    location = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class DeletedVehicle(db.Model):
+    """Tombstone so location polling clients learn about deleted vehicles."""
+    id = db.Column(db.Integer, primary_key=True)
+    vehicle_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+class FleetSummary(db.Model):
+    """Materialized dashboard counters, kept current by the flush hooks below.
+
+    Keys are 'vehicles', 'drivers', 'status:<status>', 'type:<vehicle_type>',
+    'fuel_level_sum', 'fuel_level_count', 'maintenance_scheduled' and
+    'fuel_cost:<YYYY-MM>'.
+    """
+    key = db.Column(db.String(80), primary_key=True)
+    value = db.Column(db.Float, nullable=False, default=0.0)
+
+class CostBucket(db.Model):
+    """Fuel and maintenance totals of one vehicle for one day or month, kept current by fleet.analytics.
+
+    bucket is 'YYYY-MM-DD' for period 'day' and 'YYYY-MM' for 'month', so
+    ranges compare as strings. maintenance_cost counts completed records only.
+    """
+    __table_args__ = (
+        db.Index('ix_cost_bucket_period_bucket', 'period', 'bucket'),
+    )
+
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'), primary_key=True)
+    period = db.Column(db.String(5), primary_key=True)
+    bucket = db.Column(db.String(10), primary_key=True)
+    fuel_liters = db.Column(db.Float, nullable=False, default=0.0)
+    fuel_cost = db.Column(db.Float, nullable=False, default=0.0)
+    maintenance_cost = db.Column(db.Float, nullable=False, default=0.0)
+    refuels = db.Column(db.Integer, nullable=False, default=0)
+
+class DriverScoreHistory(db.Model):
+    """Driver scores as computed by each scoring run, newest last."""
+    __table_args__ = (
+        db.Index('ix_driver_score_history_driver_id_computed_at', 'driver_id', 'computed_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    driver_id = db.Column(db.Integer, db.ForeignKey('driver.id'), nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    speed_score = db.Column(db.Float, nullable=False)
+    braking_score = db.Column(db.Float, nullable=False)
+    safety_score = db.Column(db.Float, nullable=False)
+    performance_score = db.Column(db.Float, nullable=False)
+
+class GeocodeCache(db.Model):
+    """Persistent reverse-geocoding results keyed on rounded coordinates."""
+    key = db.Column(db.String(40), primary_key=True)
+    address = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class PositionHistory(db.Model):
+    """Append-only GPS track; ts is epoch seconds and resolution the bucket size in seconds."""
+    __table_args__ = (
+        db.Index('ix_position_history_vehicle_id_ts', 'vehicle_id', 'ts'),
+        db.Index('ix_position_history_resolution_ts', 'resolution', 'ts'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'), nullable=False)
+    ts = db.Column(db.Integer, nullable=False)
+    resolution = db.Column(db.Integer, nullable=False, default=positions.RAW_RESOLUTION)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    speed = db.Column(db.Float)
+
+class FuelAnomaly(db.Model):
+    """Refuel flagged by one of the checks in fleet.anomalies; at most one row per record and kind.
+
+    value is what the refuel showed (price per liter, liters), expected the
+    baseline it was measured against and score how far off it was.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('fuel_record_id', 'kind', name='uq_fuel_anomaly_fuel_record_id_kind'),
+        db.Index('ix_fuel_anomaly_date', 'date'),
+        db.Index('ix_fuel_anomaly_vehicle_id_date', 'vehicle_id', 'date'),
+        db.Index('ix_fuel_anomaly_driver_id_date', 'driver_id', 'date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    fuel_record_id = db.Column(db.Integer, db.ForeignKey('fuel_record.id'), nullable=False)
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'))
+    driver_id = db.Column(db.Integer, db.ForeignKey('driver.id'))
+    date = db.Column(db.DateTime, nullable=False)
+    kind = db.Column(db.String(30), nullable=False)
+    value = db.Column(db.Float)
+    expected = db.Column(db.Float)
+    score = db.Column(db.Float)
+    detected_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class Watermark(db.Model):
+    """High-water mark of an incremental batch job: the last source row id it has processed."""
+    name = db.Column(db.String(80), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Geofence(db.Model):
+    """Circle or polygon area; geometry is the JSON from fleet.geofences.parse_geometry.
+
+    The bounding box columns are derived from the geometry on save.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    geometry = db.Column(db.Text, nullable=False)
+    min_lat = db.Column(db.Float, nullable=False)
+    min_lon = db.Column(db.Float, nullable=False)
+    max_lat = db.Column(db.Float, nullable=False)
+    max_lon = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class GeofenceState(db.Model):
+    """The geofences each vehicle is currently inside, one row per pair."""
+    __table_args__ = (
+        db.Index('ix_geofence_state_geofence_id', 'geofence_id'),
+    )
+
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'), primary_key=True)
+    geofence_id = db.Column(db.Integer, db.ForeignKey('geofence.id'), primary_key=True)
+    entered_at = db.Column(db.DateTime, nullable=False)
+
+class GeofenceEvent(db.Model):
+    """A vehicle entering or leaving a geofence; ts is the time of the ping that crossed."""
+    __table_args__ = (
+        db.Index('ix_geofence_event_ts', 'ts'),
+        db.Index('ix_geofence_event_vehicle_id_ts', 'vehicle_id', 'ts'),
+        db.Index('ix_geofence_event_geofence_id_ts', 'geofence_id', 'ts'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    geofence_id = db.Column(db.Integer, db.ForeignKey('geofence.id'), nullable=False)
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)
+    ts = db.Column(db.DateTime, nullable=False)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+
+class Job(db.Model):
+    """Background job run by fleet.jobs; args and result are JSON.
+
+    status goes queued -> running -> succeeded, or back to queued with a later
+    run_at while attempts remain, else failed. dedup_key is unique among
+    queued and running jobs, so enqueueing a duplicate returns the live one.
+    """
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+        db.Index('ix_job_kind_finished_at', 'kind', 'finished_at'),
+        db.Index('uq_job_dedup_key_active', 'dedup_key', unique=True,
+                 sqlite_where=db.text("status IN ('queued', 'running')")),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(80), nullable=False)
+    args = db.Column(db.Text, nullable=False, default='{}')
+    dedup_key = db.Column(db.String(200))
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    worker = db.Column(db.String(100))
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+def old_value(obj, name):
+    """Value of a column attribute before the pending change, or its current value."""
+    history = db.inspect(obj).attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return None if history.added else getattr(obj, name)
+
+def keep_old_values(*attributes):
+    """Load each attribute's committed value before it is overwritten.
+
+    Without this an assignment to an expired attribute (e.g. after a
+    commit) records no old value, and old_value returns None.
+    """
+    for attribute in attributes:
+        event.listen(attribute, 'set', lambda *args: None, active_history=True)
+
+def touch_due_inputs(target, value, oldvalue, initiator):
+    """Stamp due_inputs_updated_at when last_maintenance or vehicle_type changes.
+
+    Telemetry bumps updated_at on every ping, so the due queue watches this
+    column instead to find the vehicles it has to recompute.
+    """
+    if value != oldvalue:
+        target.due_inputs_updated_at = datetime.utcnow()
+
+for _attribute in (Vehicle.last_maintenance, Vehicle.vehicle_type):
+    event.listen(_attribute, 'set', touch_due_inputs, active_history=True)
+
+# Request filters accepted by the list views and APIs, by argument name
+VEHICLE_FILTERS = {'status': Vehicle.status, 'type': Vehicle.vehicle_type}
+DRIVER_FILTERS = {'vehicle_id': Driver.vehicle_id, 'safety_rating': Driver.safety_rating}
+FUEL_FILTERS = {'vehicle_id': FuelRecord.vehicle_id, 'driver_id': FuelRecord.driver_id}
+MAINTENANCE_FILTERS = {'vehicle_id': MaintenanceRecord.vehicle_id, 'status': MaintenanceRecord.status}
+ANOMALY_FILTERS = {'vehicle_id': FuelAnomaly.vehicle_id, 'driver_id': FuelAnomaly.driver_id, 'kind': FuelAnomaly.kind}
+GEOFENCE_FILTERS = {'kind': Geofence.kind}
+GEOFENCE_EVENT_FILTERS = {'vehicle_id': GeofenceEvent.vehicle_id, 'geofence_id': GeofenceEvent.geofence_id,
+                          'kind': GeofenceEvent.kind}
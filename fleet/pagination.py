@@ -0,0 +1,127 @@
+"""Keyset (cursor) pagination and request filters shared by the list views and APIs."""
+import base64
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, and_, or_
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+
+
+class Page:
+    """One window of a keyset-paginated query."""
+
+    def __init__(self, items, next_cursor, page_size):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.page_size = page_size
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def page_size_arg(args, default=DEFAULT_PAGE_SIZE):
+    """Read ?limit= from the request args, capped at MAX_PAGE_SIZE."""
+    try:
+        size = int(args.get('limit', default))
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, columns):
+    """Decode a cursor token into values typed like the key columns."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('invalid cursor')
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('invalid cursor')
+    decoded = []
+    for column, value in zip(columns, values):
+        if value is not None and isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        decoded.append(value)
+    return decoded
+
+
+def _after(columns, values, descending):
+    """Build the "row comes after the cursor" predicate for the key columns.
+
+    Expanded to OR/AND form rather than a row-value comparison so the
+    planner can still seek on the leading index column.
+    """
+    clauses = []
+    for i, column in enumerate(columns):
+        compare = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*[columns[j] == values[j] for j in range(i)], compare))
+    return or_(*clauses)
+
+
+def _key_value(row, column):
+    # Rows of (entity, extra columns...) carry the key on the leading entity
+    if hasattr(row, column.key):
+        return getattr(row, column.key)
+    return getattr(row[0], column.key)
+
+
+def keyset_paginate(query, columns, cursor=None, page_size=DEFAULT_PAGE_SIZE, descending=False):
+    """Return the page of `query` that follows `cursor`, ordered by `columns`.
+
+    `columns` must end with a unique column (normally the primary key) so the
+    ordering is total. Rows may be ORM objects, named tuples or (entity, ...)
+    tuples; key values are read by column key to build the next cursor.
+    """
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    if cursor:
+        query = query.filter(_after(columns, decode_cursor(cursor, columns), descending))
+    order = [c.desc() for c in columns] if descending else [c.asc() for c in columns]
+    rows = query.order_by(*order).limit(page_size + 1).all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor([_key_value(last, c) for c in columns])
+    return Page(rows, next_cursor, page_size)
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f'{name} must be a date in YYYY-MM-DD format')
+
+
+def apply_filters(query, args, equals=None, date_column=None):
+    """Apply equality and ?from=/&to= date range filters from request args.
+
+    `equals` maps argument names to columns, e.g. {'status': Vehicle.status}.
+    The `to` date is inclusive. Raises ValueError for malformed dates.
+    """
+    for name, column in (equals or {}).items():
+        value = args.get(name)
+        if value:
+            query = query.filter(column == value)
+    if date_column is not None:
+        start = args.get('from')
+        end = args.get('to')
+        if start:
+            query = query.filter(date_column >= _parse_date(start, 'from'))
+        if end:
+            query = query.filter(date_column < _parse_date(end, 'to') + timedelta(days=1))
+    return query
@@ -0,0 +1,97 @@
+"""Downsampling, retention and read-resolution policy for vehicle position history.
+
+History rows carry a `resolution` in seconds: 1 for raw pings, then 60 and
+900 once the downsampling job has collapsed them. Timestamps are integer
+epoch seconds so buckets are plain integer arithmetic.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import and_, func, select
+
+DAY = 86400
+RAW_RESOLUTION = 1
+
+# (source resolution, target resolution, age in days after which source rows collapse)
+DOWNSAMPLE_TIERS = (
+    (RAW_RESOLUTION, 60, 2),
+    (60, 900, 30),
+)
+# Coarsest rows are deleted after this many days
+RETENTION_DAYS = 365
+RESOLUTIONS = {'raw': RAW_RESOLUTION, '1m': 60, '15m': 900}
+MAX_TRACK_POINTS = 2000
+
+
+def epoch(ts):
+    """Naive UTC datetime to integer epoch seconds."""
+    return int(ts.replace(tzinfo=timezone.utc).timestamp())
+
+
+def from_epoch(seconds):
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None)
+
+
+def pick_resolution(start, end, requested=None):
+    """Return the bucket size in seconds for a track query over [start, end).
+
+    An explicit `requested` name wins; otherwise the finest tier that keeps
+    the window under MAX_TRACK_POINTS per vehicle is used.
+    """
+    if requested and requested != 'auto':
+        if requested not in RESOLUTIONS:
+            raise ValueError(f"resolution must be one of: auto, {', '.join(RESOLUTIONS)}")
+        return RESOLUTIONS[requested]
+    span = max(end - start, 1)
+    for seconds in sorted(RESOLUTIONS.values()):
+        if span / seconds <= MAX_TRACK_POINTS:
+            return seconds
+    return max(RESOLUTIONS.values())
+
+
+def downsample(session, table, now=None):
+    """Collapse aged rows into the next tier one day at a time, then apply retention.
+
+    Only days holding source rows are visited, and each is rewritten in its
+    own transaction so the job can be stopped and resumed. Returns the number
+    of source rows collapsed per tier.
+    """
+    now = epoch(now or datetime.utcnow())
+    collapsed = {}
+    for source, target, age_days in DOWNSAMPLE_TIERS:
+        cutoff = (now - age_days * DAY) // DAY * DAY
+        collapsed[source] = 0
+        days = session.execute(
+            select(table.c.ts / DAY).distinct()
+            .where(and_(table.c.resolution == source, table.c.ts < cutoff))
+        ).scalars().all()
+        for day_start in sorted(day * DAY for day in days):
+            window = and_(table.c.resolution == source,
+                          table.c.ts >= day_start, table.c.ts < day_start + DAY)
+            bucket = (table.c.ts / target) * target
+            summary = select(
+                table.c.vehicle_id, bucket, target,
+                func.avg(table.c.latitude), func.avg(table.c.longitude), func.max(table.c.speed)
+            ).where(window).group_by(table.c.vehicle_id, bucket)
+            session.execute(table.insert().from_select(
+                ['vehicle_id', 'ts', 'resolution', 'latitude', 'longitude', 'speed'], summary))
+            collapsed[source] += session.execute(table.delete().where(window)).rowcount
+            session.commit()
+
+    coarsest = DOWNSAMPLE_TIERS[-1][1]
+    deleted = session.execute(table.delete().where(and_(
+        table.c.resolution == coarsest, table.c.ts < now - RETENTION_DAYS * DAY))).rowcount
+    session.commit()
+    collapsed['expired'] = deleted
+    return collapsed
+
+
+def track(session, table, vehicle_id, start, end, resolution):
+    """Return [ts, latitude, longitude, max speed] points bucketed to `resolution` seconds."""
+    bucket = (table.c.ts / resolution) * resolution
+    rows = session.execute(
+        select(bucket.label('bucket'), func.avg(table.c.latitude), func.avg(table.c.longitude),
+               func.max(table.c.speed))
+        .where(and_(table.c.vehicle_id == vehicle_id, table.c.ts >= start, table.c.ts < end))
+        .group_by(bucket).order_by(bucket)
+    )
+    return [list(row) for row in rows]
@@ -0,0 +1,97 @@
+"""In-process publish/subscribe hub feeding the Server-Sent Events stream.
+
+Events are encoded once at publish time and the same bytes are handed to
+every subscriber. Each subscriber has a bounded buffer; events that carry a
+key (such as a vehicle id) replace an older pending event with the same key,
+so a slow client receives the latest position rather than a backlog, and
+when the buffer is still full the oldest event is dropped.
+"""
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict
+
+HEARTBEAT_SECONDS = 15
+DEFAULT_BUFFER = 256
+
+
+def encode_event(event_id, topic, data):
+    return f'id: {event_id}\nevent: {topic}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'.encode()
+
+
+class Subscription:
+    def __init__(self, hub, topics, maxsize):
+        self.hub = hub
+        self.topics = frozenset(topics)
+        self.maxsize = maxsize
+        self.pending = OrderedDict()
+        self.dropped = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def push(self, slot, payload):
+        with self.condition:
+            if slot in self.pending:
+                # Coalesce: the newer event replaces the pending one and moves to the back
+                del self.pending[slot]
+            elif len(self.pending) >= self.maxsize:
+                self.pending.popitem(last=False)
+                self.dropped += 1
+            self.pending[slot] = payload
+            self.condition.notify()
+
+    def get(self, timeout):
+        """Return the next encoded event, or None if nothing arrived within timeout."""
+        with self.condition:
+            if not self.pending and not self.closed:
+                self.condition.wait(timeout)
+            if not self.pending:
+                return None
+            return self.pending.popitem(last=False)[1]
+
+    def close(self):
+        self.hub.unsubscribe(self)
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+    def stream(self, heartbeat=HEARTBEAT_SECONDS):
+        """Yield encoded events, with a comment line whenever the stream has been idle."""
+        try:
+            yield b'retry: 3000\n\n'
+            while not self.closed:
+                payload = self.get(heartbeat)
+                yield payload if payload is not None else f': heartbeat {int(time.time())}\n\n'.encode()
+        finally:
+            self.close()
+
+
+class Hub:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.ids = itertools.count(1)
+
+    def subscribe(self, topics, maxsize=DEFAULT_BUFFER):
+        subscription = Subscription(self, topics, maxsize)
+        with self.lock:
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def publish(self, topic, data, key=None):
+        """Fan an event out to subscribers of `topic`; `key` enables coalescing."""
+        with self.lock:
+            targets = [s for s in self.subscribers if topic in s.topics]
+        if not targets:
+            return 0
+        event_id = next(self.ids)
+        payload = encode_event(event_id, topic, data)
+        slot = (topic, key) if key is not None else (topic, None, event_id)
+        for subscription in targets:
+            subscription.push(slot, payload)
+        return len(targets)
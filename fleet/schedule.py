@@ -0,0 +1,117 @@
+"""Predicted service due dates and a min-heap of them for maintenance alerts.
+
+A vehicle is due when either its calendar interval since the last service
+runs out or the fuel it has burned since then reaches its usage interval,
+whichever comes first. Fuel burned is the usage measure because it is the
+one every vehicle reports; the date it reaches the limit is projected from
+the recent daily consumption.
+"""
+import heapq
+import itertools
+import threading
+from collections import namedtuple
+from datetime import timedelta
+
+# Days and liters between services, per vehicle_type
+SERVICE_INTERVALS = {
+    'Truck': (90, 6000),
+    'Van': (120, 3000),
+    'Pickup': (150, 2500),
+    'Car': (180, 1500),
+}
+DEFAULT_INTERVAL = (180, 2000)
+# Trailing window for the consumption rate used to project usage
+USAGE_WINDOW_DAYS = 30
+
+Due = namedtuple('Due', 'vehicle_id due reason last_service liters_used liters_per_day')
+
+
+def due_date(vehicle_id, vehicle_type, last_service, liters_used, recent_liters, now):
+    """Return the Due entry of one vehicle.
+
+    last_service is the last maintenance (or the vehicle's creation),
+    liters_used the fuel bought since then and recent_liters the fuel bought
+    in the last USAGE_WINDOW_DAYS.
+    """
+    days, liters = SERVICE_INTERVALS.get(vehicle_type, DEFAULT_INTERVAL)
+    due, reason = last_service + timedelta(days=days), 'interval'
+    rate = (recent_liters or 0.0) / USAGE_WINDOW_DAYS
+    if rate > 0:
+        # Negative remaining liters give the (past) day the limit was crossed
+        by_usage = now + timedelta(days=(liters - (liters_used or 0.0)) / rate)
+        if by_usage < due:
+            due, reason = by_usage, 'usage'
+    return Due(vehicle_id, due, reason, last_service, liters_used or 0.0, rate)
+
+
+class DueQueue:
+    """Thread-safe min-heap of Due entries keyed by vehicle id.
+
+    Updates push a new heap entry and leave the old one behind as stale, so
+    an update costs O(log N). top(k) pops the k earliest live entries and
+    pushes them back, O(k log N) plus the stale entries it skips.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.heap = []
+        self.entries = {}
+        self.counter = itertools.count()
+        # Newest Vehicle.updated_at, FuelRecord.id and DeletedVehicle.deleted_at applied,
+        # see fleet.services.synced_due_queue
+        self.watermarks = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _push(self, item):
+        entry = [item.due, next(self.counter), item]
+        self.entries[item.vehicle_id] = entry
+        heapq.heappush(self.heap, entry)
+
+    def _compact(self):
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.heap = list(self.entries.values())
+            heapq.heapify(self.heap)
+
+    def update(self, items):
+        with self.lock:
+            for item in items:
+                old = self.entries.pop(item.vehicle_id, None)
+                if old is not None:
+                    old[2] = None
+                self._push(item)
+            self._compact()
+
+    def discard(self, vehicle_ids):
+        with self.lock:
+            for vehicle_id in vehicle_ids:
+                old = self.entries.pop(vehicle_id, None)
+                if old is not None:
+                    old[2] = None
+            self._compact()
+
+    def replace(self, items):
+        """Drop every entry and load items, e.g. on the first sync."""
+        with self.lock:
+            self.entries = {}
+            self.heap = []
+            for item in items:
+                entry = [item.due, next(self.counter), item]
+                self.entries[item.vehicle_id] = entry
+                self.heap.append(entry)
+            heapq.heapify(self.heap)
+
+    def top(self, k=None, until=None):
+        """The k earliest due entries, earliest first, optionally only those due by until."""
+        with self.lock:
+            popped = []
+            while self.heap and (k is None or len(popped) < k):
+                if until is not None and self.heap[0][0] > until:
+                    break
+                entry = heapq.heappop(self.heap)
+                if entry[2] is not None:
+                    popped.append(entry)
+            for entry in popped:
+                heapq.heappush(self.heap, entry)
+            return [entry[2] for entry in popped]
@@ -0,0 +1,135 @@
+"""Batch driver scoring from position history and fuel records.
+
+Statistics for every requested vehicle and driver come from a handful of
+set-based queries (a LAG window over the speed samples for braking), and
+the scores are then derived per driver from those aggregates.
+"""
+import logging
+import threading
+
+from sqlalchemy import and_, case, func, select
+
+from fleet.positions import RAW_RESOLUTION
+
+logger = logging.getLogger(__name__)
+
+SCORE_WINDOW_DAYS = 7
+SPEED_LIMIT_KMH = 90
+# Deceleration in km/h per second counted as a hard brake (about 0.35 g)
+HARD_BRAKE_KMH_PER_S = 12
+# Gaps longer than this are parked time, not driving time
+MAX_SAMPLE_GAP_S = 60
+# Below this much driving the braking rate is too noisy to score
+MIN_SCORED_HOURS = 0.1
+SPEEDING_WEIGHT = 50.0
+HARD_BRAKE_PENALTY = 2.0
+SAFETY_WEIGHTS = (0.6, 0.4)
+# Rescoring runs seconds after every telemetry batch; history keeps at most one
+# snapshot per driver per interval, and drops snapshots older than the retention
+HISTORY_INTERVAL_S = 3600
+HISTORY_RETENTION_DAYS = 180
+
+
+def clamp(value, low=0.0, high=10.0):
+    return max(low, min(high, value))
+
+
+def safety_label(score):
+    if score >= 8.0:
+        return 'Excellent'
+    if score >= 6.0:
+        return 'Good'
+    return 'Poor'
+
+
+def telemetry_stats(session, positions, since_ts, vehicle_ids=None):
+    """Per-vehicle speed samples, speeding samples, hard brakes and moving seconds."""
+    t = positions
+    window = dict(partition_by=t.c.vehicle_id, order_by=t.c.ts)
+    samples = select(
+        t.c.vehicle_id, t.c.ts, t.c.speed, t.c.resolution,
+        func.lag(t.c.speed).over(**window).label('prev_speed'),
+        func.lag(t.c.ts).over(**window).label('prev_ts'),
+        func.lag(t.c.resolution).over(**window).label('prev_resolution')
+    ).where(and_(t.c.ts >= since_ts, t.c.speed.isnot(None)))
+    if vehicle_ids is not None:
+        samples = samples.where(t.c.vehicle_id.in_(vehicle_ids))
+    s = samples.subquery()
+    gap = s.c.ts - s.c.prev_ts
+    # Braking needs consecutive raw pings; downsampled rows only carry a max speed
+    hard_brake = and_(s.c.resolution == RAW_RESOLUTION, s.c.prev_resolution == RAW_RESOLUTION, gap > 0,
+                      (s.c.prev_speed - s.c.speed) >= HARD_BRAKE_KMH_PER_S * gap)
+    rows = session.execute(select(
+        s.c.vehicle_id,
+        func.count().label('samples'),
+        func.sum(case((s.c.speed > SPEED_LIMIT_KMH, 1), else_=0)).label('speeding'),
+        func.sum(case((hard_brake, 1), else_=0)).label('hard_brakes'),
+        func.sum(case((and_(s.c.prev_ts.isnot(None), s.c.speed > 0), func.min(gap, MAX_SAMPLE_GAP_S)),
+                      else_=0)).label('moving_seconds')
+    ).group_by(s.c.vehicle_id))
+    return {row.vehicle_id: row for row in rows}
+
+
+def fuel_prices(session, fuel, since, driver_ids=None):
+    """Price per liter for each driver and for the whole fleet since `since`."""
+    price = func.sum(fuel.c.cost) / func.nullif(func.sum(fuel.c.quantity), 0)
+    window = fuel.c.date >= since
+    query = select(fuel.c.driver_id, price).where(window).group_by(fuel.c.driver_id)
+    if driver_ids is not None:
+        query = query.where(fuel.c.driver_id.in_(driver_ids))
+    per_driver = dict(session.execute(query).all())
+    fleet = session.execute(select(price).where(window)).scalar()
+    return per_driver, fleet
+
+
+def score_driver(previous_speed, previous_braking, telemetry=None, price=None, fleet_price=None):
+    """Return (speed, braking, safety, performance) scores on a 0-10 scale.
+
+    Without enough telemetry the previous speed and braking scores carry
+    over; without fuel data performance equals safety.
+    """
+    speed, braking = previous_speed, previous_braking
+    if telemetry is not None and telemetry.samples:
+        speed = clamp(10.0 - SPEEDING_WEIGHT * telemetry.speeding / telemetry.samples)
+        hours = (telemetry.moving_seconds or 0) / 3600.0
+        if hours >= MIN_SCORED_HOURS:
+            braking = clamp(10.0 - HARD_BRAKE_PENALTY * telemetry.hard_brakes / hours)
+    safety = SAFETY_WEIGHTS[0] * speed + SAFETY_WEIGHTS[1] * braking
+    performance = safety
+    if price and fleet_price:
+        # Same scale as the fleet efficiency rating: 5 means the fleet average price
+        performance = 0.7 * safety + 0.3 * clamp(5.0 * fleet_price / price)
+    return speed, braking, safety, performance
+
+
+class DirtyRefresher:
+    """Collects keys that need recomputation and refreshes them in the background.
+
+    Marks arriving within `delay` seconds of each other are handled in one
+    call to `refresh(keys)`, so bursts of writes cost one recomputation.
+    """
+
+    def __init__(self, refresh, delay=5.0):
+        self.refresh = refresh
+        self.delay = delay
+        self.dirty = set()
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def mark(self, keys):
+        with self.lock:
+            self.dirty.update(keys)
+            if self.dirty and self.timer is None:
+                self.timer = threading.Timer(self.delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            keys, self.dirty = self.dirty, set()
+            self.timer = None
+        if keys:
+            try:
+                self.refresh(keys)
+            except Exception as e:
+                logger.error(f'Refresh of {len(keys)} keys failed: {e}')
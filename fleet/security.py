@@ -0,0 +1,119 @@
+"""Password hashing, a TTL cache of logged-in users and signed API tokens.
+
+Requests authenticate as an AuthUser, a read-only snapshot of the User
+row, so a cached or token-borne user can be shared between threads and
+requests without touching the database session.
+"""
+import hmac
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask_login import UserMixin
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Prefixes of the hashes werkzeug writes; anything else is a legacy plaintext password
+HASH_PREFIXES = ('pbkdf2:', 'scrypt:')
+TOKEN_SALT = 'fleet-api-token'
+
+
+class AuthUser(UserMixin, namedtuple('AuthUser', 'id username is_admin')):
+    """What a request knows about its user: enough for access checks, nothing to lazy-load."""
+    __slots__ = ()
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, bool(user.is_admin))
+
+
+def hash_password(password, method):
+    """Hash with werkzeug, e.g. method='pbkdf2:sha256:600000' (hash name and iterations)."""
+    return generate_password_hash(password, method=method, salt_length=16)
+
+
+def check_password(stored, password, method):
+    """Return (matches, needs_rehash) for a login attempt against the stored password.
+
+    needs_rehash is true when the stored value was hashed with other
+    parameters than method, or is plaintext from before passwords were hashed.
+    """
+    if not stored.startswith(HASH_PREFIXES):
+        return hmac.compare_digest(stored.encode(), password.encode()), True
+    return check_password_hash(stored, password), stored.split('$', 1)[0] != method
+
+
+def time_password_hash(method, rounds=3):
+    """Median seconds one hash with method takes on this machine."""
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        generate_password_hash('benchmark', method=method, salt_length=16)
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[len(timings) // 2]
+
+
+class UserCache:
+    """Per-process LRU of AuthUser by id, bounded by entry count and age.
+
+    Changes committed in this process discard their users at once, see
+    fleet.invalidation; the TTL bounds how long other processes serve a
+    changed or deleted user.
+    """
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires < time.monotonic():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return user
+
+    def set(self, user):
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        with self.lock:
+            self.entries.pop(user.id, None)
+            self.entries[user.id] = (user, time.monotonic() + self.ttl)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, user_ids):
+        with self.lock:
+            for user_id in user_ids:
+                self.entries.pop(user_id, None)
+
+
+class TokenSigner:
+    """Stateless bearer tokens carrying an AuthUser, signed with the app's SECRET_KEY.
+
+    Verifying a token needs no session or database lookup, so a token stays
+    valid until max_age even if its user changes; rotate SECRET_KEY to
+    revoke every token at once.
+    """
+
+    def __init__(self, secret_key, max_age=3600):
+        self.serializer = URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT)
+        self.max_age = max_age
+
+    def sign(self, user):
+        return self.serializer.dumps([user.id, user.username, user.is_admin])
+
+    def load(self, token):
+        """The AuthUser in token; raises ValueError if it is forged, malformed or expired."""
+        try:
+            return AuthUser(*self.serializer.loads(token, max_age=self.max_age))
+        except SignatureExpired:
+            raise ValueError('token expired')
+        except (BadSignature, TypeError):
+            raise ValueError('invalid token')
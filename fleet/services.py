@@ -0,0 +1,737 @@
+"""Database-bound operations shared by the views, CLI commands and background workers."""
+import json
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, bindparam, case, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
+from fleet import analytics, anomalies, geofences, jobs, positions, schedule, scoring, transfer
+from fleet.extensions import db, due_queue, event_hub, geofence_index, score_refresher, vehicle_index
+from fleet.geocoding import GeocodeWorker, NominatimGeocoder, ReverseGeocoder, StubGeocoder, make_rate_limiter
+from fleet.invalidation import mark_cache_tags, mark_parent_tags
+from fleet.models import (DeletedVehicle, Driver, DriverScoreHistory, FuelAnomaly, FuelRecord, GeocodeCache, Geofence,
+                          GeofenceEvent, GeofenceState, Job, MaintenanceRecord, PositionHistory, User, Vehicle,
+                          Watermark, DRIVER_FILTERS, FUEL_FILTERS, MAINTENANCE_FILTERS, VEHICLE_FILTERS)
+from fleet.pagination import apply_filters, keyset_paginate
+from fleet.security import check_password, hash_password
+from fleet.summary import add_deltas, adjust_summary, summary_keys
+from fleet.telemetry import TELEMETRY_FIELDS, latest_per_vehicle
+
+class FuelStats:
+    """Fuel statistics computed with SQL aggregates instead of loading FuelRecord rows."""
+
+    # Window used as the price-per-liter baseline for the efficiency rating
+    BASELINE_DAYS = 90
+
+    def __init__(self, now=None):
+        now = now or datetime.utcnow()
+        self.month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    def month_totals(self):
+        """Return (liters, cost, refuels) for the current month."""
+        liters, cost, refuels = db.session.query(
+            func.coalesce(func.sum(FuelRecord.quantity), 0.0),
+            func.coalesce(func.sum(FuelRecord.cost), 0.0),
+            func.count(FuelRecord.id)
+        ).filter(FuelRecord.date >= self.month_start).one()
+        return liters, cost, refuels
+
+    def monthly_totals(self, months=6):
+        """Return liters and cost per calendar month, oldest first."""
+        since = self.month_start
+        for _ in range(months - 1):
+            since = (since - timedelta(days=1)).replace(day=1)
+        month = func.strftime('%Y-%m', FuelRecord.date)
+        rows = db.session.query(
+            month.label('month'),
+            func.sum(FuelRecord.quantity).label('liters'),
+            func.sum(FuelRecord.cost).label('cost'),
+            func.count(FuelRecord.id).label('refuels')
+        ).filter(FuelRecord.date >= since).group_by(month).order_by(month).all()
+        return rows
+
+    def vehicle_averages(self):
+        """Return per-vehicle refuel averages for the current month."""
+        return db.session.query(
+            Vehicle.id,
+            Vehicle.name,
+            func.count(FuelRecord.id).label('refuels'),
+            func.sum(FuelRecord.quantity).label('liters'),
+            func.avg(FuelRecord.quantity).label('avg_liters'),
+            func.avg(FuelRecord.cost).label('avg_cost')
+        ).join(FuelRecord, FuelRecord.vehicle_id == Vehicle.id) \
+            .filter(FuelRecord.date >= self.month_start) \
+            .group_by(Vehicle.id, Vehicle.name) \
+            .order_by(func.sum(FuelRecord.quantity).desc()).all()
+
+    def _price_per_liter(self, start, end=None):
+        query = db.session.query(
+            func.sum(FuelRecord.cost) / func.nullif(func.sum(FuelRecord.quantity), 0)
+        ).filter(FuelRecord.date >= start)
+        if end is not None:
+            query = query.filter(FuelRecord.date < end)
+        return query.scalar()
+
+    def efficiency_rating(self):
+        """Rate this month's price per liter against the trailing baseline.
+
+        5.0 means the fleet paid the baseline price; paying less raises the
+        rating (capped at 10), paying more lowers it.
+        """
+        current = self._price_per_liter(self.month_start)
+        baseline = self._price_per_liter(self.month_start - timedelta(days=self.BASELINE_DAYS), self.month_start)
+        if not current:
+            return 0.0
+        if not baseline:
+            return 5.0
+        return round(min(10.0, 5.0 * baseline / current), 1)
+
+    def recent_records(self, args, cursor=None, page_size=25):
+        """Return one keyset page of the newest fuel records matching the request filters."""
+        query = FuelRecord.query.options(joinedload(FuelRecord.vehicle), joinedload(FuelRecord.driver))
+        query = apply_filters(query, args, FUEL_FILTERS, date_column=FuelRecord.date)
+        return keyset_paginate(query, [FuelRecord.date, FuelRecord.id], cursor, page_size, descending=True)
+
+def apply_telemetry(rows):
+    """Apply the newest ping per vehicle with one executemany UPDATE per field set.
+
+    Returns (applied rows, rows for unknown vehicles). The caller commits.
+    """
+    latest = latest_per_vehicle(rows)
+    ids = sorted(row['vehicle_id'] for row in latest)
+    fuel_levels = {}
+    for i in range(0, len(ids), 500):
+        fuel_levels.update(db.session.query(Vehicle.id, Vehicle.fuel_level).filter(Vehicle.id.in_(ids[i:i + 500])))
+    known = set(fuel_levels)
+    applied = [row for row in latest if row['vehicle_id'] in known]
+    unknown = [row for row in latest if row['vehicle_id'] not in known]
+
+    # executemany needs identical parameter sets, so group pings by the fields they carry
+    groups = {}
+    for row in applied:
+        fields = tuple(field for field in TELEMETRY_FIELDS if field in row)
+        groups.setdefault(fields, []).append(row)
+    table = Vehicle.__table__
+    now = datetime.utcnow()
+    for fields, group in groups.items():
+        stmt = table.update().where(table.c.id == bindparam('b_id')).values(
+            updated_at=bindparam('b_updated_at'),
+            **{field: bindparam('b_' + field) for field in fields}
+        )
+        db.session.execute(stmt, [
+            dict({'b_id': row['vehicle_id'], 'b_updated_at': now},
+                 **{'b_' + field: row[field] for field in fields})
+            for row in group
+        ])
+
+    # Bulk updates bypass the ORM flush hooks, so adjust the fleet summary here
+    fuel_changes = [(fuel_levels[row['vehicle_id']], row['fuel_level']) for row in applied if 'fuel_level' in row]
+    adjust_summary(db.session.connection(), {
+        'fuel_level_sum': sum(new - (old or 0.0) for old, new in fuel_changes),
+        'fuel_level_count': sum(1 for old, _ in fuel_changes if old is None)
+    })
+
+    # Every position ping is kept in the history, not only the newest one
+    history = [{
+        'vehicle_id': row['vehicle_id'],
+        'ts': positions.epoch(row['ts']),
+        'resolution': positions.RAW_RESOLUTION,
+        'latitude': row['latitude'],
+        'longitude': row['longitude'],
+        'speed': row.get('speed')
+    } for row in rows if 'latitude' in row and row['vehicle_id'] in known]
+    if history:
+        db.session.execute(PositionHistory.__table__.insert(), history)
+    mark_cache_tags(Vehicle, [row['vehicle_id'] for row in applied], live=True)
+    return applied, unknown
+
+def synced_vehicle_index():
+    """Return the vehicle grid index after applying rows changed or deleted since its watermarks.
+
+    Writes in this process update the index directly; the watermark queries
+    pick up positions written and vehicles deleted by other worker processes.
+    """
+    tombstones = db.session.query(DeletedVehicle.id, DeletedVehicle.vehicle_id)
+    if vehicle_index.tombstone_watermark is not None:
+        tombstones = tombstones.filter(DeletedVehicle.id > vehicle_index.tombstone_watermark)
+    tombstones = tombstones.all()
+    # Before the updates below, which re-add a vehicle created again under a reused id
+    for tombstone_id, vehicle_id in tombstones:
+        vehicle_index.remove(vehicle_id)
+    if tombstones:
+        vehicle_index.tombstone_watermark = max(tombstone_id for tombstone_id, _ in tombstones)
+    query = db.session.query(Vehicle.id, Vehicle.latitude, Vehicle.longitude, Vehicle.updated_at)
+    if vehicle_index.watermark is not None:
+        query = query.filter(Vehicle.updated_at >= vehicle_index.watermark)
+    vehicle_index.sync(query.all())
+    return vehicle_index
+
+def synced_geofence_index():
+    """Return the geofence index, rebuilt if fences were added, changed or deleted since it was built.
+
+    The fence count and newest updated_at together change on every write, in
+    this process or another one.
+    """
+    version = tuple(db.session.query(func.count(Geofence.id), func.max(Geofence.updated_at)).one())
+    if version != geofence_index.version:
+        geofence_index.replace(geofences.Fence(fence.id, fence.kind, json.loads(fence.geometry))
+                               for fence in Geofence.query)
+        geofence_index.version = version
+    return geofence_index
+
+def save_geofence(fence, name, kind, geometry):
+    """Validate and store a fence's shape; raises ValueError. The caller adds and commits."""
+    if not isinstance(name, str) or not name.strip() or len(name) > 80:
+        raise ValueError('name must be 1 to 80 characters')
+    geometry = geofences.parse_geometry(kind, geometry)
+    fence.name, fence.kind, fence.geometry = name.strip(), kind, json.dumps(geometry)
+    fence.min_lat, fence.min_lon, fence.max_lat, fence.max_lon = geofences.bounding_box(kind, geometry)
+    return fence
+
+def delete_geofence(fence):
+    """Delete a fence with its vehicle states and events. The caller commits."""
+    GeofenceState.query.filter_by(geofence_id=fence.id).delete()
+    GeofenceEvent.query.filter_by(geofence_id=fence.id).delete()
+    mark_cache_tags(GeofenceEvent, [])
+    db.session.delete(fence)
+
+def apply_geofences(rows):
+    """Check position pings of known vehicles against the geofences; returns the enter/exit events.
+
+    Each vehicle's pings are evaluated in time order from the inside state
+    stored in GeofenceState, so a fence crossed and left within one batch
+    still yields both events. States and events are written with one
+    executemany each; the caller commits. Pings of one vehicle are assumed
+    to reach one worker at a time.
+    """
+    pings = sorted((row for row in rows if 'latitude' in row), key=lambda row: (row['vehicle_id'], row['ts']))
+    index = synced_geofence_index()
+    if not pings or not len(index):
+        return []
+    ids = sorted({row['vehicle_id'] for row in pings})
+    state = {}
+    for i in range(0, len(ids), 500):
+        for vehicle_id, geofence_id in db.session.query(GeofenceState.vehicle_id, GeofenceState.geofence_id) \
+                .filter(GeofenceState.vehicle_id.in_(ids[i:i + 500])):
+            state.setdefault(vehicle_id, set()).add(geofence_id)
+    events = [{
+        'geofence_id': geofence_id,
+        'vehicle_id': vehicle_id,
+        'kind': kind,
+        'ts': ping['ts'],
+        'latitude': ping['latitude'],
+        'longitude': ping['longitude']
+    } for vehicle_id, geofence_id, kind, ping in geofences.transitions(index, state, pings)]
+    if not events:
+        return []
+
+    # Only the net change per (vehicle, fence) reaches the state table
+    net = {}
+    for event in events:
+        net[event['vehicle_id'], event['geofence_id']] = event
+    table = GeofenceState.__table__
+    exits = [{'b_vehicle_id': v, 'b_geofence_id': f} for (v, f), event in net.items() if event['kind'] == 'exit']
+    enters = [{'vehicle_id': v, 'geofence_id': f, 'entered_at': event['ts']}
+              for (v, f), event in net.items() if event['kind'] == 'enter']
+    if exits:
+        db.session.execute(table.delete().where(and_(table.c.vehicle_id == bindparam('b_vehicle_id'),
+                                                     table.c.geofence_id == bindparam('b_geofence_id'))), exits)
+    if enters:
+        stmt = sqlite_insert(table)
+        db.session.execute(stmt.on_conflict_do_update(index_elements=['vehicle_id', 'geofence_id'],
+                                                      set_={'entered_at': stmt.excluded.entered_at}), enters)
+    db.session.execute(GeofenceEvent.__table__.insert(), events)
+    mark_cache_tags(GeofenceEvent, [])
+    return events
+
+def publish_geofence_events(events):
+    for event in events:
+        # No coalescing key: an enter followed by an exit must both reach the client
+        event_hub.publish('geofences', dict(event, ts=event['ts'].isoformat()))
+
+def authenticate(username, password):
+    """The User with these credentials or None, upgrading their stored hash to the current parameters."""
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        return None
+    method = current_app.config['PASSWORD_HASH_METHOD']
+    matches, needs_rehash = check_password(user.password, password, method)
+    if not matches:
+        return None
+    if needs_rehash:
+        user.password = hash_password(password, method)
+        db.session.commit()
+    return user
+
+class GeocodeStore:
+    """GeocodeCache table access for ReverseGeocoder; usable from worker threads."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def get(self, key, max_age):
+        with self.app.app_context():
+            entry = GeocodeCache.query.get(key)
+            if entry is None or entry.created_at < datetime.utcnow() - max_age:
+                return None
+            return (entry.address,)
+
+    def put(self, key, address):
+        with self.app.app_context():
+            db.session.merge(GeocodeCache(key=key, address=address, created_at=datetime.utcnow()))
+            db.session.commit()
+
+def apply_locations(resolved):
+    """Write resolved addresses to Vehicle.current_location in one executemany."""
+    table = Vehicle.__table__
+    db.session.execute(
+        table.update().where(table.c.id == bindparam('b_id')).values(current_location=bindparam('b_location')),
+        [{'b_id': vehicle_id, 'b_location': address[:200]} for vehicle_id, address in resolved]
+    )
+    mark_cache_tags(Vehicle, [vehicle_id for vehicle_id, _ in resolved], live=True)
+    db.session.commit()
+
+def geocode_worker():
+    """Build the app's geocoding pipeline on first use, or return None when disabled."""
+    config = current_app.config
+    worker = current_app.extensions.get('geocode_worker')
+    if worker is None and config['GEOCODER'] != 'none':
+        app = current_app._get_current_object()
+        if config['GEOCODER'] == 'stub':
+            provider = StubGeocoder()
+        else:
+            provider = NominatimGeocoder(config['GEOCODER_USER_AGENT'])
+        limiter = make_rate_limiter(config['GEOCODER_MIN_INTERVAL'], config['GEOCODER_RATE_FILE'])
+        geocoder = ReverseGeocoder(provider, GeocodeStore(app), limiter=limiter)
+
+        def apply(resolved):
+            with app.app_context():
+                apply_locations(resolved)
+
+        worker = current_app.extensions['geocode_worker'] = GeocodeWorker(geocoder, apply)
+    return worker
+
+def refresh_driver_scores(driver_ids=None, vehicle_ids=None):
+    """Recompute scores for the given drivers and the drivers of the given vehicles.
+
+    With neither argument every driver is rescored. Scores are copied onto
+    Driver in one executemany, and appended to DriverScoreHistory for drivers
+    without a snapshot in the last scoring.HISTORY_INTERVAL_S.
+    """
+    now = datetime.utcnow()
+    since = now - timedelta(days=scoring.SCORE_WINDOW_DAYS)
+    query = db.session.query(Driver.id, Driver.vehicle_id, Driver.speed_score, Driver.braking_score)
+    if driver_ids is not None or vehicle_ids is not None:
+        query = query.filter(db.or_(Driver.id.in_(list(driver_ids or ())),
+                                    Driver.vehicle_id.in_(list(vehicle_ids or ()))))
+    drivers = query.all()
+    if not drivers:
+        return 0
+
+    scoped = driver_ids is not None or vehicle_ids is not None
+    telemetry = scoring.telemetry_stats(
+        db.session, PositionHistory.__table__, positions.epoch(since),
+        sorted({d.vehicle_id for d in drivers if d.vehicle_id}) if scoped else None)
+    prices, fleet_price = scoring.fuel_prices(
+        db.session, FuelRecord.__table__, since, [d.id for d in drivers] if scoped else None)
+
+    recent = db.session.query(DriverScoreHistory.driver_id).filter(
+        DriverScoreHistory.computed_at >= now - timedelta(seconds=scoring.HISTORY_INTERVAL_S))
+    if scoped:
+        recent = recent.filter(DriverScoreHistory.driver_id.in_([d.id for d in drivers]))
+    snapshotted = {row.driver_id for row in recent.distinct()}
+
+    history, updates = [], []
+    for driver in drivers:
+        speed, braking, safety, performance = scoring.score_driver(
+            driver.speed_score or 0.0, driver.braking_score or 0.0,
+            telemetry.get(driver.vehicle_id), prices.get(driver.id), fleet_price)
+        if driver.id not in snapshotted:
+            history.append({'driver_id': driver.id, 'computed_at': now, 'speed_score': speed,
+                            'braking_score': braking, 'safety_score': safety,
+                            'performance_score': performance})
+        updates.append({'b_id': driver.id, 'b_speed': speed, 'b_braking': braking,
+                        'b_performance': performance, 'b_label': scoring.safety_label(safety)})
+    if history:
+        db.session.execute(DriverScoreHistory.__table__.insert(), history)
+    table = Driver.__table__
+    db.session.execute(table.update().where(table.c.id == bindparam('b_id')).values(
+        speed_score=bindparam('b_speed'), braking_score=bindparam('b_braking'),
+        performance_rating=bindparam('b_performance'), safety_rating=bindparam('b_label')
+    ), updates)
+    mark_cache_tags(Driver, [driver.id for driver in drivers])
+    db.session.commit()
+    return len(drivers)
+
+def prune_driver_score_history(now=None):
+    """Delete score snapshots older than scoring.HISTORY_RETENTION_DAYS; returns the count."""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=scoring.HISTORY_RETENTION_DAYS)
+    deleted = DriverScoreHistory.query.filter(DriverScoreHistory.computed_at < cutoff) \
+        .delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+def make_score_refresher(app):
+    """Rescore drivers whose fuel or telemetry changed, a few seconds after the writes."""
+    def refresh(keys):
+        with app.app_context():
+            refresh_driver_scores(driver_ids={i for kind, i in keys if kind == 'driver'},
+                                  vehicle_ids={i for kind, i in keys if kind == 'vehicle'})
+    return scoring.DirtyRefresher(refresh)
+
+STREAM_TOPICS = ('positions', 'maintenance', 'geofences')
+
+def publish_maintenance(record, vehicle_name):
+    event_hub.publish('maintenance', {
+        'id': record.id,
+        'vehicle_id': record.vehicle_id,
+        'vehicle_name': vehicle_name,
+        'description': record.description,
+        'date': record.date.strftime('%Y-%m-%d'),
+        'status': record.status
+    })
+
+LOCATION_COLUMNS = ('id', 'name', 'latitude', 'longitude', 'status', 'fuel_level')
+
+def location_version():
+    """Return the newest (updated_at, id) vehicle key and the newest tombstone time."""
+    latest = db.session.query(Vehicle.updated_at, Vehicle.id) \
+        .order_by(Vehicle.updated_at.desc(), Vehicle.id.desc()).first()
+    deleted_at = db.session.query(func.max(DeletedVehicle.deleted_at)).scalar()
+    return latest, deleted_at
+
+# Export and import names: model, list filters and the column ?from=/&to= apply to
+TRANSFER_MODELS = {
+    'vehicles': (Vehicle, VEHICLE_FILTERS, None),
+    'drivers': (Driver, DRIVER_FILTERS, None),
+    'fuel-records': (FuelRecord, FUEL_FILTERS, FuelRecord.date),
+    'maintenance-records': (MaintenanceRecord, MAINTENANCE_FILTERS, MaintenanceRecord.date),
+}
+EXPORT_YIELD_PER = 1000
+IMPORT_BATCH_SIZE = 5000
+# Rejected rows listed in an import report; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+def export_rows(name, args):
+    """Return (column names, DateTime column names, rows) of a model, filtered like its list API.
+
+    Rows are fetched yield_per rows at a time from one cursor, so memory stays
+    flat however large the table. Raises ValueError for malformed filters.
+    """
+    model, filters, date_column = TRANSFER_MODELS[name]
+    columns = model.__table__.columns
+    query = apply_filters(db.session.query(*columns), args, filters, date_column)
+    return ([column.name for column in columns],
+            {column.name for column in columns if isinstance(column.type, db.DateTime)},
+            query.order_by(model.id).yield_per(EXPORT_YIELD_PER))
+
+def _record_inserts(model, rows):
+    """Core inserts bypass the flush hooks, so update the rollups and cache tags here."""
+    deltas, buckets = {}, {}
+    for row in rows:
+        add_deltas(deltas, summary_keys(model, row.get), 1)
+        analytics.add_bucket_deltas(buckets, analytics.bucket_keys(model, row.get), 1)
+    adjust_summary(db.session.connection(), deltas)
+    analytics.adjust_buckets(db.session.connection(), buckets)
+    mark_cache_tags(model, [])
+    mark_parent_tags(rows)
+
+def _insert_batch(model, batch, reject):
+    """Insert and commit one batch; returns the number of rows inserted."""
+    insert = model.__table__.insert()
+    rows = [row for _, row in batch]
+    try:
+        db.session.execute(insert, rows)
+        _record_inserts(model, rows)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        # Find the offending rows by committing the batch one row at a time
+        rows = []
+        for line, row in batch:
+            try:
+                db.session.execute(insert, [row])
+                _record_inserts(model, [row])
+                db.session.commit()
+                rows.append(row)
+            except IntegrityError as e:
+                db.session.rollback()
+                reject(line, str(e.orig))
+    score_refresher.mark(('driver', row['driver_id']) for row in rows if row.get('driver_id'))
+    return len(rows)
+
+def import_records(name, records, batch_size=IMPORT_BATCH_SIZE):
+    """Insert the rows of transfer.read_records in batches, one transaction each.
+
+    Rows referring to unknown vehicles or drivers are rejected, as are rows the
+    database refuses, without failing the rest of their batch. Batches already
+    committed stay if a later one raises.
+    """
+    model = TRANSFER_MODELS[name][0]
+    fields = [field.name for field in transfer.FIELDS[name]]
+    # executemany needs every column in every row, so missing values fall back to the model defaults
+    defaults = {}
+    for field in fields:
+        default = model.__table__.c[field].default
+        defaults[field] = default.arg if default is not None and default.is_scalar else None
+    known = {column: {id for id, in db.session.query(parent.id)}
+             for column, parent in (('vehicle_id', Vehicle), ('driver_id', Driver)) if column in fields}
+    report = {'received': 0, 'inserted': 0, 'rejected': [], 'rejected_count': 0}
+
+    def reject(line, error):
+        report['rejected_count'] += 1
+        if len(report['rejected']) < MAX_REPORTED_ERRORS:
+            report['rejected'].append({'line': line, 'error': error})
+
+    batch = []
+    for line, row, error in records:
+        report['received'] += 1
+        if error is None:
+            error = next((f'unknown {column[:-3]} {row[column]}' for column, ids in known.items()
+                          if column in row and row[column] not in ids), None)
+        if error is not None:
+            reject(line, error)
+            continue
+        batch.append((line, dict(defaults, **row)))
+        if len(batch) >= batch_size:
+            report['inserted'] += _insert_batch(model, batch, reject)
+            batch = []
+    if batch:
+        report['inserted'] += _insert_batch(model, batch, reject)
+    return report
+
+ANOMALY_WATERMARK = 'fuel_anomalies'
+# Fuel record ids per detection pass; each pass recomputes the baselines of the vehicles and drivers it touches
+ANOMALY_CHUNK_SIZE = 1000000
+
+def set_watermark(name, value):
+    stmt = sqlite_insert(Watermark.__table__).values(name=name, value=value, updated_at=datetime.utcnow())
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['name'], set_={'value': stmt.excluded.value, 'updated_at': stmt.excluded.updated_at}))
+
+def detect_fuel_anomalies(chunk_size=ANOMALY_CHUNK_SIZE, rescan=False):
+    """Check the fuel records added since the last run; returns (records scanned, anomalies flagged).
+
+    Each chunk of record ids is committed together with the new high-water
+    mark, so an interrupted run resumes where it stopped. rescan drops every
+    flagged row and starts over, e.g. after changing the thresholds.
+    """
+    if rescan:
+        FuelAnomaly.query.delete()
+        set_watermark(ANOMALY_WATERMARK, 0)
+        mark_cache_tags(FuelAnomaly, [])
+        db.session.commit()
+    mark = db.session.get(Watermark, ANOMALY_WATERMARK)
+    low = mark.value if mark else 0
+    last = db.session.query(func.max(FuelRecord.id)).scalar() or 0
+    fuel, vehicles = FuelRecord.__table__, Vehicle.__table__
+    scanned = flagged = 0
+    while low < last:
+        high = min(low + chunk_size, last)
+        first, newest, count = db.session.query(
+            func.min(FuelRecord.date), func.max(FuelRecord.date), func.count(FuelRecord.id)
+        ).filter(FuelRecord.id > low, FuelRecord.id <= high).one()
+        if count:
+            rows = anomalies.detect(db.session, fuel, vehicles, low, high, first, newest)
+            if rows:
+                now = datetime.utcnow()
+                db.session.execute(sqlite_insert(FuelAnomaly.__table__).on_conflict_do_nothing(),
+                                   [dict(row, detected_at=now) for row in rows])
+                mark_cache_tags(FuelAnomaly, [])
+            scanned += count
+            flagged += len(rows)
+        set_watermark(ANOMALY_WATERMARK, high)
+        db.session.commit()
+        low = high
+    return scanned, flagged
+
+def compute_due(vehicle_ids=None, now=None):
+    """Due entries for the given vehicles (all when None) from one aggregate over their fuel records."""
+    now = now or datetime.utcnow()
+    recent = now - timedelta(days=schedule.USAGE_WINDOW_DAYS)
+    last_service = func.coalesce(Vehicle.last_maintenance, Vehicle.created_at)
+    query = db.session.query(
+        Vehicle.id, Vehicle.vehicle_type, last_service.label('last_service'),
+        func.sum(case((FuelRecord.date >= last_service, FuelRecord.quantity), else_=0.0)).label('liters_used'),
+        func.sum(case((FuelRecord.date >= recent, FuelRecord.quantity), else_=0.0)).label('recent_liters')
+    # Two-argument min() is SQLite's scalar minimum; the join only reads fuel records either sum needs
+    ).outerjoin(FuelRecord, and_(FuelRecord.vehicle_id == Vehicle.id,
+                                 FuelRecord.date >= func.min(last_service, recent))).group_by(Vehicle.id)
+    if vehicle_ids is None:
+        rows = query.all()
+    else:
+        ids = sorted(vehicle_ids)
+        rows = []
+        for i in range(0, len(ids), 500):
+            rows.extend(query.filter(Vehicle.id.in_(ids[i:i + 500])).all())
+    return [schedule.due_date(row.id, row.vehicle_type, row.last_service or now, row.liters_used,
+                              row.recent_liters, now) for row in rows]
+
+def synced_due_queue():
+    """Return the due queue after recomputing the vehicles changed since its watermarks.
+
+    Like synced_vehicle_index this also sees writes from other worker
+    processes: vehicles whose last_maintenance or vehicle_type changed (see
+    Vehicle.due_inputs_updated_at), vehicles with new fuel records (usage)
+    and deleted vehicles. Telemetry updates recompute nothing.
+    """
+    latest = tuple(db.session.query(
+        db.session.query(func.max(Vehicle.due_inputs_updated_at)).scalar_subquery(),
+        db.session.query(func.max(FuelRecord.id)).scalar_subquery(),
+        db.session.query(func.max(DeletedVehicle.deleted_at)).scalar_subquery()
+    ).one())
+    marks = due_queue.watermarks
+    if marks is None:
+        due_queue.replace(compute_due())
+    elif latest != marks:
+        inputs_since, fuel_since, deleted_since = marks
+        # Rows seeded or migrated without a stamp stay NULL until an input changes
+        changed = {vehicle_id for vehicle_id, in db.session.query(Vehicle.id)
+                   .filter(Vehicle.due_inputs_updated_at >= (inputs_since or datetime.min))}
+        changed.update(vehicle_id for vehicle_id, in db.session.query(FuelRecord.vehicle_id).distinct()
+                       .filter(FuelRecord.id > (fuel_since or 0), FuelRecord.vehicle_id.isnot(None)))
+        deleted = db.session.query(DeletedVehicle.vehicle_id)
+        if deleted_since is not None:
+            deleted = deleted.filter(DeletedVehicle.deleted_at >= deleted_since)
+        deleted = {vehicle_id for vehicle_id, in deleted}
+        due_queue.discard(deleted)
+        due_queue.update(compute_due(changed - deleted))
+    due_queue.watermarks = latest
+    return due_queue
+
+def schedule_due_maintenance(horizon_days=14, batch_size=IMPORT_BATCH_SIZE):
+    """Insert a scheduled MaintenanceRecord for each vehicle due within horizon_days that has none open.
+
+    Records are inserted in batches, one transaction each; returns how many were created.
+    """
+    now = datetime.utcnow()
+    due = synced_due_queue().top(until=now + timedelta(days=horizon_days))
+    open_ids = {vehicle_id for vehicle_id, in db.session.query(MaintenanceRecord.vehicle_id).distinct()
+                .filter(MaintenanceRecord.status == 'scheduled')}
+    rows = [{'vehicle_id': item.vehicle_id, 'date': max(item.due, now),
+             'description': f'Predicted service ({item.reason})', 'cost': None, 'status': 'scheduled'}
+            for item in due if item.vehicle_id not in open_ids]
+    for i in range(0, len(rows), batch_size):
+        batch = rows[i:i + batch_size]
+        db.session.execute(MaintenanceRecord.__table__.insert(), batch)
+        _record_inserts(MaintenanceRecord, batch)
+        db.session.commit()
+    return len(rows)
+
+def enqueue_job(kind, args=None, dedup_key=None, run_at=None, max_attempts=None):
+    """Queue a job of a registered kind and commit; returns the Job.
+
+    While a job with the same dedup_key is queued or running, that job is
+    returned instead of a new one.
+    """
+    task = jobs.TASKS.get(kind)
+    if task is None:
+        raise ValueError(f'unknown job kind {kind}')
+    if dedup_key is not None:
+        live = Job.query.filter(Job.dedup_key == dedup_key, Job.status.in_(('queued', 'running'))).first()
+        if live is not None:
+            return live
+    job = Job(kind=kind, args=json.dumps(args or {}), dedup_key=dedup_key, run_at=run_at or datetime.utcnow(),
+              max_attempts=max_attempts or task.max_attempts)
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another process queued the same key since the check above
+        db.session.rollback()
+        return Job.query.filter(Job.dedup_key == dedup_key, Job.status.in_(('queued', 'running'))).one()
+    runner = current_app.extensions.get('job_runner')
+    if runner is not None:
+        runner.wake()
+    return job
+
+class JobStore:
+    """Job table access for fleet.jobs.JobRunner; usable from worker threads."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def claim(self, worker, kinds, limit):
+        """Mark up to limit due jobs of the given kinds running for this worker; returns them as ClaimedJob."""
+        with self.app.app_context():
+            now = datetime.utcnow()
+            candidates = db.session.query(Job.id).filter(Job.status == 'queued', Job.run_at <= now,
+                                                         Job.kind.in_(kinds)).order_by(Job.run_at, Job.id).limit(limit)
+            table = Job.__table__
+            claimed = []
+            for job_id, in candidates.all():
+                # Only one process's update matches a still queued row
+                result = db.session.execute(table.update().where(table.c.id == job_id, table.c.status == 'queued')
+                                            .values(status='running', worker=worker, started_at=now,
+                                                    heartbeat_at=now, attempts=table.c.attempts + 1))
+                if result.rowcount:
+                    claimed.append(job_id)
+            db.session.commit()
+            if not claimed:
+                return []
+            return [jobs.ClaimedJob(job.id, job.kind, json.loads(job.args), job.attempts, job.max_attempts)
+                    for job in Job.query.filter(Job.id.in_(claimed)).order_by(Job.run_at, Job.id)]
+
+    def finish(self, job_id, result):
+        with self.app.app_context():
+            Job.query.filter_by(id=job_id).update({'status': 'succeeded', 'finished_at': datetime.utcnow(),
+                                                   'result': json.dumps(result), 'error': None})
+            db.session.commit()
+
+    def fail(self, job_id, error, retry_in=None):
+        """Record a failed attempt; the job is queued again after retry_in seconds, or fails for good."""
+        with self.app.app_context():
+            now = datetime.utcnow()
+            if retry_in is None:
+                values = {'status': 'failed', 'finished_at': now, 'error': error}
+            else:
+                values = {'status': 'queued', 'run_at': now + timedelta(seconds=retry_in), 'error': error}
+            Job.query.filter_by(id=job_id).update(values)
+            db.session.commit()
+
+    def heartbeat(self, worker):
+        with self.app.app_context():
+            Job.query.filter_by(worker=worker, status='running').update({'heartbeat_at': datetime.utcnow()})
+            db.session.commit()
+
+    def requeue_stale(self, lease_seconds):
+        """Return running jobs whose worker stopped checking in to the queue, or fail them if out of attempts."""
+        with self.app.app_context():
+            now = datetime.utcnow()
+            stale = Job.query.filter(Job.status == 'running',
+                                     Job.heartbeat_at < now - timedelta(seconds=lease_seconds))
+            stale.filter(Job.attempts < Job.max_attempts).update(
+                {'status': 'queued', 'run_at': now, 'error': 'worker stopped'}, synchronize_session=False)
+            stale.update({'status': 'failed', 'finished_at': now, 'error': 'worker stopped'},
+                         synchronize_session=False)
+            db.session.commit()
+
+    def schedule_periodic(self, periodic):
+        """Keep one job of each periodic kind queued, due its interval after the previous run finished."""
+        if not periodic:
+            return
+        with self.app.app_context():
+            live = {key for key, in db.session.query(Job.dedup_key).filter(
+                Job.dedup_key.in_([f'periodic:{kind}' for kind in periodic]), Job.status.in_(('queued', 'running')))}
+            for kind, interval in periodic.items():
+                if f'periodic:{kind}' in live or kind not in jobs.TASKS:
+                    continue
+                last = db.session.query(func.max(Job.finished_at)).filter(Job.kind == kind).scalar()
+                run_at = last + timedelta(seconds=interval) if last else datetime.utcnow()
+                enqueue_job(kind, dedup_key=f'periodic:{kind}', run_at=run_at)
+
+def job_runner():
+    """Build the app's job dispatcher on first use; it only runs once started."""
+    runner = current_app.extensions.get('job_runner')
+    if runner is None:
+        app = current_app._get_current_object()
+        config = app.config
+        runner = jobs.JobRunner(app, JobStore(app), threads=config['JOB_THREADS'],
+                                processes=config['JOB_PROCESSES'], poll_interval=config['JOB_POLL_INTERVAL'],
+                                lease_seconds=config['JOB_LEASE_SECONDS'],
+                                periodic=jobs.parse_periodic(config['JOB_PERIODIC']))
+        app.extensions['job_runner'] = runner
+    return runner
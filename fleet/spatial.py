@@ -0,0 +1,194 @@
+"""In-process uniform-grid index over vehicle positions.
+
+Positions are bucketed into square cells of `cell_size` degrees so bounding
+box and radius queries only touch nearby cells. Distances are great-circle
+kilometres from the haversine formula.
+"""
+import heapq
+import math
+import threading
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distances_km(lat, lon, points):
+    """Haversine distance from (lat, lon) to each (id, lat, lon), as [(distance, id)].
+
+    Trigonometry for the query point is hoisted out of the loop, which is
+    what keeps a batch of a few thousand candidates cheap without numpy.
+    """
+    phi1 = math.radians(lat)
+    cos_phi1 = math.cos(phi1)
+    lam1 = math.radians(lon)
+    sin, cos, asin, sqrt, radians = math.sin, math.cos, math.asin, math.sqrt, math.radians
+    result = []
+    for point_id, plat, plon in points:
+        phi2 = radians(plat)
+        a = sin((phi2 - phi1) / 2) ** 2 + cos_phi1 * cos(phi2) * sin((radians(plon) - lam1) / 2) ** 2
+        result.append((2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a))), point_id))
+    return result
+
+
+class GridIndex:
+    """Thread-safe grid of id -> (lat, lon), updated one position at a time."""
+
+    def __init__(self, cell_size=0.1):
+        self.cell_size = cell_size
+        # Columns wrap at the antimeridian
+        self.columns = int(round(360 / cell_size))
+        self.lock = threading.Lock()
+        self.positions = {}
+        self.cells = {}
+        # Newest updated_at value applied from the database, see sync()
+        self.watermark = None
+        # Newest DeletedVehicle.id applied, see fleet.services.synced_vehicle_index
+        self.tombstone_watermark = None
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _wrap(self, col):
+        half = self.columns // 2
+        return (col + half) % self.columns - half
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.cell_size)), self._wrap(int(math.floor(lon / self.cell_size)))
+
+    def _remove(self, point_id):
+        old = self.positions.pop(point_id, None)
+        if old is not None:
+            cell = self.cells.get(self._cell(*old))
+            if cell is not None:
+                cell.discard(point_id)
+                if not cell:
+                    del self.cells[self._cell(*old)]
+
+    def update(self, point_id, lat, lon):
+        """Insert or move a point; a None coordinate removes it."""
+        with self.lock:
+            self._remove(point_id)
+            if lat is not None and lon is not None:
+                self.positions[point_id] = (lat, lon)
+                self.cells.setdefault(self._cell(lat, lon), set()).add(point_id)
+
+    def remove(self, point_id):
+        with self.lock:
+            self._remove(point_id)
+
+    def sync(self, rows):
+        """Apply (id, lat, lon, updated_at) rows and advance the watermark."""
+        for point_id, lat, lon, updated_at in rows:
+            self.update(point_id, lat, lon)
+            if updated_at is not None and (self.watermark is None or updated_at > self.watermark):
+                self.watermark = updated_at
+
+    def _points_in(self, min_lat, min_lon, max_lat, max_lon):
+        """Candidate (id, lat, lon) points inside the box, read under the lock."""
+        low_row, high_row = (int(math.floor(lat / self.cell_size)) for lat in (min_lat, max_lat))
+        low_col, high_col = (int(math.floor(lon / self.cell_size)) for lon in (min_lon, max_lon))
+        cell_count = (high_row - low_row + 1) * (high_col - low_col + 1)
+        if cell_count > len(self.cells):
+            # Walking empty cells would cost more than checking every point
+            candidates = self.positions.items()
+        else:
+            candidates = [(point_id, self.positions[point_id])
+                          for row in range(low_row, high_row + 1)
+                          for col in range(low_col, high_col + 1)
+                          for point_id in self.cells.get((row, self._wrap(col)), ())]
+        return [(point_id, lat, lon) for point_id, (lat, lon) in candidates
+                if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon]
+
+    def _boxes(self, min_lat, min_lon, max_lat, max_lon):
+        """Points in a box whose west edge may lie east of its east edge (crossing 180)."""
+        if min_lon <= max_lon:
+            return self._points_in(min_lat, min_lon, max_lat, max_lon)
+        return self._points_in(min_lat, min_lon, max_lat, 180.0) + self._points_in(min_lat, -180.0, max_lat, max_lon)
+
+    def within_bbox(self, min_lon, min_lat, max_lon, max_lat):
+        """Ids of points inside a west, south, east, north box."""
+        with self.lock:
+            return [point_id for point_id, _, _ in self._boxes(min_lat, min_lon, max_lat, max_lon)]
+
+    def within_radius(self, lat, lon, radius_km):
+        """[(distance_km, id)] for points within radius_km, nearest first."""
+        dlat = radius_km / KM_PER_DEGREE
+        dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(abs(lat) + dlat, 90.0))), 1e-6))
+        with self.lock:
+            if dlon >= 180:
+                candidates = self._points_in(lat - dlat, -180.0, lat + dlat, 180.0)
+            else:
+                west = (lon - dlon + 180) % 360 - 180
+                east = (lon + dlon + 180) % 360 - 180
+                candidates = self._boxes(lat - dlat, west, lat + dlat, east)
+        return sorted(item for item in distances_km(lat, lon, candidates) if item[0] <= radius_km)
+
+    def nearest(self, lat, lon, k):
+        """[(distance_km, id)] for the k nearest points, nearest first.
+
+        Searches rings of cells outward from the query cell and stops once
+        the k-th best distance is closer than anything an unvisited ring
+        could contain.
+        """
+        with self.lock:
+            if k <= 0 or not self.positions:
+                return []
+            row, col = self._cell(lat, lon)
+            best = []
+            seen = set()
+            max_ring = int(math.ceil(180 / self.cell_size))
+            ring = 0
+            while ring <= max_ring:
+                if ring and (2 * ring + 1) ** 2 > 4 * len(self.cells):
+                    # The rings have outgrown the occupied cells; finish with a full scan
+                    everything = [(point_id, plat, plon) for point_id, (plat, plon) in self.positions.items()]
+                    return heapq.nsmallest(k, distances_km(lat, lon, everything))
+                cells = {(row + dr, self._wrap(col + dc))
+                         for dr in range(-ring, ring + 1) for dc in range(-ring, ring + 1)
+                         if max(abs(dr), abs(dc)) == ring} - seen
+                seen |= cells
+                found = [(point_id, *self.positions[point_id])
+                         for cell in cells for point_id in self.cells.get(cell, ())]
+                best = heapq.nsmallest(k, best + distances_km(lat, lon, found))
+                if len(best) == k:
+                    # Closest any point outside the visited block of cells can be
+                    size = self.cell_size
+                    lat_gap = min(lat - (row - ring) * size, (row + ring + 1) * size - lat)
+                    lon_offset = lon - math.floor(lon / size) * size
+                    lon_gap = min(lon_offset + ring * size, (ring + 1) * size - lon_offset)
+                    far_lat = min(abs(lat) + (ring + 1) * size, 90.0)
+                    bound = KM_PER_DEGREE * min(lat_gap, lon_gap * math.cos(math.radians(far_lat)))
+                    if best[-1][0] <= bound:
+                        return best
+                ring += 1
+            return best
+
+
+def parse_bbox(value):
+    """Parse "west,south,east,north" degrees."""
+    try:
+        west, south, east, north = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError('bbox must be west,south,east,north')
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise ValueError('bbox is out of range')
+    return west, south, east, north
+
+
+def parse_point(value):
+    """Parse "lat,lon" degrees."""
+    try:
+        lat, lon = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError('point must be lat,lon')
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError('point is out of range')
+    return lat, lon
@@ -0,0 +1,98 @@
+"""Materialized dashboard counters in FleetSummary, kept current by session flush hooks."""
+from datetime import datetime
+
+from sqlalchemy import event, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from fleet.extensions import db
+from fleet.models import Driver, FleetSummary, FuelRecord, MaintenanceRecord, Vehicle, keep_old_values, old_value
+
+# Columns summary_keys reads; their old values are needed to back out a row's counters
+keep_old_values(Vehicle.status, Vehicle.vehicle_type, Vehicle.fuel_level, MaintenanceRecord.status,
+                FuelRecord.date, FuelRecord.cost)
+
+def adjust_summary(connection, deltas):
+    """Add deltas to FleetSummary counters with one upsert."""
+    rows = [{'key': key, 'value': delta} for key, delta in deltas.items() if delta]
+    if rows:
+        stmt = sqlite_insert(FleetSummary.__table__)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=['key'], set_={'value': FleetSummary.__table__.c.value + stmt.excluded.value}
+        ), rows)
+
+def summary_keys(model, value):
+    """Counter contributions of one row of model, given a getter for its column values."""
+    if issubclass(model, Vehicle):
+        keys = {'vehicles': 1, f"status:{value('status')}": 1, f"type:{value('vehicle_type')}": 1}
+        if value('fuel_level') is not None:
+            keys['fuel_level_sum'] = value('fuel_level')
+            keys['fuel_level_count'] = 1
+        return keys
+    if issubclass(model, Driver):
+        return {'drivers': 1}
+    if issubclass(model, MaintenanceRecord):
+        return {'maintenance_scheduled': 1} if value('status') == 'scheduled' else {}
+    if issubclass(model, FuelRecord) and value('date') is not None:
+        return {f"fuel_cost:{value('date'):%Y-%m}": value('cost') or 0.0}
+    return {}
+
+def add_deltas(deltas, keys, sign):
+    for key, amount in keys.items():
+        deltas[key] = deltas.get(key, 0.0) + sign * amount
+
+@event.listens_for(db.session, 'before_flush')
+def collect_summary_changes(session, flush_context, instances):
+    """Record counter changes for updated and deleted rows while their old values are loaded."""
+    deltas = session.info.setdefault('summary_deltas', {})
+    for obj in session.deleted:
+        add_deltas(deltas, summary_keys(type(obj), lambda name: old_value(obj, name)), -1)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            add_deltas(deltas, summary_keys(type(obj), lambda name: old_value(obj, name)), -1)
+            add_deltas(deltas, summary_keys(type(obj), lambda name: getattr(obj, name)), 1)
+
+@event.listens_for(db.session, 'after_flush')
+def update_fleet_summary(session, flush_context):
+    """Fold the flushed changes into FleetSummary in the same transaction.
+
+    Inserted rows are counted here, after column defaults have been applied.
+    """
+    deltas = session.info.pop('summary_deltas', {})
+    for obj in session.new:
+        add_deltas(deltas, summary_keys(type(obj), lambda name: getattr(obj, name)), 1)
+    adjust_summary(session.connection(), deltas)
+
+def rebuild_fleet_summary():
+    """Recompute every FleetSummary counter from the base tables."""
+    deltas = {'vehicles': Vehicle.query.count(), 'drivers': Driver.query.count(), 'built': 1}
+    for status, count in db.session.query(Vehicle.status, func.count()).group_by(Vehicle.status):
+        deltas[f'status:{status}'] = count
+    for vehicle_type, count in db.session.query(Vehicle.vehicle_type, func.count()).group_by(Vehicle.vehicle_type):
+        deltas[f'type:{vehicle_type}'] = count
+    deltas['fuel_level_sum'], deltas['fuel_level_count'] = db.session.query(
+        func.coalesce(func.sum(Vehicle.fuel_level), 0), func.count(Vehicle.fuel_level)).one()
+    deltas['maintenance_scheduled'] = MaintenanceRecord.query.filter_by(status='scheduled').count()
+    month = func.strftime('%Y-%m', FuelRecord.date)
+    for key, cost in db.session.query(month, func.sum(FuelRecord.cost)).group_by(month):
+        if key:
+            deltas[f'fuel_cost:{key}'] = cost or 0.0
+    FleetSummary.query.delete()
+    adjust_summary(db.session.connection(), deltas)
+    db.session.commit()
+
+def fleet_summary():
+    """Return the dashboard counters as a dict, rebuilding them once if never built."""
+    values = dict(db.session.query(FleetSummary.key, FleetSummary.value))
+    if 'built' not in values:
+        rebuild_fleet_summary()
+        values = dict(db.session.query(FleetSummary.key, FleetSummary.value))
+    count = values.get('fuel_level_count', 0)
+    return {
+        'vehicles': int(values.get('vehicles', 0)),
+        'drivers': int(values.get('drivers', 0)),
+        'by_status': {k[7:]: int(v) for k, v in values.items() if k.startswith('status:') and v},
+        'by_type': {k[5:]: int(v) for k, v in values.items() if k.startswith('type:') and v},
+        'avg_fuel_level': values.get('fuel_level_sum', 0) / count if count else 0,
+        'maintenance_scheduled': int(values.get('maintenance_scheduled', 0)),
+        'month_fuel_cost': values.get(f'fuel_cost:{datetime.utcnow():%Y-%m}', 0.0)
+    }
@@ -0,0 +1,58 @@
+"""Job kinds for the background executor; each runs inside an app context and returns a JSON-able result."""
+import io
+import os
+
+from fleet import positions, transfer
+from fleet.analytics import rebuild_cost_buckets
+from fleet.extensions import db
+from fleet.jobs import task
+from fleet.models import PositionHistory
+from fleet.services import (detect_fuel_anomalies, import_records, prune_driver_score_history, refresh_driver_scores,
+                            schedule_due_maintenance)
+from fleet.summary import rebuild_fleet_summary
+
+
+@task('detect-fuel-anomalies', pool='process')
+def detect_fuel_anomalies_task(rescan=False):
+    scanned, flagged = detect_fuel_anomalies(rescan=rescan)
+    return {'scanned': scanned, 'flagged': flagged}
+
+
+@task('score-drivers', pool='process')
+def score_drivers_task():
+    return {'scored': refresh_driver_scores()}
+
+
+@task('prune-score-history')
+def prune_score_history_task():
+    return {'deleted': prune_driver_score_history()}
+
+
+@task('schedule-maintenance')
+def schedule_maintenance_task(horizon_days=14):
+    return {'scheduled': schedule_due_maintenance(horizon_days)}
+
+
+@task('rebuild-summary')
+def rebuild_summary_task():
+    rebuild_fleet_summary()
+    rebuild_cost_buckets()
+    return {}
+
+
+@task('downsample-positions')
+def downsample_positions_task():
+    return {'collapsed': positions.downsample(db.session, PositionHistory.__table__)}
+
+
+@task('import-records', max_attempts=1)
+def import_records_task(name, path, fmt):
+    """Import an upload saved by POST /api/import/<name>?async=1, then delete the file.
+
+    A single attempt, since a retry would insert the batches committed before the failure again.
+    """
+    try:
+        with io.open(path, encoding='utf-8-sig', newline='') as stream:
+            return import_records(name, transfer.read_records(stream, fmt, transfer.FIELDS[name]))
+    finally:
+        os.remove(path)
@@ -0,0 +1,115 @@
+"""Parsing, validation and de-duplication of batched vehicle telemetry pings."""
+import json
+from datetime import datetime, timedelta, timezone
+
+# Vehicle columns a ping may update
+TELEMETRY_FIELDS = ('latitude', 'longitude', 'fuel_level', 'current_location')
+MAX_BATCH_SIZE = 10000
+# Epoch seconds datetime can represent: 0001-01-01 to 9999-12-31 UTC
+MIN_EPOCH, MAX_EPOCH = -62135596800, 253402300799
+# Accepted ping times around the receive time: buffered pings from a device that was
+# offline for up to a week, and a little clock skew ahead
+MAX_PING_AGE = timedelta(days=7)
+MAX_PING_SKEW = timedelta(minutes=5)
+
+
+def parse_payload(body, content_type):
+    """Decode a JSON array, a {"pings": [...]} object or NDJSON into a list of dicts."""
+    text = body.decode('utf-8') if isinstance(body, bytes) else body
+    if 'ndjson' in (content_type or '') or 'jsonlines' in (content_type or ''):
+        try:
+            pings = [json.loads(line) for line in text.splitlines() if line.strip()]
+        except ValueError as e:
+            raise ValueError(f'invalid NDJSON: {e}')
+    else:
+        try:
+            pings = json.loads(text)
+        except ValueError as e:
+            raise ValueError(f'invalid JSON: {e}')
+        if isinstance(pings, dict):
+            pings = pings.get('pings')
+    if not isinstance(pings, list):
+        raise ValueError('expected a list of pings')
+    if len(pings) > MAX_BATCH_SIZE:
+        raise ValueError(f'batch exceeds {MAX_BATCH_SIZE} pings')
+    return pings
+
+
+def _timestamp(value, received_at):
+    if value is None:
+        return received_at
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # Out-of-range values raise OSError or OverflowError depending on the platform
+        if not MIN_EPOCH <= value <= MAX_EPOCH:
+            raise ValueError(f'ts must be epoch seconds between {MIN_EPOCH} and {MAX_EPOCH}')
+        ts = datetime.fromtimestamp(value, tz=timezone.utc).replace(tzinfo=None)
+    elif isinstance(value, str):
+        ts = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    else:
+        raise ValueError('ts must be an ISO 8601 string or epoch seconds')
+    if not received_at - MAX_PING_AGE <= ts <= received_at + MAX_PING_SKEW:
+        raise ValueError(f'ts must be within {MAX_PING_AGE.days} days before and '
+                         f'{MAX_PING_SKEW.seconds // 60} minutes after the receive time')
+    return ts
+
+
+def _number(ping, name, low, high):
+    value = ping[name]
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f'{name} must be a number')
+    if not low <= value <= high:
+        raise ValueError(f'{name} must be between {low} and {high}')
+    return float(value)
+
+
+def _normalize(ping, received_at):
+    if not isinstance(ping, dict):
+        raise ValueError('ping must be an object')
+    vehicle_id = ping.get('vehicle_id')
+    if isinstance(vehicle_id, bool) or not isinstance(vehicle_id, int) or vehicle_id <= 0:
+        raise ValueError('vehicle_id must be a positive integer')
+    row = {'vehicle_id': vehicle_id, 'ts': _timestamp(ping.get('ts'), received_at)}
+    if ('latitude' in ping) != ('longitude' in ping):
+        raise ValueError('latitude and longitude must be sent together')
+    if 'latitude' in ping:
+        row['latitude'] = _number(ping, 'latitude', -90, 90)
+        row['longitude'] = _number(ping, 'longitude', -180, 180)
+    if 'fuel_level' in ping:
+        row['fuel_level'] = _number(ping, 'fuel_level', 0, 100)
+    if 'speed' in ping:
+        row['speed'] = _number(ping, 'speed', 0, 500)
+    if 'current_location' in ping:
+        location = ping['current_location']
+        if not isinstance(location, str) or len(location) > 200:
+            raise ValueError('current_location must be a string of at most 200 characters')
+        row['current_location'] = location
+    if not any(field in row for field in TELEMETRY_FIELDS):
+        raise ValueError('ping carries no telemetry fields')
+    return row
+
+
+def validate_pings(pings, received_at=None):
+    """Normalize pings, returning (valid rows, [{'index', 'error'}] for rejected ones)."""
+    received_at = received_at or datetime.utcnow()
+    valid, rejected = [], []
+    for index, ping in enumerate(pings):
+        try:
+            row = _normalize(ping, received_at)
+        except (ValueError, TypeError, OverflowError, OSError) as e:
+            rejected.append({'index': index, 'error': str(e)})
+            continue
+        row['index'] = index
+        valid.append(row)
+    return valid, rejected
+
+
+def latest_per_vehicle(rows):
+    """Keep only the newest row per vehicle; later rows in the batch win ties."""
+    latest = {}
+    for row in rows:
+        current = latest.get(row['vehicle_id'])
+        if current is None or row['ts'] >= current['ts']:
+            latest[row['vehicle_id']] = row
+    return list(latest.values())
@@ -0,0 +1,206 @@
+"""Streaming CSV/NDJSON readers and writers for bulk import and export of fleet records.
+
+Readers yield one record at a time from a text stream and writers buffer
+rows into chunks, so neither side ever holds a whole file in memory.
+"""
+import csv
+import io
+import json
+from collections import namedtuple
+from datetime import datetime, timezone
+from itertools import islice
+
+FORMATS = ('csv', 'ndjson')
+MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+# Rows per write when exporting
+CHUNK_ROWS = 1000
+
+Field = namedtuple('Field', 'name parse required')
+
+
+def _text(max_length):
+    def parse(value):
+        value = str(value)
+        if len(value) > max_length:
+            raise ValueError(f'at most {max_length} characters')
+        return value
+    return parse
+
+
+def _number(low, high):
+    def parse(value):
+        if isinstance(value, bool):
+            raise ValueError('must be a number')
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError('must be a number')
+        if not low <= value <= high:
+            raise ValueError(f'must be between {low} and {high}')
+        return value
+    return parse
+
+
+def _integer(low, high):
+    def parse(value):
+        if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+            raise ValueError('must be an integer')
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValueError('must be an integer')
+        if not low <= value <= high:
+            raise ValueError(f'must be between {low} and {high}')
+        return value
+    return parse
+
+
+def _datetime(value):
+    """ISO 8601 date or date-time; aware values are converted to naive UTC."""
+    try:
+        ts = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError('must be an ISO 8601 date or date-time')
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+_id = _integer(1, 2 ** 63 - 1)
+_rating = _number(0, 10)
+
+# Importable columns per export name; id, created_at and updated_at are always assigned on insert
+FIELDS = {
+    'vehicles': (
+        Field('name', _text(80), True),
+        Field('vehicle_type', _text(50), False),
+        Field('model', _text(100), False),
+        Field('year', _integer(1900, 2100), False),
+        Field('current_location', _text(200), False),
+        Field('latitude', _number(-90, 90), False),
+        Field('longitude', _number(-180, 180), False),
+        Field('fuel_level', _number(0, 100), False),
+        Field('status', _text(50), False),
+        Field('last_maintenance', _datetime, False),
+        Field('tank_capacity', _number(0.1, 100000), False),
+        Field('image_url', _text(500), False),
+    ),
+    'drivers': (
+        Field('name', _text(80), True),
+        Field('license_number', _text(50), False),
+        Field('performance_rating', _rating, False),
+        Field('speed_score', _rating, False),
+        Field('braking_score', _rating, False),
+        Field('safety_rating', _text(20), False),
+        Field('vehicle_id', _id, False),
+    ),
+    'fuel-records': (
+        Field('vehicle_id', _id, True),
+        Field('driver_id', _id, False),
+        Field('date', _datetime, True),
+        Field('quantity', _number(0, 100000), True),
+        Field('cost', _number(0, 10000000), True),
+        Field('location', _text(200), False),
+    ),
+    'maintenance-records': (
+        Field('vehicle_id', _id, True),
+        Field('date', _datetime, True),
+        Field('description', _text(200), False),
+        Field('cost', _number(0, 10000000), False),
+        Field('status', _text(50), False),
+    ),
+}
+
+
+def detect_format(value, default='csv'):
+    """Pick the format from an explicit name, a content type or a file name."""
+    value = (value or '').lower()
+    if 'ndjson' in value or 'jsonlines' in value or value.endswith('.jsonl'):
+        return 'ndjson'
+    if 'csv' in value:
+        return 'csv'
+    return default
+
+
+def validate_record(record, fields):
+    """Parse one raw record into column values; raises ValueError naming the bad field.
+
+    Blank values count as missing. Columns not in `fields` are ignored, so
+    files written by the export endpoints import as they are.
+    """
+    if not isinstance(record, dict):
+        raise ValueError('record must be an object')
+    row = {}
+    for field in fields:
+        value = record.get(field.name)
+        if value is None or value == '':
+            if field.required:
+                raise ValueError(f'{field.name} is required')
+            continue
+        try:
+            row[field.name] = field.parse(value)
+        except ValueError as e:
+            raise ValueError(f'{field.name} {e}')
+    return row
+
+
+def read_records(stream, fmt, fields):
+    """Yield (line, row, error) for each record of a text stream; exactly one of row and error is set."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        missing = [field.name for field in fields if field.required and field.name not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f"CSV header is missing {', '.join(missing)}")
+        for record in reader:
+            try:
+                yield reader.line_num, validate_record(record, fields), None
+            except ValueError as e:
+                yield reader.line_num, None, str(e)
+    else:
+        for line, text in enumerate(stream, 1):
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+            except ValueError as e:
+                yield line, None, f'invalid JSON: {e}'
+                continue
+            try:
+                yield line, validate_record(record, fields), None
+            except ValueError as e:
+                yield line, None, str(e)
+
+
+def write_chunks(rows, columns, fmt, date_columns=(), chunk_rows=CHUNK_ROWS):
+    """Yield the encoded export of rows in chunks of up to chunk_rows records.
+
+    Values of date_columns are written as ISO 8601; the rest are written as
+    they come, with None as an empty CSV field or JSON null.
+    """
+    dates = [i for i, name in enumerate(columns) if name in date_columns]
+
+    def plain(row):
+        row = list(row)
+        for i in dates:
+            if row[i] is not None:
+                row[i] = row[i].isoformat()
+        return row
+
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            break
+        if fmt == 'csv':
+            writer.writerows(map(plain, chunk))
+        else:
+            buffer.writelines(json.dumps(dict(zip(columns, plain(row)))) + '\n' for row in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,28 @@
+"""Blueprints, one per subsystem, and helpers shared by their views."""
+from flask import jsonify
+
+def get_safety_badge_color(score):
+    if score >= 8.0:
+        return 'success'
+    elif score >= 6.0:
+        return 'warning'
+    else:
+        return 'danger'
+
+def get_fuel_level_color(level):
+    if level >= 70:
+        return 'success'
+    elif level >= 30:
+        return 'warning'
+    return 'danger'
+
+def paginated_json(page, serialize):
+    """Serialize a Page as a JSON list, passing the next cursor in a header."""
+    response = jsonify([serialize(item) for item in page])
+    if page.next_cursor:
+        response.headers['X-Next-Cursor'] = page.next_cursor
+    return response
+
+def columnar(items, columns):
+    """Turn a list of dicts into {column: [values]} for compact JSON."""
+    return {column: [item.get(column) for item in items] for column in columns}
@@ -0,0 +1,669 @@
+"""JSON APIs under /api: lists, locations, telemetry ingestion, bulk transfer and the event stream."""
+import hashlib
+import io
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, jsonify, request, stream_with_context, url_for
+from flask_login import current_user, login_required
+from sqlalchemy import func
+
+from fleet import analytics, jobs, positions, scoring
+from fleet.database import read_only
+from fleet.extensions import db, event_hub, score_refresher, token_signer, vehicle_index
+from fleet.invalidation import cached_response
+from fleet.models import (DeletedVehicle, Driver, DriverScoreHistory, FuelAnomaly, FuelRecord, Geofence,
+                          GeofenceEvent, Job, MaintenanceRecord, PositionHistory, Vehicle, ANOMALY_FILTERS, DRIVER_FILTERS,
+                          FUEL_FILTERS, GEOFENCE_EVENT_FILTERS, GEOFENCE_FILTERS, MAINTENANCE_FILTERS,
+                          VEHICLE_FILTERS)
+from fleet.pagination import MAX_PAGE_SIZE, apply_filters, decode_cursor, encode_cursor, keyset_paginate, page_size_arg
+from fleet.security import AuthUser
+from fleet.services import (LOCATION_COLUMNS, STREAM_TOPICS, TRANSFER_MODELS, apply_geofences, apply_telemetry,
+                            authenticate, delete_geofence, enqueue_job, export_rows, geocode_worker, import_records,
+                            location_version, publish_geofence_events, save_geofence, synced_due_queue,
+                            synced_geofence_index, synced_vehicle_index)
+from fleet.spatial import parse_bbox, parse_point
+from fleet.telemetry import TELEMETRY_FIELDS, parse_payload, validate_pings
+from fleet.transfer import FIELDS, FORMATS, MIMETYPES, detect_format, read_records, write_chunks
+from fleet.views import columnar, paginated_json
+
+bp = Blueprint('api', __name__, url_prefix='/api')
+
+@bp.route('/tokens', methods=['POST'])
+def create_token():
+    """Issue a bearer token for {"username", "password"}, or for the logged-in user when none are given.
+
+    Send it as `Authorization: Bearer <token>` to any /api/ endpoint; see
+    fleet.views.auth.load_token_user.
+    """
+    data = request.get_json(silent=True) or {}
+    if data.get('username') is not None or data.get('password') is not None:
+        if not isinstance(data.get('username'), str) or not isinstance(data.get('password'), str):
+            return jsonify({'error': 'username and password must be strings'}), 400
+        user = authenticate(data['username'], data['password'])
+        if user is None:
+            return jsonify({'error': 'Invalid username or password'}), 401
+        user = AuthUser.from_user(user)
+    elif current_user.is_authenticated and 'Authorization' not in request.headers:
+        # Session users only: a token renewing itself would never expire
+        user = current_user._get_current_object()
+    else:
+        return jsonify({'error': 'username and password are required'}), 400
+    return jsonify({'token': token_signer.sign(user), 'token_type': 'Bearer',
+                    'expires_in': current_app.config['API_TOKEN_MAX_AGE']})
+
+@bp.route('/vehicle-locations')
+@login_required
+@read_only
+def vehicle_locations():
+    """Vehicle positions as a full snapshot or, with ?since=<version>, only what changed.
+
+    Every response carries a strong ETag derived from the data version and
+    the query, so unchanged polls are answered with 304 before any rows are
+    loaded. ?format=columnar and all delta responses use column arrays.
+    """
+    latest, deleted_at = location_version()
+    version = encode_cursor(list(latest)) if latest else None
+    args = sorted(request.args.items(multi=True))
+    etag = hashlib.sha1(json.dumps([version, str(deleted_at), args]).encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = _vehicle_locations_body(version)
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    if version:
+        response.headers['X-Version'] = version
+    return response
+
+def _vehicle_locations_body(version):
+    distances = {}
+    since = request.args.get('since')
+    key = [Vehicle.updated_at, Vehicle.id] if since else [Vehicle.id]
+    try:
+        query = apply_filters(Vehicle.query, request.args, VEHICLE_FILTERS)
+        if request.args.get('bbox'):
+            ids = synced_vehicle_index().within_bbox(*parse_bbox(request.args['bbox']))
+            query = query.filter(Vehicle.id.in_(ids))
+        if request.args.get('near'):
+            lat, lon = parse_point(request.args['near'])
+            radius = request.args.get('radius', 5.0, type=float)
+            distances = {vehicle_id: distance for distance, vehicle_id in
+                         synced_vehicle_index().within_radius(lat, lon, radius)}
+            query = query.filter(Vehicle.id.in_(list(distances)))
+        # A since token is a keyset cursor over (updated_at, id), so deltas page like any list
+        vehicles = keyset_paginate(query, key, since or request.args.get('cursor'),
+                                   page_size_arg(request.args, default=MAX_PAGE_SIZE))
+    except ValueError as e:
+        response = jsonify({'error': str(e)})
+        response.status_code = 400
+        return response
+
+    columns = LOCATION_COLUMNS + (('distance_km',) if distances else ())
+    items = []
+    for v in vehicles:
+        item = {column: getattr(v, column) for column in LOCATION_COLUMNS}
+        if v.id in distances:
+            item['distance_km'] = round(distances[v.id], 3)
+        items.append(item)
+
+    if since:
+        since_at = decode_cursor(since, key)[0]
+        last = vehicles.items[-1] if vehicles.items else None
+        deleted = [vehicle_id for (vehicle_id,) in db.session.query(DeletedVehicle.vehicle_id)
+                   .filter(DeletedVehicle.deleted_at >= since_at)]
+        return jsonify({
+            'version': encode_cursor([last.updated_at, last.id]) if last else since,
+            'has_more': vehicles.has_next,
+            'data': columnar(items, columns),
+            'deleted': deleted
+        })
+    if request.args.get('format') == 'columnar':
+        response = jsonify({'version': version, 'data': columnar(items, columns)})
+    else:
+        response = jsonify(items)
+    if vehicles.next_cursor:
+        response.headers['X-Next-Cursor'] = vehicles.next_cursor
+    return response
+
+@bp.route('/vehicles/nearest')
+@login_required
+@read_only
+def nearest_vehicles():
+    try:
+        lat, lon = parse_point(f"{request.args['lat']},{request.args['lon']}")
+        k = max(1, min(request.args.get('k', 5, type=int), MAX_PAGE_SIZE))
+    except (KeyError, ValueError):
+        return jsonify({'error': 'lat and lon are required'}), 400
+    nearest = synced_vehicle_index().nearest(lat, lon, k)
+    vehicles = {v.id: v for v in Vehicle.query.filter(Vehicle.id.in_([i for _, i in nearest]))}
+    return jsonify([{
+        'id': vehicle_id,
+        'name': vehicles[vehicle_id].name,
+        'latitude': vehicles[vehicle_id].latitude,
+        'longitude': vehicles[vehicle_id].longitude,
+        'status': vehicles[vehicle_id].status,
+        'distance_km': round(distance, 3)
+    } for distance, vehicle_id in nearest if vehicle_id in vehicles])
+
+@bp.route('/maintenance-alerts')
+@login_required
+@read_only
+@cached_response('MaintenanceRecord', 'Vehicle')
+def maintenance_alerts():
+    query = db.session.query(
+        MaintenanceRecord.id,
+        MaintenanceRecord.vehicle_id,
+        Vehicle.name.label('vehicle_name'),
+        MaintenanceRecord.description,
+        MaintenanceRecord.date
+    ).outerjoin(Vehicle, MaintenanceRecord.vehicle_id == Vehicle.id) \
+        .filter(MaintenanceRecord.status == 'scheduled')
+    try:
+        query = apply_filters(query, request.args, {'vehicle_id': MaintenanceRecord.vehicle_id},
+                              date_column=MaintenanceRecord.date)
+        alerts = keyset_paginate(query, [MaintenanceRecord.date, MaintenanceRecord.id],
+                                 request.args.get('cursor'), page_size_arg(request.args, default=MAX_PAGE_SIZE))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return paginated_json(alerts, lambda alert: {
+        'id': alert.id,
+        'vehicle_id': alert.vehicle_id,
+        'vehicle_name': alert.vehicle_name,
+        'description': alert.description,
+        'date': alert.date.strftime('%Y-%m-%d')
+    })
+
+@bp.route('/maintenance-due')
+@login_required
+@read_only
+def maintenance_due():
+    """The ?k= vehicles due for service soonest, predicted from service intervals and fuel usage.
+
+    Served from the in-memory due queue in O(k log n); open scheduled records
+    are attached so clients can tell which are already booked.
+    """
+    k = max(1, min(request.args.get('k', 10, type=int), MAX_PAGE_SIZE))
+    items = synced_due_queue().top(k)
+    ids = [item.vehicle_id for item in items]
+    names = dict(db.session.query(Vehicle.id, Vehicle.name).filter(Vehicle.id.in_(ids)))
+    booked = dict(db.session.query(MaintenanceRecord.vehicle_id, func.min(MaintenanceRecord.date))
+                  .filter(MaintenanceRecord.vehicle_id.in_(ids), MaintenanceRecord.status == 'scheduled')
+                  .group_by(MaintenanceRecord.vehicle_id))
+    return jsonify([{
+        'vehicle_id': item.vehicle_id,
+        'vehicle_name': names.get(item.vehicle_id),
+        'due': item.due.strftime('%Y-%m-%d'),
+        'reason': item.reason,
+        'last_service': item.last_service.strftime('%Y-%m-%d'),
+        'liters_since_service': round(item.liters_used, 1),
+        'liters_per_day': round(item.liters_per_day, 1),
+        'scheduled': booked[item.vehicle_id].strftime('%Y-%m-%d') if item.vehicle_id in booked else None
+    } for item in items])
+
+@bp.route('/vehicles')
+@login_required
+@read_only
+@cached_response('Vehicle', 'Vehicle.live')
+def list_vehicles():
+    try:
+        query = apply_filters(Vehicle.query, request.args, VEHICLE_FILTERS)
+        vehicles = keyset_paginate(query, [Vehicle.id], request.args.get('cursor'), page_size_arg(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return paginated_json(vehicles, lambda v: {
+        'id': v.id,
+        'name': v.name,
+        'vehicle_type': v.vehicle_type,
+        'model': v.model,
+        'year': v.year,
+        'status': v.status,
+        'fuel_level': v.fuel_level,
+        'current_location': v.current_location
+    })
+
+@bp.route('/drivers')
+@login_required
+@read_only
+@cached_response('Driver')
+def list_drivers():
+    try:
+        query = apply_filters(Driver.query, request.args, DRIVER_FILTERS)
+        drivers = keyset_paginate(query, [Driver.id], request.args.get('cursor'), page_size_arg(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return paginated_json(drivers, lambda d: {
+        'id': d.id,
+        'name': d.name,
+        'license_number': d.license_number,
+        'vehicle_id': d.vehicle_id,
+        'performance_rating': d.performance_rating,
+        'safety_rating': d.safety_rating
+    })
+
+@bp.route('/fuel-records')
+@login_required
+@read_only
+@cached_response('FuelRecord')
+def list_fuel_records():
+    try:
+        query = apply_filters(FuelRecord.query, request.args, FUEL_FILTERS, date_column=FuelRecord.date)
+        records = keyset_paginate(query, [FuelRecord.date, FuelRecord.id], request.args.get('cursor'),
+                                  page_size_arg(request.args), descending=True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return paginated_json(records, lambda r: {
+        'id': r.id,
+        'vehicle_id': r.vehicle_id,
+        'driver_id': r.driver_id,
+        'date': r.date.isoformat(),
+        'quantity': r.quantity,
+        'cost': r.cost,
+        'location': r.location
+    })
+
+@bp.route('/fuel-anomalies')
+@login_required
+@read_only
+@cached_response('FuelAnomaly')
+def list_fuel_anomalies():
+    """Refuels flagged by `flask detect-fuel-anomalies`, newest refuel first."""
+    try:
+        query = apply_filters(FuelAnomaly.query, request.args, ANOMALY_FILTERS, date_column=FuelAnomaly.date)
+        flagged = keyset_paginate(query, [FuelAnomaly.date, FuelAnomaly.id], request.args.get('cursor'),
+                                  page_size_arg(request.args), descending=True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return paginated_json(flagged, lambda a: {
+        'id': a.id,
+        'fuel_record_id': a.fuel_record_id,
+        'vehicle_id': a.vehicle_id,
+        'driver_id': a.driver_id,
+        'date': a.date.isoformat(),
+        'kind': a.kind,
+        'value': a.value,
+        'expected': a.expected,
+        'score': a.score,
+        'detected_at': a.detected_at.isoformat()
+    })
+
+def geofence_json(fence):
+    return {
+        'id': fence.id,
+        'name': fence.name,
+        'kind': fence.kind,
+        'geometry': json.loads(fence.geometry),
+        'bbox': [fence.min_lon, fence.min_lat, fence.max_lon, fence.max_lat],
+        'updated_at': fence.updated_at.isoformat()
+    }
+
+@bp.route('/geofences')
+@login_required
+@read_only
+def list_geofences():
+    """Geofences by id; ?point=lat,lon keeps those containing the point, looked up in the grid index."""
+    try:
+        query = apply_filters(Geofence.query, request.args, GEOFENCE_FILTERS)
+        if request.args.get('point'):
+            ids = synced_geofence_index().containing(*parse_point(request.args['point']))
+            query = query.filter(Geofence.id.in_(ids))
+        fences = keyset_paginate(query, [Geofence.id], request.args.get('cursor'), page_size_arg(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return paginated_json(fences, geofence_json)
+
+@bp.route('/geofences', methods=['POST'])
+@login_required
+def create_geofence():
+    """Create a fence from {"name", "kind": "circle"|"polygon", "geometry"}."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': 'expected a JSON object'}), 400
+    try:
+        fence = save_geofence(Geofence(), data.get('name'), data.get('kind'), data.get('geometry'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    db.session.add(fence)
+    db.session.commit()
+    return jsonify(dict(geofence_json(fence), success=True)), 201
+
+@bp.route('/geofences/<int:id>', methods=['PUT', 'DELETE'])
+@login_required
+def update_geofence(id):
+    """Replace a fence's name and shape, or delete it with its states and events.
+
+    Vehicles inside a reshaped fence get enter or exit events from their next ping.
+    """
+    fence = Geofence.query.get_or_404(id)
+    if request.method == 'DELETE':
+        delete_geofence(fence)
+        db.session.commit()
+        return jsonify({'success': True})
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': 'expected a JSON object'}), 400
+    try:
+        save_geofence(fence, data.get('name', fence.name), data.get('kind', fence.kind),
+                      data.get('geometry', json.loads(fence.geometry)))
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    db.session.commit()
+    return jsonify(dict(geofence_json(fence), success=True))
+
+@bp.route('/geofence-events')
+@login_required
+@read_only
+@cached_response('GeofenceEvent')
+def list_geofence_events():
+    """Enter and exit events, newest first; filter by vehicle_id, geofence_id, kind, from and to."""
+    try:
+        query = apply_filters(GeofenceEvent.query, request.args, GEOFENCE_EVENT_FILTERS, date_column=GeofenceEvent.ts)
+        events = keyset_paginate(query, [GeofenceEvent.ts, GeofenceEvent.id], request.args.get('cursor'),
+                                 page_size_arg(request.args), descending=True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return paginated_json(events, lambda e: {
+        'id': e.id,
+        'geofence_id': e.geofence_id,
+        'vehicle_id': e.vehicle_id,
+        'kind': e.kind,
+        'ts': e.ts.isoformat(),
+        'latitude': e.latitude,
+        'longitude': e.longitude
+    })
+
+def analytics_range(args):
+    """Read ?period=day|month (default month) and ?from=/&to= dates into (period, first, last bucket)."""
+    period = args.get('period', 'month')
+    try:
+        start = datetime.fromisoformat(args['from']) if args.get('from') else None
+        end = datetime.fromisoformat(args['to']) if args.get('to') else None
+    except ValueError:
+        raise ValueError('from and to must be ISO 8601 dates')
+    return (period,) + analytics.bucket_range(period, start, end)
+
+@bp.route('/analytics/costs')
+@login_required
+@read_only
+@cached_response('FuelRecord', 'MaintenanceRecord')
+def fleet_costs():
+    """Fleet-wide fuel and maintenance totals per day or month, read from the cost buckets."""
+    try:
+        period, first, last = analytics_range(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'period': period, 'from': first, 'to': last,
+                    'buckets': analytics.cost_series(period, first, last)})
+
+@bp.route('/analytics/vehicles/<int:id>/costs')
+@login_required
+@read_only
+@cached_response(lambda id: f'Vehicle:{id}')
+def vehicle_costs(id):
+    """One vehicle's totals per day or month, plus its all-time totals."""
+    Vehicle.query.get_or_404(id)
+    try:
+        period, first, last = analytics_range(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'vehicle_id': id, 'period': period, 'from': first, 'to': last,
+                    'totals': analytics.vehicle_totals(id),
+                    'buckets': analytics.cost_series(period, first, last, vehicle_id=id)})
+
+@bp.route('/analytics/top-vehicles')
+@login_required
+@read_only
+@cached_response('FuelRecord', 'MaintenanceRecord', 'Vehicle')
+def top_cost_vehicles():
+    """The ?n= (default 10) most expensive vehicles over the range by ?metric= (default total_cost)."""
+    n = max(1, min(request.args.get('n', 10, type=int), MAX_PAGE_SIZE))
+    try:
+        period, first, last = analytics_range(request.args)
+        ranked = analytics.top_vehicles(n, request.args.get('metric', 'total_cost'), period, first, last)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'period': period, 'from': first, 'to': last, 'vehicles': ranked})
+
+@bp.route('/analytics/vehicle-types')
+@login_required
+@read_only
+@cached_response('FuelRecord', 'MaintenanceRecord', 'Vehicle')
+def vehicle_type_costs():
+    """Totals per vehicle type over the range, with cost per vehicle and fuel cost per liter."""
+    try:
+        period, first, last = analytics_range(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'period': period, 'from': first, 'to': last,
+                    'types': analytics.type_comparison(period, first, last)})
+
+@bp.route('/maintenance-records')
+@login_required
+@read_only
+@cached_response('MaintenanceRecord')
+def list_maintenance_records():
+    try:
+        query = apply_filters(MaintenanceRecord.query, request.args, MAINTENANCE_FILTERS,
+                              date_column=MaintenanceRecord.date)
+        records = keyset_paginate(query, [MaintenanceRecord.date, MaintenanceRecord.id],
+                                  request.args.get('cursor'), page_size_arg(request.args), descending=True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return paginated_json(records, lambda r: {
+        'id': r.id,
+        'vehicle_id': r.vehicle_id,
+        'date': r.date.isoformat(),
+        'description': r.description,
+        'cost': r.cost,
+        'status': r.status
+    })
+
+@bp.route('/telemetry', methods=['POST'])
+@login_required
+def ingest_telemetry():
+    try:
+        pings = parse_payload(request.get_data(), request.content_type)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    rows, rejected = validate_pings(pings)
+    try:
+        applied, unknown = apply_telemetry(rows)
+        unknown_ids = {row['vehicle_id'] for row in unknown}
+        crossings = apply_geofences([row for row in rows if row['vehicle_id'] not in unknown_ids])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    score_refresher.mark(('vehicle', row['vehicle_id']) for row in applied if 'speed' in row)
+    worker = geocode_worker()
+    for row in applied:
+        if 'latitude' in row:
+            vehicle_index.update(row['vehicle_id'], row['latitude'], row['longitude'])
+            if worker is not None and 'current_location' not in row:
+                worker.submit(row['vehicle_id'], row['latitude'], row['longitude'])
+        event_hub.publish('positions', dict(
+            {'vehicle_id': row['vehicle_id'], 'ts': row['ts'].isoformat()},
+            **{field: row[field] for field in TELEMETRY_FIELDS if field in row}
+        ), key=row['vehicle_id'])
+    publish_geofence_events(crossings)
+
+    rejected.extend({'index': row['index'], 'error': 'unknown vehicle'} for row in unknown)
+    return jsonify({
+        'success': True,
+        'received': len(pings),
+        'applied': len(applied),
+        'superseded': len(rows) - len(applied) - len(unknown),
+        'geofence_events': len(crossings),
+        'rejected': sorted(rejected, key=lambda r: r['index'])
+    })
+
+@bp.route('/export/<name>')
+@login_required
+@read_only
+def export_data(name):
+    """Stream every row of vehicles, drivers, fuel-records or maintenance-records.
+
+    ?format=csv (default) or ndjson. The filters of the matching list API and
+    ?from=/&to= on record dates apply. Rows are read and written in chunks, so
+    exports of any size run in constant memory.
+    """
+    if name not in TRANSFER_MODELS:
+        return jsonify({'error': f'unknown export {name}'}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(FORMATS)}"}), 400
+    try:
+        columns, date_columns, rows = export_rows(name, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = current_app.response_class(stream_with_context(write_chunks(rows, columns, fmt, date_columns)),
+                                          mimetype=MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{fmt}'
+    return response
+
+@bp.route('/import/<name>', methods=['POST'])
+@login_required
+def import_data(name):
+    """Insert rows from a CSV or NDJSON body, or an uploaded `file`, in batched transactions.
+
+    The format comes from ?format= or the content type. The body is parsed as
+    it arrives; rejected rows are reported by line number. With ?async=1 the
+    body is saved and imported by a background job instead, and the response
+    is 202 with the job's status URL.
+    """
+    if name not in TRANSFER_MODELS:
+        return jsonify({'success': False, 'error': f'unknown import {name}'}), 404
+    upload = request.files.get('file')
+    if upload is not None:
+        fmt = detect_format(request.args.get('format') or upload.filename)
+        raw = upload.stream
+    else:
+        fmt = detect_format(request.args.get('format') or request.content_type)
+        raw = request.stream
+    if request.args.get('async'):
+        directory = os.path.join(current_app.instance_path, 'uploads')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{uuid.uuid4().hex}.{fmt}')
+        with open(path, 'wb') as saved:
+            shutil.copyfileobj(raw, saved)
+        job = enqueue_job('import-records', {'name': name, 'path': path, 'fmt': fmt})
+        return job_accepted(job)
+    stream = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+    try:
+        report = import_records(name, read_records(stream, fmt, FIELDS[name]))
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify(dict(report, success=True))
+
+def job_json(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'args': json.loads(job.args),
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'run_at': job.run_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error
+    }
+
+def job_accepted(job):
+    status_url = url_for('.job_status', id=job.id)
+    response = jsonify(dict(job_json(job), success=True, status_url=status_url))
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    return response
+
+@bp.route('/jobs', methods=['POST'])
+@login_required
+def create_job():
+    """Queue a background job from {"kind", "args", "dedup_key"}; answers 202 with its status URL."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('args', {}), dict):
+        return jsonify({'success': False, 'error': 'expected a JSON object with an args object'}), 400
+    if data.get('kind') == 'import-records':
+        return jsonify({'success': False, 'error': 'use POST /api/import/<name>?async=1'}), 400
+    try:
+        job = enqueue_job(data.get('kind'), data.get('args'), dedup_key=data.get('dedup_key'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e), 'kinds': sorted(jobs.TASKS)}), 400
+    return job_accepted(job)
+
+@bp.route('/jobs/<int:id>')
+@login_required
+@read_only
+def job_status(id):
+    return jsonify(job_json(Job.query.get_or_404(id)))
+
+@bp.route('/stream')
+@login_required
+def event_stream():
+    """Server-Sent Events feed of position updates, maintenance changes and geofence crossings.
+
+    ?topics=positions,maintenance,geofences selects the feeds. Events are pushed by the
+    writers, so open streams cost no queries.
+    """
+    topics = [t for t in request.args.get('topics', ','.join(STREAM_TOPICS)).split(',') if t]
+    if not topics or any(topic not in STREAM_TOPICS for topic in topics):
+        return jsonify({'error': f"topics must be a subset of: {', '.join(STREAM_TOPICS)}"}), 400
+    subscription = event_hub.subscribe(topics)
+    # The stream needs no app context; hand back the connection load_user may have checked out,
+    # or every open dashboard would hold one pooled connection for as long as it stays open
+    db.session.remove()
+    response = current_app.response_class(subscription.stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@bp.route('/vehicle/<int:id>/track')
+@login_required
+@read_only
+def vehicle_track(id):
+    Vehicle.query.get_or_404(id)
+    try:
+        end = datetime.fromisoformat(request.args['to']) if request.args.get('to') else datetime.utcnow()
+        start = datetime.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=1)
+        start, end = positions.epoch(start), positions.epoch(end)
+        resolution = positions.pick_resolution(start, end, request.args.get('resolution'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'vehicle_id': id,
+        'from': start,
+        'to': end,
+        'resolution': resolution,
+        'columns': ['ts', 'latitude', 'longitude', 'speed'],
+        'points': positions.track(db.session, PositionHistory.__table__, id, start, end, resolution)
+    })
+
+@bp.route('/driver-performance/<int:driver_id>')
+@login_required
+@read_only
+def driver_performance_data(driver_id):
+    driver = Driver.query.get_or_404(driver_id)
+    # Daily average of the stored performance scores over the retained history
+    day = func.date(DriverScoreHistory.computed_at)
+    history = db.session.query(day.label('day'), func.avg(DriverScoreHistory.performance_score).label('score')) \
+        .filter(DriverScoreHistory.driver_id == driver_id,
+                DriverScoreHistory.computed_at >= datetime.utcnow() - timedelta(days=scoring.HISTORY_RETENTION_DAYS)) \
+        .group_by(day).order_by(day).all()
+    return jsonify({
+        'name': driver.name,
+        'current_rating': driver.performance_rating,
+        'dates': [row.day for row in history],
+        'scores': [round(row.score, 2) for row in history]
+    })
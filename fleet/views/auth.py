@@ -0,0 +1,91 @@
+"""Login, signup and logout, and how each request finds its user."""
+from flask import (Blueprint, abort, current_app, flash, jsonify, make_response, redirect, render_template, request,
+                   url_for)
+from flask_login import current_user, login_required, login_user, logout_user
+
+from fleet.extensions import db, login_manager, token_signer, user_cache
+from fleet.models import User
+from fleet.security import AuthUser, hash_password
+from fleet.services import authenticate
+
+bp = Blueprint('auth', __name__)
+
+@login_manager.user_loader
+def load_user(user_id):
+    """The session's user, from the per-process cache when it holds them."""
+    user = user_cache.get(int(user_id))
+    if user is None:
+        row = User.query.get(int(user_id))
+        if row is None:
+            return None
+        user = AuthUser.from_user(row)
+        user_cache.set(user)
+    return user
+
+@login_manager.request_loader
+def load_token_user(request):
+    """The user of an /api/ request carrying `Authorization: Bearer <token>` from POST /api/tokens.
+
+    Only reached without a session; the token is verified by signature
+    alone, without a database lookup.
+    """
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme != 'Bearer' or not request.path.startswith('/api/'):
+        return None
+    try:
+        return token_signer.load(token)
+    except ValueError as e:
+        abort(make_response(jsonify({'error': str(e)}), 401))
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('dashboard.dashboard'))
+
+    if request.method == 'POST':
+        user = authenticate(request.form['username'], request.form['password'])
+        if user:
+            user = AuthUser.from_user(user)
+            user_cache.set(user)
+            login_user(user)
+            next_page = request.args.get('next')
+            return redirect(next_page) if next_page else redirect(url_for('dashboard.dashboard'))
+        flash('Invalid username or password')
+    return render_template('login.html')
+
+@bp.route('/signup', methods=['GET', 'POST'])
+def signup():
+    if current_user.is_authenticated:
+        return redirect(url_for('dashboard.dashboard'))
+
+    if request.method == 'POST':
+        if User.query.filter_by(username=request.form['username']).first():
+            flash('Username already exists')
+            return redirect(url_for('.signup'))
+        if User.query.filter_by(email=request.form['email']).first():
+            flash('Email already registered')
+            return redirect(url_for('.signup'))
+
+        user = User(
+            username=request.form['username'],
+            password=hash_password(request.form['password'], current_app.config['PASSWORD_HASH_METHOD']),
+            email=request.form['email']
+        )
+        db.session.add(user)
+        try:
+            db.session.commit()
+            flash('Account created successfully. Please log in.')
+            return redirect(url_for('.login'))  # Redirect to the login page
+        except Exception as e:
+            db.session.rollback()
+            flash('Error creating account')
+            return redirect(url_for('.signup'))
+
+    return render_template('signup.html')
+
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('dashboard.index'))
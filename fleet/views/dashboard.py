@@ -0,0 +1,18 @@
+"""Landing page and the fleet dashboard."""
+from flask import Blueprint, redirect, render_template, url_for
+from flask_login import current_user, login_required
+
+from fleet.summary import fleet_summary
+
+bp = Blueprint('dashboard', __name__)
+
+@bp.route('/')
+def index():
+    if current_user.is_authenticated:
+        return redirect(url_for('.dashboard'))
+    return render_template('index.html')
+
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    return render_template('dashboard.html', summary=fleet_summary())
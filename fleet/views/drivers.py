@@ -0,0 +1,43 @@
+"""Driver performance overview."""
+from flask import Blueprint, abort, render_template, request
+from flask_login import login_required
+from sqlalchemy import func
+
+from fleet import scoring
+from fleet.database import read_only
+from fleet.extensions import db
+from fleet.models import Driver
+from fleet.pagination import keyset_paginate, page_size_arg
+from fleet.views import get_safety_badge_color
+
+bp = Blueprint('drivers', __name__)
+
+@bp.route('/driver-performance')
+@login_required
+@read_only
+def driver_performance():
+    # Safety is derived from the speed and braking scores the scoring run copies onto Driver
+    safety = (Driver.speed_score * scoring.SAFETY_WEIGHTS[0] +
+              Driver.braking_score * scoring.SAFETY_WEIGHTS[1]).label('safety_score')
+    query = db.session.query(Driver, safety)
+    try:
+        drivers = keyset_paginate(query, [Driver.id], request.args.get('cursor'), page_size_arg(request.args))
+    except ValueError as e:
+        abort(400, str(e))
+
+    avg_speed_score, avg_braking_score, safety_index = db.session.query(
+        func.coalesce(func.avg(Driver.speed_score), 0),
+        func.coalesce(func.avg(Driver.braking_score), 0),
+        func.coalesce(func.avg(safety), 0)
+    ).one()
+    top_driver = Driver.query.order_by(Driver.performance_rating.desc()).first()
+
+    return render_template(
+        'driver_performance.html',
+        drivers=drivers,
+        avg_speed_score=avg_speed_score,
+        avg_braking_score=avg_braking_score,
+        safety_index=safety_index,
+        top_driver=top_driver,
+        get_safety_badge_color=get_safety_badge_color
+    )
@@ -0,0 +1,69 @@
+"""Fuel statistics and refuel records."""
+from datetime import datetime
+
+from flask import Blueprint, abort, flash, redirect, render_template, request, url_for
+from flask_login import login_required
+
+from fleet.database import read_only
+from fleet.extensions import db, score_refresher
+from fleet.invalidation import cached_response
+from fleet.models import FuelRecord, Vehicle
+from fleet.pagination import page_size_arg
+from fleet.services import FuelStats
+
+bp = Blueprint('fuel', __name__)
+
+@bp.route('/fuel-management')
+@login_required
+@read_only
+@cached_response('FuelRecord', 'Vehicle', 'Driver')
+def fuel_management():
+    stats = FuelStats()
+    try:
+        fuel_records = stats.recent_records(request.args, request.args.get('cursor'), page_size_arg(request.args))
+    except ValueError as e:
+        abort(400, str(e))
+    vehicle_count = Vehicle.query.count()
+
+    total_fuel_consumption, total_fuel_cost, _ = stats.month_totals()
+    avg_consumption = total_fuel_consumption / vehicle_count if vehicle_count else 0
+
+    return render_template('fuel_management.html',
+                         fuel_records=fuel_records,
+                         # Filters and page size carried over by the paging links
+                         page_args={name: value for name, value in request.args.items() if name != 'cursor'},
+                         monthly_totals=stats.monthly_totals(),
+                         vehicle_averages=stats.vehicle_averages(),
+                         total_fuel_consumption=total_fuel_consumption,
+                         total_fuel_cost=total_fuel_cost,
+                         avg_consumption=avg_consumption,
+                         efficiency_rating=stats.efficiency_rating())
+
+@bp.route('/add-fuel-record', methods=['POST'])
+@login_required
+def add_fuel_record():
+    try:
+        record = FuelRecord(
+            vehicle_id=request.form['vehicle_id'],
+            driver_id=request.form['driver_id'],
+            date=datetime.strptime(request.form['date'], '%Y-%m-%dT%H:%M'),
+            quantity=float(request.form['quantity']),
+            cost=float(request.form['cost']),
+            location=request.form['location']
+        )
+        if record.quantity <= 0 or record.cost < 0:
+            raise ValueError('quantity must be positive and cost not negative')
+        db.session.add(record)
+        
+        # Update vehicle fuel level
+        vehicle = Vehicle.query.get(record.vehicle_id)
+        if vehicle:
+            vehicle.fuel_level = min(100, vehicle.fuel_level + (record.quantity / vehicle.tank_capacity) * 100)
+        
+        db.session.commit()
+        score_refresher.mark([('driver', record.driver_id)])
+        flash('Fuel record added successfully')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error adding fuel record: {str(e)}')
+    return redirect(url_for('.fuel_management'))
@@ -0,0 +1,79 @@
+"""Maintenance schedule and history."""
+from datetime import datetime
+
+from flask import Blueprint, abort, flash, jsonify, redirect, render_template, request, url_for
+from flask_login import login_required
+from sqlalchemy.orm import joinedload
+
+from fleet.database import read_only
+from fleet.extensions import db
+from fleet.invalidation import cached_response
+from fleet.models import MaintenanceRecord
+from fleet.pagination import apply_filters, keyset_paginate, page_size_arg
+from fleet.services import publish_maintenance
+
+bp = Blueprint('maintenance', __name__)
+
+@bp.route('/maintenance')
+@login_required
+@read_only
+@cached_response('MaintenanceRecord', 'Vehicle')
+def maintenance():
+    key = [MaintenanceRecord.date, MaintenanceRecord.id]
+    try:
+        page_size = page_size_arg(request.args)
+        records = MaintenanceRecord.query.options(joinedload(MaintenanceRecord.vehicle))
+        records = apply_filters(records, request.args, {'vehicle_id': MaintenanceRecord.vehicle_id},
+                                date_column=MaintenanceRecord.date)
+        upcoming_maintenance = keyset_paginate(records.filter_by(status='scheduled'), key,
+                                               request.args.get('upcoming_cursor'), page_size)
+        maintenance_history = keyset_paginate(records.filter_by(status='completed'), key,
+                                              request.args.get('history_cursor'), page_size, descending=True)
+    except ValueError as e:
+        abort(400, str(e))
+    return render_template('maintenance.html',
+                         upcoming_maintenance=upcoming_maintenance,
+                         maintenance_history=maintenance_history)
+
+@bp.route('/complete-maintenance', methods=['POST'])
+@login_required
+def complete_maintenance():
+    try:
+        data = request.get_json()
+        maintenance_id = data.get('maintenance_id')
+        if not maintenance_id:
+            return jsonify({'success': False, 'error': 'Maintenance ID is required'}), 400
+            
+        maintenance = MaintenanceRecord.query.get_or_404(maintenance_id)
+        maintenance.status = 'completed'
+        
+        # Update vehicle's last maintenance date
+        vehicle = maintenance.vehicle
+        vehicle.last_maintenance = datetime.utcnow()
+        
+        db.session.commit()
+        publish_maintenance(maintenance, vehicle.name)
+        return jsonify({'success': True})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/add-maintenance', methods=['POST'])
+@login_required
+def add_maintenance():
+    try:
+        record = MaintenanceRecord(
+            vehicle_id=request.form['vehicle_id'],
+            date=datetime.strptime(request.form['date'], '%Y-%m-%d'),
+            description=request.form['description'],
+            cost=float(request.form['cost']),
+            status='scheduled'
+        )
+        db.session.add(record)
+        db.session.commit()
+        publish_maintenance(record, record.vehicle.name if record.vehicle else None)
+        flash('Maintenance record added successfully')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error adding maintenance record: {str(e)}')
+    return redirect(url_for('.maintenance'))
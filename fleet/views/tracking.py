@@ -0,0 +1,22 @@
+"""Live vehicle tracking map."""
+from flask import Blueprint, abort, render_template, request
+from flask_login import login_required
+
+from fleet.database import read_only
+from fleet.invalidation import cached_response
+from fleet.models import Vehicle, VEHICLE_FILTERS
+from fleet.pagination import apply_filters, keyset_paginate, page_size_arg
+
+bp = Blueprint('tracking', __name__)
+
+@bp.route('/vehicle-tracking')
+@login_required
+@read_only
+@cached_response('Vehicle', 'Vehicle.live')
+def vehicle_tracking():
+    try:
+        query = apply_filters(Vehicle.query, request.args, VEHICLE_FILTERS)
+        vehicles = keyset_paginate(query, [Vehicle.id], request.args.get('cursor'), page_size_arg(request.args))
+    except ValueError as e:
+        abort(400, str(e))
+    return render_template('vehicle_tracking.html', vehicles=vehicles)
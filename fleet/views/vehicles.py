@@ -0,0 +1,115 @@
+"""Vehicle list, details and management forms."""
+from datetime import datetime
+
+from flask import Blueprint, abort, flash, redirect, render_template, request, url_for
+from flask_login import login_required
+
+from fleet import analytics
+from fleet.database import read_only
+from fleet.extensions import db, vehicle_index
+from fleet.invalidation import cached_response
+from fleet.models import DeletedVehicle, FuelRecord, MaintenanceRecord, Vehicle, VEHICLE_FILTERS
+from fleet.pagination import apply_filters, keyset_paginate, page_size_arg
+
+bp = Blueprint('vehicles', __name__)
+
+# Records listed on the details page; totals and charts come from the cost buckets
+RECENT_RECORDS = 20
+
+@bp.route('/vehicles')
+@login_required
+@read_only
+@cached_response('Vehicle', 'Vehicle.live')
+def vehicles():
+    try:
+        query = apply_filters(Vehicle.query, request.args, VEHICLE_FILTERS)
+        vehicles = keyset_paginate(query, [Vehicle.id], request.args.get('cursor'), page_size_arg(request.args))
+    except ValueError as e:
+        abort(400, str(e))
+    return render_template('vehicles.html', vehicles=vehicles)
+
+@bp.route('/vehicle/<int:id>')
+@login_required
+@read_only
+@cached_response(lambda id: f'Vehicle:{id}')
+def vehicle_details(id):
+    vehicle = Vehicle.query.get_or_404(id)  # Fetch the vehicle by its ID
+    maintenance_records = MaintenanceRecord.query.filter_by(vehicle_id=id) \
+        .order_by(MaintenanceRecord.date.desc(), MaintenanceRecord.id.desc()).limit(RECENT_RECORDS).all()
+    fuel_records = FuelRecord.query.filter_by(vehicle_id=id) \
+        .order_by(FuelRecord.date.desc(), FuelRecord.id.desc()).limit(RECENT_RECORDS).all()
+    monthly = analytics.cost_series('month', *analytics.bucket_range('month'), vehicle_id=id)
+    daily = analytics.cost_series('day', *analytics.bucket_range('day'), vehicle_id=id)
+
+    return render_template(
+        'vehicle_details.html',
+        vehicle=vehicle,
+        maintenance_records=maintenance_records,
+        fuel_records=fuel_records,
+        monthly_costs=monthly,
+        daily_costs=daily,
+        totals=analytics.vehicle_totals(id)
+    )
+
+@bp.route('/add-vehicle', methods=['GET', 'POST'])
+@login_required
+def add_vehicle():
+    current_year = datetime.utcnow().year
+    if request.method == 'POST':
+        try:
+            vehicle = Vehicle(
+                name=request.form['name'],
+                vehicle_type=request.form['vehicle_type'],
+                model=request.form['model'],
+                year=int(request.form['year']),
+                tank_capacity=float(request.form['tank_capacity']),
+                image_url=request.form['image_url']
+            )
+            db.session.add(vehicle)
+            db.session.commit()
+            flash('Vehicle added successfully')
+            return redirect(url_for('.vehicles'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error adding vehicle: {str(e)}')
+            return redirect(url_for('.add_vehicle'))
+
+    return render_template('add_vehicle.html', current_year=current_year)
+
+
+@bp.route('/delete-vehicle/<int:id>', methods=['POST'])
+@login_required
+def delete_vehicle(id):
+    vehicle = Vehicle.query.get_or_404(id)
+    try:
+        db.session.delete(vehicle)
+        db.session.add(DeletedVehicle(vehicle_id=id))
+        db.session.commit()
+        vehicle_index.remove(id)
+        flash('Vehicle deleted successfully!', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error deleting vehicle: {str(e)}', 'error')
+    return redirect(url_for('.vehicles'))
+
+@bp.route('/edit-vehicle/<int:id>', methods=['GET', 'POST'])
+@login_required
+def edit_vehicle(id):
+    vehicle = Vehicle.query.get_or_404(id)
+    current_year = datetime.utcnow().year
+    if request.method == 'POST':
+        try:
+            vehicle.name = request.form['name']
+            vehicle.vehicle_type = request.form['vehicle_type']
+            vehicle.model = request.form['model']
+            vehicle.year = int(request.form['year'])
+            vehicle.tank_capacity = float(request.form['tank_capacity'])
+            vehicle.image_url = request.form['image_url']
+            db.session.commit()
+            flash('Vehicle updated successfully')
+            return redirect(url_for('.vehicles'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error updating vehicle: {str(e)}')
+    
+    return render_template('edit_vehicle.html', vehicle=vehicle, current_year=current_year)
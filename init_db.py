@@ -1,86 +1,167 @@
-from app import app, db, User, Vehicle, Driver, MaintenanceRecord, FuelRecord
-from datetime import datetime, timedelta
-import random
-
-def init_db():
-    with app.app_context():
-        # Clear existing data
-        db.drop_all()
-        db.create_all()
-
-        # Create admin user
-        admin = User(
-            username='admin',
-            password='admin123',  # In production, use proper password hashing
-            email='admin@fleet.com',
-            is_admin=True
-        )
-        db.session.add(admin)
-
-        # Create vehicles
-        vehicle_types = ['Truck', 'Van', 'Pickup', 'Car']
-        vehicles = [
-            Vehicle(
-                name=f'Truck-{i}',
-                vehicle_type=vehicle_types[i % len(vehicle_types)],
-                current_location=f'Location {i}',
-                latitude=random.uniform(40.7, 41.0),
-                longitude=random.uniform(-74.1, -73.9),
-                fuel_level=random.uniform(30.0, 100.0),
-                status='active' if random.random() > 0.2 else 'maintenance',
-                last_maintenance=datetime.now() - timedelta(days=random.randint(1, 30))
-            ) for i in range(1, 6)
-        ]
-        for v in vehicles:
-            db.session.add(v)
-
-        # Create drivers
-        drivers = [
-            Driver(
-                name=f'Driver {i}',
-                license_number=f'LIC-{1000+i}',
-                performance_rating=random.uniform(6.0, 9.5),
-                speed_score=random.uniform(6.0, 9.5),
-                braking_score=random.uniform(6.0, 9.5),
-                safety_rating='Good',
-                vehicle_id=i
-            ) for i in range(1, 6)
-        ]
-        for d in drivers:
-            db.session.add(d)
-
-        # Create maintenance records
-        for vehicle in vehicles:
-            for _ in range(3):
-                record = MaintenanceRecord(
-                    vehicle_id=vehicle.id,
-                    date=datetime.now() - timedelta(days=random.randint(1, 60)),
-                    description=random.choice([
-                        'Oil Change',
-                        'Tire Rotation',
-                        'Brake Inspection',
-                        'Engine Maintenance',
-                        'General Service'
-                    ]),
-                    cost=random.uniform(100, 1000),
-                    status=random.choice(['completed', 'scheduled'])
-                )
-                db.session.add(record)
-
-        # Create fuel records
-        for _ in range(20):
-            record = FuelRecord(
-                vehicle_id=random.randint(1, 5),
-                driver_id=random.randint(1, 5),
-                date=datetime.now() - timedelta(days=random.randint(1, 30)),
-                quantity=random.uniform(20, 100),
-                cost=random.uniform(50, 250),
-                location=f'Gas Station {random.randint(1, 5)}'
-            )
-            db.session.add(record)
-
-        db.session.commit()
-        print("Database initialized with sample data!")
-
-if __name__ == '__main__':
-    init_db()
+from app import app
+from fleet.extensions import db, response_cache
+from fleet.models import User, Vehicle, Driver, MaintenanceRecord, FuelRecord, PositionHistory
+from fleet.analytics import rebuild_cost_buckets
+from fleet.security import hash_password
+from fleet.summary import rebuild_fleet_summary
+from fleet import positions
+from datetime import datetime, timedelta
+from itertools import islice
+import argparse
+import random
+import time
+
+VEHICLE_TYPES = ['Truck', 'Van', 'Pickup', 'Car']
+MAINTENANCE_DESCRIPTIONS = [
+    'Oil Change',
+    'Tire Rotation',
+    'Brake Inspection',
+    'Engine Maintenance',
+    'General Service'
+]
+
+# Rows per executemany; large enough to amortize statement overhead, small enough to bound memory
+BATCH_SIZE = 20000
+
+def _timestamps(now, days, step):
+    """Timestamps spread over the past days, preformatted the way SQLAlchemy stores them in SQLite."""
+    return [(now - timedelta(seconds=s)).strftime('%Y-%m-%d %H:%M:%S.%f') for s in range(0, days * 86400, step)]
+
+def _vehicles(rng, count, now):
+    days = _timestamps(now, 31, 86400)
+    created = days[0]
+    for i in range(1, count + 1):
+        yield (i, f'Truck-{i}', VEHICLE_TYPES[i % len(VEHICLE_TYPES)], f'Location {i}',
+               40.7 + 0.3 * rng.random(), -74.1 + 0.2 * rng.random(), 30.0 + 70.0 * rng.random(),
+               'active' if rng.random() > 0.2 else 'maintenance',
+               days[rng.randint(1, 30)], created, created)
+
+VEHICLE_COLUMNS = ('id', 'name', 'vehicle_type', 'current_location', 'latitude', 'longitude', 'fuel_level',
+                   'status', 'last_maintenance', 'created_at', 'updated_at')
+
+def _drivers(rng, count, vehicles, now):
+    created = now.strftime('%Y-%m-%d %H:%M:%S.%f')
+    for i in range(1, count + 1):
+        # Drivers beyond the fleet size share vehicles round-robin
+        yield (i, f'Driver {i}', f'LIC-{1000 + i}', 6.0 + 3.5 * rng.random(), 6.0 + 3.5 * rng.random(),
+               6.0 + 3.5 * rng.random(), 'Good', (i - 1) % vehicles + 1 if vehicles else None, created, created)
+
+DRIVER_COLUMNS = ('id', 'name', 'license_number', 'performance_rating', 'speed_score', 'braking_score',
+                  'safety_rating', 'vehicle_id', 'created_at', 'updated_at')
+
+def _maintenance(rng, count, vehicles, now):
+    dates = _timestamps(now, 60, 3600)[24:]
+    created = now.strftime('%Y-%m-%d %H:%M:%S.%f')
+    random_ = rng.random
+    for _ in range(count):
+        yield (int(random_() * vehicles) + 1, dates[int(random_() * len(dates))],
+               MAINTENANCE_DESCRIPTIONS[int(random_() * len(MAINTENANCE_DESCRIPTIONS))],
+               100 + 900 * random_(), 'completed' if random_() < 0.5 else 'scheduled', created)
+
+MAINTENANCE_COLUMNS = ('vehicle_id', 'date', 'description', 'cost', 'status', 'created_at')
+
+def _fuel(rng, count, vehicles, drivers, now):
+    dates = _timestamps(now, 30, 60)[24 * 60:]
+    created = now.strftime('%Y-%m-%d %H:%M:%S.%f')
+    stations = [f'Gas Station {i}' for i in range(1, 6)]
+    random_ = rng.random
+    for _ in range(count):
+        yield (int(random_() * vehicles) + 1, int(random_() * drivers) + 1, dates[int(random_() * len(dates))],
+               20 + 80 * random_(), 50 + 200 * random_(), stations[int(random_() * 5)], created)
+
+FUEL_COLUMNS = ('vehicle_id', 'driver_id', 'date', 'quantity', 'cost', 'location', 'created_at')
+
+def _positions(rng, per_vehicle, vehicles, now):
+    # One ping a minute per vehicle, ending now, as a random walk from the vehicle's area
+    start = positions.epoch(now) - per_vehicle * 60
+    random_ = rng.random
+    for vehicle_id in range(1, vehicles + 1):
+        lat, lon = 40.7 + 0.3 * random_(), -74.1 + 0.2 * random_()
+        for i in range(per_vehicle):
+            lat += 0.002 * random_() - 0.001
+            lon += 0.002 * random_() - 0.001
+            yield (vehicle_id, start + i * 60, positions.RAW_RESOLUTION, lat, lon, 110 * random_())
+
+POSITION_COLUMNS = ('vehicle_id', 'ts', 'resolution', 'latitude', 'longitude', 'speed')
+
+def _bulk_insert(table, columns, rows):
+    """Insert row tuples with the driver's executemany, building secondary indexes afterwards.
+
+    Values go to sqlite3 as they are, which is why dates are preformatted;
+    loading first and indexing once is much faster than maintaining the
+    indexes row by row.
+    """
+    connection = db.session.connection()
+    for index in table.indexes:
+        index.drop(connection)
+    cursor = connection.connection.cursor()
+    sql = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    count = 0
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            break
+        cursor.executemany(sql, batch)
+        count += len(batch)
+    for index in table.indexes:
+        index.create(connection)
+    return count
+
+def init_db(vehicles=5, drivers=5, maintenance=15, fuel=20, positions_per_vehicle=0, seed=None):
+    """Recreate the schema and fill it with generated data.
+
+    Rows are inserted with executemany in batches, so a million-row fleet
+    builds in seconds; the same seed always produces the same data.
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    with app.app_context():
+        # Clear existing data
+        db.drop_all()
+        db.create_all()
+
+        # Create admin user
+        admin = User(
+            username='admin',
+            password=hash_password('admin123', app.config['PASSWORD_HASH_METHOD']),
+            email='admin@fleet.com',
+            is_admin=True
+        )
+        db.session.add(admin)
+        db.session.flush()
+
+        counts = {
+            'vehicles': _bulk_insert(Vehicle.__table__, VEHICLE_COLUMNS, _vehicles(rng, vehicles, now)),
+            'drivers': _bulk_insert(Driver.__table__, DRIVER_COLUMNS, _drivers(rng, drivers, vehicles, now)),
+        }
+        if vehicles:
+            counts['maintenance records'] = _bulk_insert(
+                MaintenanceRecord.__table__, MAINTENANCE_COLUMNS, _maintenance(rng, maintenance, vehicles, now))
+            if drivers:
+                counts['fuel records'] = _bulk_insert(
+                    FuelRecord.__table__, FUEL_COLUMNS, _fuel(rng, fuel, vehicles, drivers, now))
+            counts['positions'] = _bulk_insert(
+                PositionHistory.__table__, POSITION_COLUMNS, _positions(rng, positions_per_vehicle, vehicles, now))
+
+        db.session.commit()
+        # Core inserts skip the flush hooks that maintain the dashboard counters and cost buckets
+        rebuild_fleet_summary()
+        rebuild_cost_buckets()
+        # The cache outlives this process and has seen none of the above
+        response_cache.clear()
+        print("Database initialized with sample data!")
+        return counts
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recreate the database with generated sample data.')
+    parser.add_argument('--vehicles', type=int, default=5)
+    parser.add_argument('--drivers', type=int, default=5)
+    parser.add_argument('--maintenance', type=int, default=15, help='maintenance records in total')
+    parser.add_argument('--fuel', type=int, default=20, help='fuel records in total')
+    parser.add_argument('--positions', type=int, default=0, help='position history rows per vehicle')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    counts = init_db(args.vehicles, args.drivers, args.maintenance, args.fuel, args.positions, args.seed)
+    elapsed = time.perf_counter() - started
+    print(', '.join(f'{count} {name}' for name, count in counts.items()) + f' in {elapsed:.1f}s')